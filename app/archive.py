@@ -0,0 +1,157 @@
+"""
+Archival of closed years of attendance.
+
+`manage.py archive-attendance` moves every year older than the last
+ATTENDANCE_HOT_YEARS closed years out of the attendance table, one year per
+transaction, to one of:
+- table (default): the attendance_archive table. Same rows and ids, no
+  foreign key, and just an employee and a date index. Reads still see them.
+- parquet: a compressed Parquet file per year in ATTENDANCE_ARCHIVE_DIR (same
+  columns as the payroll export, needs pyarrow). The rows leave the database
+  completely. The daily rollup keeps their days and the employee counters
+  their months, so analytics, department stats, profile totals and the
+  monthly report still count them, but the raw-record routes (listings,
+  history, export) no longer return them. Use it for years only the
+  auditors need.
+
+Archived years are read-only. Marking attendance on one of their days is
+rejected, and their records can't be deleted.
+
+Reads are routed by date range (attendance_source). Only closed years are
+ever archived, so a read that starts in the current year goes straight to
+the attendance table, and on a partitioned table (app/partitions.py) only to
+the partitions it covers. A read that reaches back further, or has no start
+date, reads the attendance table and attendance_archive together. This
+needs no state, so it can't go stale between workers.
+"""
+import os
+from datetime import date, datetime, timezone
+from typing import Iterable, List, Optional, Set
+from sqlalchemy import delete, func, insert, select, union_all
+from app import models, partitions
+
+hot_table = models.Attendance.__table__
+archive_table = models.AttendanceArchive.__table__
+years_table = models.ArchivedAttendanceYear.__table__
+
+COLUMNS = ["id", "employee_id", "date", "status"]
+
+TABLE, PARQUET = "table", "parquet"
+
+
+def hot_start(today: Optional[date] = None) -> date:
+    """First day that can't be archived - January 1st of the current year"""
+    return date((today or date.today()).year, 1, 1)
+
+
+def attendance_source(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    employee_id: Optional[str] = None,
+    employee_ids=None
+):
+    """The attendance rows a read needs, with id, employee_id, date and status columns.
+
+    Just the attendance table if start_date is in the current year. Otherwise the
+    attendance table UNION ALL attendance_archive, with the date and employee filters
+    (employee_ids is a select of employee IDs) repeated inside both halves so each
+    uses its own indexes - the databases don't push join conditions into a UNION."""
+    if start_date is not None and start_date >= hot_start():
+        return hot_table
+    halves = []
+    for table in (hot_table, archive_table):
+        query = select(*(table.c[name] for name in COLUMNS))
+        if start_date:
+            query = query.where(table.c.date >= start_date)
+        if end_date:
+            query = query.where(table.c.date <= end_date)
+        if employee_id:
+            query = query.where(table.c.employee_id == employee_id)
+        if employee_ids is not None:
+            query = query.where(table.c.employee_id.in_(employee_ids))
+        halves.append(query)
+    return union_all(*halves).subquery("attendance_rows")
+
+
+def archived_years(db, dates: Iterable[date]) -> Set[int]:
+    """Which of these dates' years are archived. No query unless there are dates before this year."""
+    years = {day.year for day in dates if day < hot_start()}
+    if not years:
+        return set()
+    return set(db.execute(select(years_table.c.year).where(years_table.c.year.in_(years))).scalars())
+
+
+def archived_year_detail(year: int) -> str:
+    return f"Attendance for {year} has been archived and can't be changed"
+
+
+def parquet_years(db) -> List[int]:
+    """Years whose rows were moved out of the database - the rollup and counters keep them as they were"""
+    return list(db.execute(select(years_table.c.year).where(years_table.c.destination == PARQUET)).scalars())
+
+
+def remove_employee(db, employee_id: str):
+    """Delete an employee's archived attendance - call before deleting the employee
+    (the attendance table cascades, the archive has no foreign key)"""
+    db.execute(delete(archive_table).where(archive_table.c.employee_id == employee_id))
+
+
+def archivable_years(db, hot_years: int, today: Optional[date] = None) -> List[int]:
+    """Years with rows in the attendance table that are older than the last `hot_years` closed years"""
+    first = db.execute(select(func.min(hot_table.c.date))).scalar()
+    if first is None:
+        return []
+    cutoff = hot_start(today).year - hot_years
+    done = set(db.execute(select(years_table.c.year)).scalars())
+    return [year for year in range(first.year, cutoff) if year not in done]
+
+
+def _write_parquet(year: int, directory: str) -> str:
+    """Write a year's export to a temporary file, returning its path"""
+    from app import export  # export reads through attendance_source
+
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"attendance_{year}.parquet.tmp")
+    with open(path, "wb") as f:
+        # From the primary - a lagging replica would fail the row count check below
+        for chunk in export.export_attendance(date(year, 1, 1), date(year, 12, 31), fmt="parquet", primary=True):
+            f.write(chunk)
+    return path
+
+
+def archive_year(db, year: int, destination: str = TABLE, directory: Optional[str] = None) -> int:
+    """Move one year out of the attendance table. Returns how many rows moved.
+    The caller commits - nothing changes if it doesn't."""
+    in_year = hot_table.c.date.between(date(year, 1, 1), date(year, 12, 31))
+    location = None
+
+    if destination == PARQUET:
+        import pyarrow.parquet as pq
+
+        # Written (by its own session) before anything is removed, then checked against the table
+        temporary = _write_parquet(year, directory)
+        rows = db.execute(select(func.count()).select_from(hot_table).where(in_year)).scalar()
+        written = pq.ParquetFile(temporary).metadata.num_rows
+        if written != rows:
+            os.remove(temporary)
+            raise RuntimeError(f"{year}: wrote {written} rows to Parquet but the table has {rows}, nothing archived")
+        location = temporary[:-len(".tmp")]
+    else:
+        rows = db.execute(
+            insert(archive_table).from_select(COLUMNS, select(*(hot_table.c[name] for name in COLUMNS)).where(in_year))
+        ).rowcount
+
+    conn = db.connection()
+    if partitions.is_partitioned(conn):
+        # Dropping the year's partitions instead of deleting row by row
+        partitions.drop_year(conn, year)
+    else:
+        db.execute(delete(hot_table).where(in_year))
+
+    db.execute(years_table.insert().values(
+        year=year, destination=destination, row_count=rows, location=location,
+        archived_at=datetime.now(timezone.utc).replace(tzinfo=None)
+    ))
+    if location:
+        os.replace(location + ".tmp", location)
+    return rows
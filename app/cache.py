@@ -0,0 +1,174 @@
+"""
+Read-through cache for employee lookups.
+
+Almost every attendance write starts by loading the employee, and the
+roster hardly ever changes, so we keep recently used employees in a small
+LRU cache with a TTL. create_employee and delete_employee invalidate the
+entry for the employee they touch.
+
+Only employees that exist are cached - a "not found" is always checked
+against the database, so an employee created on another worker is never
+reported missing. With several workers, a delete on one worker can leave
+the employee in another worker's cache until the TTL runs out; plug in a
+shared backend (EMPLOYEE_CACHE_BACKEND) if that matters. The same goes for
+a lookup from a GET route on a read replica that hasn't seen a delete yet.
+"""
+import importlib
+import threading
+from abc import ABC, abstractmethod
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+from sqlalchemy import select
+from app.config import settings
+from app import models
+
+
+class CachedEmployee(NamedTuple):
+    id: int
+    employee_id: str
+    full_name: str
+    email: str
+    department: str
+
+
+class CacheBackend(ABC):
+    """Interface for cache storage. Values are plain JSON-friendly dicts so a shared
+    backend (Redis, memcached...) can store them. Set EMPLOYEE_CACHE_BACKEND to
+    "package.module:ClassName" to use one - it's constructed with no arguments."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: dict, ttl: float):
+        ...
+
+    @abstractmethod
+    def delete(self, key: str):
+        ...
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+
+class InMemoryBackend(CacheBackend):
+    """Bounded LRU with per-entry expiry, local to this worker process"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class EmployeeCache:
+    def __init__(self, backend: CacheBackend, ttl: float, enabled: bool = True):
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        # Lookups run on many threadpool threads at once, and += isn't atomic
+        self._counter_lock = threading.Lock()
+
+    def get(self, db, employee_id: str) -> Optional[CachedEmployee]:
+        """Look up an employee, from the cache if we can, otherwise from the database"""
+        if self.enabled:
+            cached = self.backend.get(employee_id)
+            with self._counter_lock:
+                if cached is not None:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+            if cached is not None:
+                return CachedEmployee(**cached)
+
+        row = db.execute(
+            select(
+                models.Employee.id,
+                models.Employee.employee_id,
+                models.Employee.full_name,
+                models.Employee.email,
+                models.Employee.department
+            ).where(models.Employee.employee_id == employee_id)
+        ).first()
+
+        if row is None:
+            return None
+        employee = CachedEmployee(*row)
+        if self.enabled:
+            self.backend.set(employee_id, employee._asdict(), self.ttl)
+        return employee
+
+    def invalidate(self, employee_id: str):
+        if self.enabled:
+            self.backend.delete(employee_id)
+
+    def stats(self) -> dict:
+        with self._counter_lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        stats = {
+            "enabled": self.enabled,
+            "backend": type(self.backend).__name__,
+            "ttl_seconds": self.ttl,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / total, 4) if total else 0.0,
+        }
+        if isinstance(self.backend, InMemoryBackend):
+            stats["size"] = len(self.backend)
+            stats["maxsize"] = self.backend.maxsize
+        return stats
+
+
+def _load_backend() -> CacheBackend:
+    if not settings.employee_cache_backend:
+        return InMemoryBackend(settings.employee_cache_size)
+    module_name, _, class_name = settings.employee_cache_backend.partition(":")
+    backend_class = getattr(importlib.import_module(module_name), class_name)
+    return backend_class()
+
+
+employee_cache = EmployeeCache(
+    _load_backend(),
+    ttl=settings.employee_cache_ttl,
+    enabled=settings.employee_cache_enabled
+)
+
+
+def get_employee(db, employee_id: str) -> Optional[CachedEmployee]:
+    """Module level so it can be passed to AsyncSession.run_sync"""
+    return employee_cache.get(db, employee_id)
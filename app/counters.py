@@ -0,0 +1,188 @@
+"""
+Per-employee attendance counters - the employee_attendance_months table.
+
+One row per employee per month with their present and absent days. The
+employee profile's totals are the sum of the employee's rows (a few per
+year, read off the primary key) and the monthly report reads one month's
+rows, instead of both counting raw attendance on every request.
+
+Like the daily rollup (app/summary.py), every write that changes attendance
+calls one of these helpers in the same transaction, before db.commit().
+They count archived attendance too. Years archived to Parquet keep their
+counters as they were when the rows left, like the daily rollup keeps their
+days, so the profile totals, monthly report and analytics still count them.
+`check()` and `rebuild()` leave those months alone.
+
+`check()` compares the counters with a fresh count of the raw rows, and
+`rebuild()` recounts them:
+
+    python manage.py check-counters           # report any drift
+    python manage.py check-counters --repair  # and recount the employees that drifted
+"""
+import calendar
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import Date, case, cast, delete, except_, func, insert, not_, select, type_coerce
+from sqlalchemy.orm import Session
+from app.database import dialect_insert
+from app import archive, models
+
+counters_table = models.EmployeeAttendanceMonth.__table__
+
+# How many employee ids go in one IN (...) when recounting
+RECOUNT_CHUNK_SIZE = 10000
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def month_end(day: date) -> date:
+    return day.replace(day=calendar.monthrange(day.year, day.month)[1])
+
+
+def apply_delta(db, employee_id: str, month: date, present: int = 0, absent: int = 0):
+    """Add to (or subtract from) one employee's counts for one month"""
+    if not present and not absent:
+        return
+    stmt = dialect_insert(db.bind)(counters_table).values(
+        employee_id=employee_id, month=month, present_count=present, absent_count=absent
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["employee_id", "month"],
+        set_={
+            "present_count": counters_table.c.present_count + stmt.excluded.present_count,
+            "absent_count": counters_table.c.absent_count + stmt.excluded.absent_count,
+        }
+    )
+    db.execute(stmt)
+
+
+def record_change(db, employee_id: str, day: date, old_status=None, new_status=None):
+    """Update the counters for one attendance record being created (no old_status),
+    changed (both) or deleted (no new_status)"""
+    record_changes(db, [(employee_id, day, old_status, new_status)])
+
+
+def record_changes(db, changes: Iterable[tuple]):
+    """record_change() for many records at once - (employee_id, day, old_status, new_status)
+    tuples, added up so each employee and month is one upsert"""
+    totals = {}
+    for employee_id, day, old_status, new_status in changes:
+        counts = totals.setdefault((employee_id, month_start(day)), [0, 0])
+        for status, amount in ((old_status, -1), (new_status, 1)):
+            if status == models.AttendanceStatus.PRESENT:
+                counts[0] += amount
+            elif status == models.AttendanceStatus.ABSENT:
+                counts[1] += amount
+    # By employee and month - overlapping writers then lock these rows in one order
+    for (employee_id, month), (present, absent) in sorted(totals.items()):
+        apply_delta(db, employee_id, month, present=present, absent=absent)
+
+
+def remove_employee(db, employee_id: str):
+    """Delete an employee's counters - call before deleting the employee"""
+    db.execute(delete(counters_table).where(counters_table.c.employee_id == employee_id))
+
+
+def totals_subquery(employee_id: str):
+    """One row of total_present_days / total_absent_days for the employee (no row if they have no attendance)"""
+    return select(
+        counters_table.c.employee_id,
+        func.sum(counters_table.c.present_count).label("total_present_days"),
+        func.sum(counters_table.c.absent_count).label("total_absent_days"),
+    ).where(counters_table.c.employee_id == employee_id).group_by(counters_table.c.employee_id).subquery()
+
+
+def month_expression(column, dialect_name: str):
+    """The first day of the month `column` falls in, typed as a date on both databases"""
+    if dialect_name == "sqlite":
+        return type_coerce(func.date(column, "start of month"), Date)
+    return cast(func.date_trunc("month", column), Date)
+
+
+def _dialect_name(db) -> str:
+    # A Session from the routes and manage.py, a Connection from migrations
+    return db.get_bind().dialect.name if isinstance(db, Session) else db.dialect.name
+
+
+def counted(db, employee_ids=None, start_date: Optional[date] = None, end_date: Optional[date] = None):
+    """What the counters should hold, counted from the raw attendance rows -
+    employee_id, month, present_count, absent_count"""
+    attendance = archive.attendance_source(start_date, end_date, employee_ids=employee_ids)
+    month = month_expression(attendance.c.date, _dialect_name(db))
+    query = select(
+        attendance.c.employee_id,
+        month.label("month"),
+        func.sum(case((attendance.c.status == models.AttendanceStatus.PRESENT, 1), else_=0)).label("present_count"),
+        func.sum(case((attendance.c.status == models.AttendanceStatus.ABSENT, 1), else_=0)).label("absent_count"),
+    )
+    if start_date:
+        query = query.where(attendance.c.date >= start_date)
+    if end_date:
+        query = query.where(attendance.c.date <= end_date)
+    if employee_ids is not None:
+        query = query.where(attendance.c.employee_id.in_(employee_ids))
+    return query.group_by(attendance.c.employee_id, month)
+
+
+def _frozen_months(db) -> list:
+    """Conditions leaving out the months of years archived to Parquet - there are no rows to recount them from"""
+    return [not_(counters_table.c.month.between(date(year, 1, 1), date(year, 12, 1))) for year in archive.parquet_years(db)]
+
+
+def _recount(db, employee_ids=None, start_date: Optional[date] = None, end_date: Optional[date] = None):
+    """Delete and re-insert the counters for these employees (all if None) and whole months
+    from start_date to end_date (all if None)"""
+    start_date = start_date and month_start(start_date)
+    end_date = end_date and month_end(end_date)
+    clear = delete(counters_table).where(*_frozen_months(db))
+    if employee_ids is not None:
+        clear = clear.where(counters_table.c.employee_id.in_(employee_ids))
+    if start_date:
+        clear = clear.where(counters_table.c.month >= start_date)
+    if end_date:
+        clear = clear.where(counters_table.c.month <= end_date)
+    db.execute(clear)
+    db.execute(insert(counters_table).from_select(
+        ["employee_id", "month", "present_count", "absent_count"],
+        counted(db, employee_ids, start_date, end_date)
+    ))
+
+
+def refresh(db, employee_ids: Iterable[str], dates: Iterable[date]):
+    """Recount specific employees over the months spanning `dates` - used after bulk
+    upserts where we don't know the old statuses"""
+    employee_ids, dates = sorted(set(employee_ids)), sorted(set(dates))
+    if not employee_ids or not dates:
+        return
+    for start in range(0, len(employee_ids), RECOUNT_CHUNK_SIZE):
+        _recount(db, employee_ids[start:start + RECOUNT_CHUNK_SIZE], dates[0], dates[-1])
+
+
+def rebuild(db, employee_ids: Optional[Iterable[str]] = None):
+    """Recount the counters from raw attendance, for every employee or just some"""
+    if employee_ids is None:
+        _recount(db)
+        return
+    employee_ids = sorted(set(employee_ids))
+    for start in range(0, len(employee_ids), RECOUNT_CHUNK_SIZE):
+        _recount(db, employee_ids[start:start + RECOUNT_CHUNK_SIZE])
+
+
+def check(db) -> List[Dict]:
+    """Every employee and month where the counters disagree with the raw rows, with both sets of counts.
+    Months stored as zero count as missing, so a month whose records were all deleted is fine."""
+    expected = counted(db)
+    stored = select(
+        counters_table.c.employee_id, counters_table.c.month, counters_table.c.present_count, counters_table.c.absent_count
+    ).where((counters_table.c.present_count != 0) | (counters_table.c.absent_count != 0), *_frozen_months(db))
+
+    drift = {}
+    for side, query in (("counted", except_(expected, stored)), ("stored", except_(stored, expected))):
+        for employee_id, month, present, absent in db.execute(query):
+            row = drift.setdefault((employee_id, month), {
+                "employee_id": employee_id, "month": month, "stored": (0, 0), "counted": (0, 0)
+            })
+            row[side] = (present, absent)
+    return [drift[key] for key in sorted(drift)]
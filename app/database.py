@@ -1,10 +1,17 @@
+from contextlib import contextmanager
+from fastapi import Request
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
+from app.pool import engine_options
+from app.profiling import instrument_engine
+from app.replicas import ReplicaSet, sticky_to_primary
 
-# Create database engine
-engine = create_engine(settings.database_url)
+# Create database engine - pool sizes, timeouts and pre-ping come from Settings
+engine = create_engine(settings.database_url, **engine_options(settings.database_url))
+instrument_engine(engine)
 
 # Database session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -20,3 +27,100 @@ def get_db():
         yield db
     finally:
         db.close()  # Always close the connection when done
+
+
+# Read replicas (DATABASE_READ_URLS, see app/replicas.py) - like the primary, they connect on first use
+read_replicas = ReplicaSet(
+    [create_engine(url, **engine_options(url)) for url in settings.database_read_urls],
+    settings.database_read_retry_seconds
+)
+for replica_engine in read_replicas.engines():
+    instrument_engine(replica_engine)
+
+
+@contextmanager
+def read_session(primary: bool = False):
+    """A session for reads only, on the next read replica that's up. On the primary
+    (connecting lazily, like SessionLocal) with primary=True, or with no replica to use."""
+    connection = None if primary else read_replicas.connect()
+    db = SessionLocal(bind=connection) if connection is not None else SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+        if connection is not None:
+            connection.close()
+
+
+# get_db for the GET routes - reads from a replica unless this client just wrote something
+def get_read_db(request: Request):
+    with read_session(primary=sticky_to_primary(request)) as db:
+        yield db
+
+
+# Async drivers to use for each database when DATABASE_MODE=async
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def async_database_url(url: str) -> str:
+    """postgresql://... -> postgresql+asyncpg://..., sqlite:///... -> sqlite+aiosqlite:///..."""
+    scheme, rest = url.split("://", 1)
+    driver = ASYNC_DRIVERS.get(scheme.split("+")[0], scheme)
+    return f"{driver}://{rest}"
+
+
+# The async engine is only created on first use, so sync deployments don't need asyncpg installed
+async_engine = None
+AsyncSessionLocal = None
+async_read_replicas = ReplicaSet([], settings.database_read_retry_seconds)
+
+
+def get_async_engine():
+    global async_engine, AsyncSessionLocal, async_read_replicas
+    if async_engine is None:
+        url = async_database_url(settings.database_url)
+        async_engine = create_async_engine(url, **engine_options(url, is_async=True))
+        instrument_engine(async_engine.sync_engine)
+        # expire_on_commit=False - async sessions can't lazy load attributes after a commit
+        AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+        replica_urls = [async_database_url(replica_url) for replica_url in settings.database_read_urls]
+        async_read_replicas = ReplicaSet(
+            [create_async_engine(replica_url, **engine_options(replica_url, is_async=True)) for replica_url in replica_urls],
+            settings.database_read_retry_seconds
+        )
+        for replica_engine in async_read_replicas.engines():
+            instrument_engine(replica_engine.sync_engine)
+    return async_engine
+
+
+# Async version of get_db for the routers in app/routers/async_*.py
+async def get_async_db():
+    get_async_engine()
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# get_read_db for the async routers
+async def get_async_read_db(request: Request):
+    get_async_engine()
+    connection = None if sticky_to_primary(request) else await async_read_replicas.connect_async()
+    try:
+        async with (AsyncSessionLocal(bind=connection) if connection is not None else AsyncSessionLocal()) as db:
+            yield db
+    finally:
+        if connection is not None:
+            await connection.close()
+
+
+def dialect_insert(bind):
+    """Return the insert() construct for the current dialect so we can use ON CONFLICT"""
+    if bind.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert
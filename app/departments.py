@@ -0,0 +1,134 @@
+"""
+The departments table - one row per department name, with a headcount.
+
+Employees point at their department by id (employees.department_id, indexed),
+so department filters are integer comparisons on an index instead of string
+compares over every employee. The name also stays on the employee row, since
+the API returns it and the attendance rollup is keyed by it. Employees can't
+be renamed or moved between departments, so the two never disagree.
+
+headcount is kept up to date by every write that adds or removes employees,
+in the same transaction, like the attendance rollup (app/summary.py).
+rebuild_headcounts() recomputes it from scratch:
+
+    python manage.py rebuild-departments
+
+Each headcount change also bumps the row's version, so the departments table
+doubles as the employee roster's version for ETags (app/http_cache.py) - a
+write only locks the department rows it updates anyway.
+"""
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional
+from sqlalchemy import func, select, text, update
+from app.database import dialect_insert
+from app import models
+
+departments_table = models.Department.__table__
+employees_table = models.Employee.__table__
+
+# Department name -> id. Departments are never deleted or renamed, so an id,
+# once known, stays right for the life of the process.
+_ids: Dict[str, int] = {}
+_ids_lock = threading.Lock()
+
+
+def department_id(db, name: str) -> Optional[int]:
+    """Id of an existing department, or None if there isn't one by that name"""
+    cached = _ids.get(name)
+    if cached is not None:
+        return cached
+    found = db.execute(select(departments_table.c.id).where(departments_table.c.name == name)).scalar()
+    if found is not None:
+        with _ids_lock:
+            _ids[name] = found
+    return found
+
+
+# No department has this id - filtering by an unknown department matches nobody
+UNKNOWN_DEPARTMENT = -1
+
+
+def filter_id(db, name: Optional[str]) -> Optional[int]:
+    """department_id to filter a query on, for a ?department= parameter (None = no filter)"""
+    if not name:
+        return None
+    found = department_id(db, name)
+    return UNKNOWN_DEPARTMENT if found is None else found
+
+
+def ensure_departments(db, names: Iterable[str]) -> Dict[str, int]:
+    """Ids for department names, creating the departments that don't exist yet"""
+    names = set(names)
+    ids = {name: _ids[name] for name in names if name in _ids}
+    missing = names - ids.keys()
+    if missing:
+        # DO NOTHING so two requests creating the same new department don't collide
+        db.execute(
+            dialect_insert(db.bind)(departments_table).on_conflict_do_nothing(index_elements=["name"]),
+            [{"name": name, "headcount": 0} for name in missing]
+        )
+        rows = db.execute(
+            select(departments_table.c.name, departments_table.c.id).where(departments_table.c.name.in_(missing))
+        ).all()
+        ids.update(dict(rows))
+        # Not cached yet - the rows above aren't committed, and a rollback would take them away again
+    return ids
+
+
+def adjust_headcount(db, department_id: int, delta: int):
+    """Add to (or subtract from) a department's headcount - call before db.commit().
+    Bumps the row's version too, which is what tells the employee routes' ETags it changed."""
+    if delta:
+        db.execute(
+            update(departments_table).where(departments_table.c.id == department_id).values(
+                headcount=departments_table.c.headcount + delta,
+                version=departments_table.c.version + 1,
+                updated_at=datetime.now(timezone.utc).replace(tzinfo=None)
+            )
+        )
+
+
+def headcount(db, name: str) -> int:
+    """Employees in one department, 0 if there's no such department"""
+    return db.execute(
+        select(departments_table.c.headcount).where(departments_table.c.name == name)
+    ).scalar() or 0
+
+
+def headcount_statement():
+    """Departments with their headcount, by name - columns in schemas.DepartmentHeadcount order"""
+    return select(
+        departments_table.c.name.label("department"), departments_table.c.headcount
+    ).where(departments_table.c.headcount > 0).order_by(departments_table.c.name)
+
+
+def rebuild_headcounts(db):
+    """Recount every department's employees"""
+    db.execute(
+        update(departments_table).values(
+            headcount=select(func.count()).where(
+                employees_table.c.department_id == departments_table.c.id
+            ).scalar_subquery(),
+            version=departments_table.c.version + 1,
+            updated_at=datetime.now(timezone.utc).replace(tzinfo=None)
+        )
+    )
+
+
+def backfill(db):
+    """Create a department for every name in use and point the employees at them -
+    for databases from before the departments table. Set-based, so it's a few
+    statements however many employees there are."""
+    db.execute(text("""
+        INSERT INTO departments (name, headcount)
+        SELECT DISTINCT department, 0 FROM employees
+        WHERE department NOT IN (SELECT name FROM departments)
+    """))
+    db.execute(text("""
+        UPDATE employees SET department_id = (
+            SELECT departments.id FROM departments WHERE departments.name = employees.department
+        )
+        WHERE department_id IS NULL
+    """))
+    rebuild_headcounts(db)
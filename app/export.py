@@ -0,0 +1,179 @@
+"""
+Attendance exports for payroll - every record in a date range, with the
+employee's name and department, as CSV or Parquet and optionally gzipped.
+
+Exports are generators of byte chunks fed from a server-side cursor
+(yield_per), so a 10M row export needs the same memory as a 10k row one.
+GET /api/attendance/export streams the chunks as the response body and
+`python manage.py export` writes them to a file.
+
+Parquet needs pyarrow (in requirements.txt). It's still imported lazily, so a
+server installed without it keeps serving CSV and answers Parquet with a 501.
+"""
+import csv
+import io
+import zlib
+from datetime import date
+from typing import Iterable, Iterator, Optional
+from sqlalchemy import select
+from app import models
+from app.archive import attendance_source
+from app.database import read_session
+
+EXPORT_FIELDS = ["id", "date", "employee_id", "employee_name", "department", "status"]
+
+# Rows fetched per round trip from the server-side cursor (and per CSV chunk)
+EXPORT_BATCH_SIZE = 10000
+
+# Rows per Parquet row group - bigger groups compress better, smaller ones need less memory
+PARQUET_ROW_GROUP_SIZE = 100000
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def export_statement(start_date: date, end_date: date, department: Optional[str] = None):
+    # Archived years are exported too
+    attendance = attendance_source(start_date, end_date)
+    query = select(
+        attendance.c.id,
+        attendance.c.date,
+        attendance.c.employee_id,
+        models.Employee.full_name.label("employee_name"),
+        models.Employee.department,
+        attendance.c.status
+    ).select_from(attendance).join(
+        models.Employee, attendance.c.employee_id == models.Employee.employee_id
+    ).where(
+        attendance.c.date >= start_date,
+        attendance.c.date <= end_date
+    )
+    if department:
+        query = query.where(models.Employee.department == department)
+    return query.order_by(attendance.c.date, attendance.c.id)
+
+
+def _csv_chunks(batches: Iterable[list]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for rows in batches:
+        writer.writerows(
+            (row.id, row.date.isoformat(), row.employee_id, row.employee_name, row.department, row.status.value)
+            for row in rows
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    # Just the header if there were no rows
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file for pyarrow that hands back whatever was written since the last
+    drain(). It keeps counting for tell(), which the Parquet footer's offsets rely on."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _parquet_chunks(batches: Iterable[list]) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("date", pa.date32()),
+        ("employee_id", pa.string()),
+        ("employee_name", pa.string()),
+        ("department", pa.string()),
+        ("status", pa.string()),
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="snappy")
+
+    pending, pending_rows = [], 0
+    for rows in batches:
+        columns = list(zip(*rows))
+        columns[5] = [status.value for status in columns[5]]
+        pending.append(pa.record_batch(
+            [pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema
+        ))
+        pending_rows += len(rows)
+        # Each full row group goes out as soon as it's written
+        if pending_rows >= PARQUET_ROW_GROUP_SIZE:
+            writer.write_table(pa.Table.from_batches(pending, schema=schema))
+            pending, pending_rows = [], 0
+            yield sink.drain()
+
+    if pending:
+        writer.write_table(pa.Table.from_batches(pending, schema=schema))
+    writer.close()
+    yield sink.drain()
+
+
+def _gzip(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 writes a gzip header
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_attendance(
+    start_date: date,
+    end_date: date,
+    department: Optional[str] = None,
+    fmt: str = "csv",
+    compress: bool = False,
+    primary: bool = False
+) -> Iterator[bytes]:
+    """The export file as byte chunks. Opens its own session, since a streamed
+    response outlives the request's session - on a read replica if there are any,
+    unless primary=True."""
+    with read_session(primary) as db:
+        result = db.execute(
+            export_statement(start_date, end_date, department).execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        batches = result.partitions()
+        chunks = _parquet_chunks(batches) if fmt == "parquet" else _csv_chunks(batches)
+        if compress:
+            chunks = _gzip(chunks)
+        yield from chunks
+
+
+def export_filename(start_date: date, end_date: date, fmt: str, compress: bool) -> str:
+    return f"attendance_{start_date}_{end_date}.{fmt}" + (".gz" if compress else "")
+
+
+def export_media_type(fmt: str, compress: bool) -> str:
+    return "application/gzip" if compress else MEDIA_TYPES[fmt]
@@ -0,0 +1,106 @@
+"""
+HTTP caching for the read endpoints that frontends poll.
+
+A read route builds its ETag from version counters that the writes to its
+data already bump, on rows they update anyway in the same transaction:
+- EMPLOYEES is the sum of the departments' versions. Adding or removing an
+  employee changes their department's headcount, which bumps its version
+  (app/departments.py).
+- ATTENDANCE is the sum of one day's versions in the daily rollup, which
+  every attendance change updates (app/summary.py).
+
+So answering If-None-Match / If-Modified-Since with a 304 only costs reading
+a few small rows instead of the route's real queries, and no write has to
+lock one shared version row - writes for different departments or days
+don't wait for each other. The versions only ever go up, so a changed sum
+means changed data.
+
+Cache-Control is configurable per route (CACHE_CONTROL in settings) and
+defaults to "no-cache" - browsers keep the response but revalidate every
+time, which is exactly the cheap 304 path.
+"""
+import hashlib
+from datetime import date, datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import List, Optional, Tuple
+from fastapi import Request, Response, status
+from sqlalchemy import func, select
+from app.config import settings
+from app import models
+
+EMPLOYEES = "employees"
+ATTENDANCE = "attendance"
+
+departments_table = models.Department.__table__
+summary_table = models.DailyAttendanceSummary.__table__
+
+
+def employees_version(db) -> Tuple[int, Optional[datetime]]:
+    """Version and last change of the employee roster"""
+    return tuple(db.execute(
+        select(func.coalesce(func.sum(departments_table.c.version), 0), func.max(departments_table.c.updated_at))
+    ).one())
+
+
+def attendance_version(db, day: date) -> Tuple[int, Optional[datetime]]:
+    """Version and last change of one day's attendance"""
+    return tuple(db.execute(
+        select(func.coalesce(func.sum(summary_table.c.version), 0), func.max(summary_table.c.updated_at)).where(
+            summary_table.c.date == day
+        )
+    ).one())
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes - we always store UTC
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def _modified_since(request: Request, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(request.headers["if-modified-since"])
+    except (TypeError, ValueError):
+        return True
+    # HTTP dates only have second precision
+    return last_modified.replace(microsecond=0) > since
+
+
+def not_modified(db, request: Request, response: Response, route: str, tables: List[str], day: Optional[date] = None) -> Optional[Response]:
+    """Return a 304 response if the client's copy is still current, otherwise put
+    ETag / Last-Modified / Cache-Control on `response` and return None.
+    `day` is the day of attendance the route reads, for ATTENDANCE."""
+    versions = {}
+    if EMPLOYEES in tables:
+        versions[EMPLOYEES] = employees_version(db)
+    if ATTENDANCE in tables:
+        versions[ATTENDANCE] = attendance_version(db, day)
+
+    # The query string is part of the tag, since different filters/pages are different representations
+    seed = "|".join(
+        [route, str(request.url.query), day.isoformat() if day else ""] +
+        [f"{name}:{versions[name][0]}" for name in tables]
+    )
+    etag = f'W/"{hashlib.sha1(seed.encode()).hexdigest()[:20]}"'
+
+    headers = {
+        "ETag": etag,
+        "Cache-Control": settings.cache_control.get(route, settings.default_cache_control),
+    }
+    last_modified = max((_as_utc(updated_at) for _, updated_at in versions.values() if updated_at), default=None)
+    if last_modified:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+
+    # If-None-Match wins over If-Modified-Since when a client sends both
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        fresh = if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]
+    elif last_modified and "if-modified-since" in request.headers:
+        fresh = not _modified_since(request, last_modified)
+    else:
+        fresh = False
+
+    if fresh:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
+    return None
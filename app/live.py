@@ -0,0 +1,302 @@
+"""
+Live attendance updates for dashboards - GET /api/attendance/live.
+
+Dashboards used to poll /api/attendance/today/present-count. Instead they
+can keep one server-sent events stream open. It sends a `snapshot` of
+today's counts, then every change as it commits:
+
+    event: snapshot
+    data: {"date": "2026-10-17", "present_count": 41, "absent_count": 3, "total_employees": 50}
+
+    event: marked
+    data: {"record": {"id": 7, "employee_id": "EMP001", "date": "2026-10-17", "status": "Absent"},
+           "department": "Engineering", "delta": {"present": -1, "absent": 1}, "version": 12}
+
+`deleted` looks the same with negative deltas. Add a delta to the snapshot
+only if its record's date is the snapshot's date. Changes that don't come
+with a delta (bulk uploads, employees added or removed) send a fresh
+snapshot instead, and so does a stream that fell more than LIVE_QUEUE_SIZE
+events behind.
+
+A stream subscribes before its snapshot loads, so a change committed while
+the snapshot loads can be both in the snapshot and in the stream's queue.
+Every change bumps the version of its day and department's row in the daily
+rollup (app/summary.py) in its own transaction, and its event carries that
+version. The snapshot reads the rows' versions along with their counts, in
+one statement, so the stream skips the events whose version the snapshot
+has already reached - on every worker, in commit order, whichever way the
+events arrive.
+
+Writes call publish() (through db.run_sync in the async routes) before they
+commit. Nothing goes out unless the transaction commits:
+- by default the events wait in session.info and go to this worker's hub
+  after the commit. Each worker's streams only see that worker's writes.
+- with LIVE_UPDATES_NOTIFY=true (Postgres) they're sent with pg_notify in
+  the same transaction. Every worker LISTENs on one asyncpg connection and
+  passes them to its hub, so every stream sees every worker's writes.
+
+One hub per worker fans each event out to all of its streams. The streams
+run on the event loop, not the threadpool, and share any snapshot query
+that's already running, so thousands of open dashboards cost about as much
+as one.
+"""
+import asyncio
+import logging
+from datetime import date
+from typing import Awaitable, Callable, Dict, List, Optional
+import orjson
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+from app.config import settings
+from app import models
+
+logger = logging.getLogger("app.live")
+
+CHANNEL = "hrms_attendance"
+
+MARKED, DELETED, RESYNC, SNAPSHOT = "marked", "deleted", "resync", "snapshot"
+
+# Key of a loaded snapshot holding its rollup row versions, {department: version} -
+# read by the stream, not sent to the client
+VERSIONS = "versions"
+
+# pg_notify payloads must stay under 8000 bytes
+NOTIFY_PAYLOAD_BYTES = 7000
+
+# session.info key for events waiting for the commit
+PENDING = "live_events"
+
+
+def status_delta(old_status=None, new_status=None) -> Dict[str, int]:
+    delta = {"present": 0, "absent": 0}
+    for status, amount in ((old_status, -1), (new_status, 1)):
+        if status == models.AttendanceStatus.PRESENT:
+            delta["present"] += amount
+        elif status == models.AttendanceStatus.ABSENT:
+            delta["absent"] += amount
+    return delta
+
+
+def attendance_record(attendance) -> dict:
+    """The fields of an Attendance row that go in its events - the same as the mark response"""
+    return {"id": attendance.id, "employee_id": attendance.employee_id, "date": attendance.date, "status": attendance.status}
+
+
+def attendance_event(record: dict, department: str, old_status=None, new_status=None, version: Optional[int] = None) -> dict:
+    """A marked event (new_status) or a deleted one (no new_status) for an attendance record -
+    id, employee_id, date and status. version is the rollup row's version after the change."""
+    return {
+        "type": MARKED if new_status is not None else DELETED,
+        "record": record,
+        "department": department,
+        "delta": status_delta(old_status, new_status),
+        "version": version,
+    }
+
+
+def publish(db, events: List[dict]):
+    """Send events to the live streams when db's transaction commits (a sync Session)"""
+    if not events:
+        return
+    if settings.live_updates_notify:
+        for payload in notify_payloads(events):
+            db.execute(select(func.pg_notify(CHANNEL, payload)))
+    else:
+        # Makes sure a transaction has begun, so its rollback (not just a later commit) sees these
+        db.connection()
+        db.info.setdefault(PENDING, []).extend(events)
+
+
+def attendance_changed(db, record: dict, department: str, old_status=None, new_status=None, version: Optional[int] = None):
+    """publish() one record being marked or deleted - nothing if its status didn't change"""
+    if old_status != new_status:
+        publish(db, [attendance_event(record, department, old_status, new_status, version)])
+
+
+def already_counted(item: dict, snapshot: dict) -> bool:
+    """Whether a marked/deleted event's change is already in the snapshot's counts"""
+    if item.get("version") is None or str(item["record"]["date"]) != str(snapshot["date"]):
+        return False
+    return item["version"] <= snapshot.get(VERSIONS, {}).get(item["department"], 0)
+
+
+def counts_changed(db):
+    """Today's counts changed in a way we have no delta for - streams send a fresh snapshot"""
+    publish(db, [{"type": RESYNC}])
+
+
+def notify_payloads(events: List[dict]):
+    """JSON lists of events, each small enough for one NOTIFY"""
+    batch, size = [], 0
+    for item in events:
+        encoded = orjson.dumps(item)
+        if batch and size + len(encoded) > NOTIFY_PAYLOAD_BYTES:
+            yield (b"[" + b",".join(batch) + b"]").decode()
+            batch, size = [], 0
+        batch.append(encoded)
+        size += len(encoded) + 1
+    if batch:
+        yield (b"[" + b",".join(batch) + b"]").decode()
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed(session):
+    events = session.info.pop(PENDING, None)
+    if events:
+        hub.publish(events)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back(session):
+    session.info.pop(PENDING, None)
+
+
+class Subscriber:
+    """One open stream's queue of events"""
+
+    def __init__(self, department: Optional[str], size: int):
+        self.department = department
+        self.queue = asyncio.Queue(size)
+        self.lagged = False  # the queue filled up - it gets a fresh snapshot and starts over
+
+
+class LiveHub:
+    """Fans events out to this worker's open streams. publish() can be called from any thread,
+    the queues are only touched on the event loop."""
+
+    def __init__(self):
+        self.subscribers = set()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.events = 0
+        self.lagged = 0
+        # Events broadcast so far. A snapshot is only shared while this hasn't moved - a stream
+        # subscribing after an event never gets it, so it can't use a snapshot read before it.
+        self.sequence = 0
+        self._snapshots: Dict[tuple, asyncio.Future] = {}
+        self._listener: Optional[asyncio.Task] = None
+
+    def subscribe(self, department: Optional[str] = None) -> Subscriber:
+        self.loop = asyncio.get_running_loop()
+        subscriber = Subscriber(department, settings.live_queue_size)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+
+    def publish(self, events: List[dict]):
+        if self.subscribers and self.loop is not None:
+            self.loop.call_soon_threadsafe(self.broadcast, events)
+
+    def broadcast(self, events: List[dict]):
+        self.events += len(events)
+        self.sequence += len(events)
+        for subscriber in list(self.subscribers):
+            if subscriber.lagged:
+                continue
+            for item in events:
+                if item["type"] != RESYNC and subscriber.department not in (None, item["department"]):
+                    continue
+                try:
+                    subscriber.queue.put_nowait(item)
+                except asyncio.QueueFull:
+                    subscriber.lagged = True
+                    self.lagged += 1
+                    break
+
+    async def snapshot(self, department: Optional[str], load: Callable[[Optional[str]], Awaitable[dict]]) -> dict:
+        """load(department), shared with any stream already waiting for the same one"""
+        key = (self.sequence, date.today(), department)
+        pending = self._snapshots.get(key)
+        if pending is None:
+            pending = self._snapshots[key] = asyncio.ensure_future(load(department))
+            pending.add_done_callback(lambda _: self._snapshots.pop(key, None))
+        return await asyncio.shield(pending)
+
+    async def stream(self, subscriber: Subscriber, load: Callable[[Optional[str]], Awaitable[dict]]):
+        """The SSE body for one dashboard - subscribe before calling, so nothing committed
+        while the first snapshot loads is missed. Queued changes the snapshot already
+        counts are skipped."""
+        try:
+            snapshot = await self.snapshot(subscriber.department, load)
+            yield sse(SNAPSHOT, snapshot_body(snapshot))
+            while True:
+                try:
+                    item = await asyncio.wait_for(subscriber.queue.get(), settings.live_heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    item = None
+
+                resync = subscriber.lagged or (item is not None and item["type"] == RESYNC)
+                if snapshot["date"] != date.today():
+                    resync = True  # a new day, the counts start over
+                if resync:
+                    while not subscriber.queue.empty():
+                        subscriber.queue.get_nowait()
+                    subscriber.lagged = False
+                    snapshot = await self.snapshot(subscriber.department, load)
+                    yield sse(SNAPSHOT, snapshot_body(snapshot))
+                elif item is not None:
+                    if not already_counted(item, snapshot):
+                        yield sse(item["type"], item)
+                else:
+                    # Keeps proxies and load balancers from closing an idle stream
+                    yield b": keep-alive\n\n"
+        finally:
+            self.unsubscribe(subscriber)
+
+    def start_listener(self, database_url: str):
+        """LIVE_UPDATES_NOTIFY - receive every worker's events from Postgres"""
+        self._listener = asyncio.ensure_future(self._listen(database_url))
+
+    async def stop_listener(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+
+    async def _listen(self, database_url: str):
+        import asyncpg
+
+        scheme, rest = database_url.split("://", 1)
+        dsn = f"{scheme.split('+')[0]}://{rest}"  # asyncpg wants a plain postgresql:// URL
+        self.loop = asyncio.get_running_loop()
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(dsn)
+                closed = self.loop.create_future()
+                connection.add_termination_listener(lambda _: closed.done() or closed.set_result(None))
+                await connection.add_listener(CHANNEL, lambda _conn, _pid, _channel, payload: self.broadcast(orjson.loads(payload)))
+                # Anything sent while we weren't listening is lost, so every stream starts over
+                self.broadcast([{"type": RESYNC}])
+                await closed
+                logger.warning("Lost the LISTEN connection for live updates, reconnecting")
+                await asyncio.sleep(1)
+            except (OSError, asyncpg.PostgresError) as exc:
+                logger.warning("Can't LISTEN for live updates, retrying in 5s: %s", exc)
+                await asyncio.sleep(5)
+            finally:
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+
+    def stats(self) -> dict:
+        return {
+            "streams": len(self.subscribers),
+            "events": self.events,
+            "lagged_streams": self.lagged,
+            "notify": settings.live_updates_notify,
+            "listening": self._listener is not None and not self._listener.done(),
+        }
+
+
+def snapshot_body(snapshot: dict) -> dict:
+    return {key: value for key, value in snapshot.items() if key != VERSIONS}
+
+
+def sse(kind: str, data: dict) -> bytes:
+    return b"event: " + kind.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+hub = LiveHub()
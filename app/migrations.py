@@ -0,0 +1,114 @@
+"""
+Simple schema migrations.
+
+Base.metadata.create_all only creates tables that don't exist yet - it never
+adds indexes or constraints to tables that are already there. Every migration
+below is a list of idempotent SQL steps that brings an older database up to
+date with models.py. A step can also be a function taking the connection,
+for data backfills. Applied migrations are recorded in schema_migrations.
+
+A brand new database gets everything from create_all, so all migrations are
+just recorded as applied there.
+"""
+from sqlalchemy import Column, DateTime, MetaData, String, Table, func, inspect, select, text
+from app.database import Base
+from app import models  # noqa: F401 - registers the tables on Base.metadata
+from app import counters, departments, search, summary
+
+# Kept out of Base.metadata on purpose - this table belongs to the migration runner, not the app
+migration_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    migration_metadata,
+    Column("version", String, primary_key=True),
+    Column("applied_at", DateTime, server_default=func.now(), nullable=False),
+)
+
+
+# Databases created before the unique index may have duplicate rows for the same
+# employee and day - keep the newest one, same as the update-on-remark behaviour
+DEDUPE_ATTENDANCE = """
+DELETE FROM attendance
+WHERE EXISTS (
+    SELECT 1 FROM attendance newer
+    WHERE newer.employee_id = attendance.employee_id
+      AND newer.date = attendance.date
+      AND newer.id > attendance.id
+)
+"""
+
+def add_column(table: str, column: str, definition: str):
+    """Step that adds a column unless it's already there - SQLite has no ADD COLUMN IF NOT EXISTS"""
+    def step(conn):
+        if column not in {c["name"] for c in inspect(conn).get_columns(table)}:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {definition}"))
+    return step
+
+
+MIGRATIONS = [
+    ("0001_attendance_unique_employee_date", [
+        DEDUPE_ATTENDANCE,
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_attendance_employee_date ON attendance (employee_id, date)",
+    ]),
+    ("0002_attendance_date_status_index", [
+        "CREATE INDEX IF NOT EXISTS ix_attendance_date_status ON attendance (date, status)",
+    ]),
+    # The table itself comes from create_all, this fills it from the existing attendance
+    ("0003_daily_attendance_summary_backfill", [
+        summary.rebuild,
+    ]),
+    # pg_trgm and the employee search index - a no-op on SQLite
+    ("0004_employee_search_trigram_index", [
+        search.create_trigram_index,
+    ]),
+    # The departments table comes from create_all - add the column and fill both from the department names
+    ("0005_employee_departments", [
+        add_column("employees", "department_id", "INTEGER REFERENCES departments (id)"),
+        "CREATE INDEX IF NOT EXISTS ix_employees_department_id_id ON employees (department_id, id)",
+        departments.backfill,
+    ]),
+    # The table comes from create_all, this counts every employee's existing attendance into it
+    ("0006_employee_attendance_counters", [
+        counters.rebuild,
+    ]),
+    # ETags now come from versions on the rollup and department rows - the single
+    # table_versions row every write used to update is gone
+    ("0007_row_versions_for_etags", [
+        add_column("daily_attendance_summary", "version", "INTEGER NOT NULL DEFAULT 0"),
+        add_column("daily_attendance_summary", "updated_at", "TIMESTAMP"),
+        add_column("departments", "version", "INTEGER NOT NULL DEFAULT 0"),
+        add_column("departments", "updated_at", "TIMESTAMP"),
+        "DROP TABLE IF EXISTS table_versions",
+    ]),
+]
+
+
+def pending_migrations(bind):
+    """Versions that haven't been applied to this database yet"""
+    migration_metadata.create_all(bind)
+    with bind.connect() as conn:
+        applied = set(conn.execute(select(schema_migrations.c.version)).scalars())
+    return [version for version, _ in MIGRATIONS if version not in applied]
+
+
+def upgrade(bind):
+    """Create missing tables, then apply any pending migrations in order"""
+    fresh_database = not inspect(bind).has_table(models.Employee.__tablename__)
+    Base.metadata.create_all(bind)
+    pending = pending_migrations(bind)
+
+    for version, steps in MIGRATIONS:
+        if version not in pending:
+            continue
+        # Each migration runs in its own transaction so a failure leaves earlier ones applied
+        with bind.begin() as conn:
+            if not fresh_database:
+                for step in steps:
+                    if callable(step):
+                        step(conn)
+                    else:
+                        conn.execute(text(step))
+            conn.execute(schema_migrations.insert().values(version=version))
+
+    return pending
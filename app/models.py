@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Date, Enum, ForeignKey
+from sqlalchemy import Column, String, Integer, Date, DateTime, Enum, ForeignKey, Index, DDL, event, literal_column
 from sqlalchemy.orm import relationship
 from app.database import Base
 import enum
@@ -10,6 +10,24 @@ class AttendanceStatus(str, enum.Enum):
     ABSENT = "Absent"
 
 
+# What employee search matches against (app/search.py) - one lowercased string of the searchable fields.
+# Queries have to use exactly this expression for Postgres to use the trigram index on it.
+EMPLOYEE_SEARCH_TEXT = "lower(employee_id || ' ' || full_name || ' ' || email || ' ' || department)"
+
+
+class Department(Base):
+    """One row per department - employees reference it by id so department filters are indexed integer lookups"""
+    __tablename__ = "departments"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+    # Employees in the department - kept up to date by the employee routes (see app/departments.py)
+    headcount = Column(Integer, nullable=False, default=0)
+    # Bumped with the headcount - the employee listing ETags are built from these (see app/http_cache.py)
+    version = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime)  # UTC
+
+
 class Employee(Base):
     """Employee model - stores basic employee information"""
     __tablename__ = "employees"
@@ -18,12 +36,34 @@ class Employee(Base):
     employee_id = Column(String, unique=True, index=True, nullable=False)  # Like EMP001
     full_name = Column(String, nullable=False)
     email = Column(String, unique=True, index=True, nullable=False)
-    department = Column(String, nullable=False)
+    department = Column(String, nullable=False)  # the name, as the API shows it
+    department_id = Column(Integer, ForeignKey("departments.id"), nullable=True)  # only NULL before the 0005 backfill
     
     # Relationship: one employee has many attendance records
     # cascade="all, delete-orphan" means if we delete an employee, delete their attendance too
     attendance_records = relationship("Attendance", back_populates="employee", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Department filters - (department_id, id) also serves the listing's keyset pagination by id
+        Index("ix_employees_department_id_id", "department_id", "id"),
+        # Trigram index so search is an index scan for any substring - Postgres only,
+        # SQLite uses an in-process prefix index instead (see app/search.py)
+        Index(
+            "ix_employees_search_trgm",
+            literal_column(EMPLOYEE_SEARCH_TEXT).label("search_text"),
+            postgresql_using="gin",
+            postgresql_ops={"search_text": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
+
+
+# gin_trgm_ops comes from the pg_trgm extension, which has to exist before the index
+event.listen(
+    Employee.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
+
 
 class Attendance(Base):
     """Attendance model - tracks daily attendance for employees"""
@@ -36,3 +76,67 @@ class Attendance(Base):
     
     # Relationship back to employee
     employee = relationship("Employee", back_populates="attendance_records")
+
+    __table_args__ = (
+        # One record per employee per day - this is also the ON CONFLICT target for bulk upserts
+        Index("uq_attendance_employee_date", "employee_id", "date", unique=True),
+        # For per-day counts and date range scans (today's present count, date filters)
+        Index("ix_attendance_date_status", "date", "status"),
+    )
+
+
+class AttendanceArchive(Base):
+    """Attendance from closed years, moved out of the attendance table by `manage.py archive-attendance`
+    (see app/archive.py). Read-only - same columns, but no foreign key and only the two indexes reads need"""
+    __tablename__ = "attendance_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)  # the id it had in attendance
+    employee_id = Column(String, nullable=False)
+    date = Column(Date, nullable=False)
+    status = Column(Enum(AttendanceStatus), nullable=False)
+
+    __table_args__ = (
+        Index("ix_attendance_archive_employee_date", "employee_id", "date"),
+        Index("ix_attendance_archive_date", "date"),
+    )
+
+
+class ArchivedAttendanceYear(Base):
+    """One row per year moved out of the attendance table - archived years are read-only"""
+    __tablename__ = "archived_attendance_years"
+
+    year = Column(Integer, primary_key=True, autoincrement=False)
+    destination = Column(String, nullable=False)  # "table" (attendance_archive) or "parquet"
+    row_count = Column(Integer, nullable=False)
+    location = Column(String, nullable=True)  # the Parquet file, for "parquet"
+    archived_at = Column(DateTime, nullable=False)  # UTC
+
+
+class DailyAttendanceSummary(Base):
+    """Per day, per department attendance counts - kept up to date by the attendance and employee routes
+    so dashboards don't have to count raw attendance rows"""
+    __tablename__ = "daily_attendance_summary"
+
+    date = Column(Date, primary_key=True)
+    department = Column(String, primary_key=True)
+    present_count = Column(Integer, nullable=False, default=0)
+    absent_count = Column(Integer, nullable=False, default=0)
+    # Bumped with every change to the counts - the ETag of today's counts is built from these
+    version = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime)  # UTC
+
+
+class EmployeeAttendanceMonth(Base):
+    """Per employee, per month attendance counts - kept up to date by the attendance and employee
+    routes so profile totals and monthly reports don't count raw rows (see app/counters.py)"""
+    __tablename__ = "employee_attendance_months"
+
+    employee_id = Column(String, ForeignKey("employees.employee_id", ondelete="CASCADE"), primary_key=True)
+    month = Column(Date, primary_key=True)  # first day of the month
+    present_count = Column(Integer, nullable=False, default=0)
+    absent_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # The monthly report reads one month for every employee
+        Index("ix_employee_attendance_months_month", "month"),
+    )
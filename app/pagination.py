@@ -0,0 +1,99 @@
+"""
+Helpers for keyset (cursor) pagination and streamed listings.
+
+Cursors are opaque to clients - they're just the sort key of the last row
+on the page, JSON encoded and base64'd. The next page is fetched with
+WHERE (sort key) > cursor instead of OFFSET, so every page costs the same
+no matter how deep into the results the client is.
+"""
+import base64
+import csv
+import io
+import json
+from typing import Iterable, List, Optional
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+
+# Header that carries the cursor for the next page (absent on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Rows fetched per round trip from the server-side cursor when streaming
+STREAM_BATCH_SIZE = 1000
+
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps([str(value) for value in values]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: str, size: int) -> List[str]:
+    """Decode a cursor into its `size` key values, or 400 if it's been tampered with"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        # encode_cursor only ever writes strings - anything else wasn't issued by us
+        if isinstance(values, list) and len(values) == size and all(isinstance(value, str) for value in values):
+            return values
+    except ValueError:
+        pass
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Invalid pagination cursor"
+    )
+
+
+def trim_page(rows: list, limit: int, response, cursor_key) -> list:
+    """Rows were fetched with limit + 1 - if the extra row came back there's another page,
+    so drop it and put the cursor for the last row into the response header"""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*cursor_key(rows[-1]))
+    return rows
+
+
+def _json_value(value):
+    # Enums -> their value, dates -> ISO strings; everything else is already JSON friendly
+    if hasattr(value, "value"):
+        return value.value
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def stream_rows(rows: Iterable[dict], fmt: str, fieldnames: List[str], filename: Optional[str] = None) -> StreamingResponse:
+    """Stream dict rows as NDJSON or CSV, flushing a chunk every STREAM_BATCH_SIZE rows"""
+
+    def generate_ndjson():
+        chunk = []
+        for row in rows:
+            chunk.append(json.dumps({key: _json_value(row[key]) for key in fieldnames}))
+            if len(chunk) >= STREAM_BATCH_SIZE:
+                yield "\n".join(chunk) + "\n"
+                chunk = []
+        if chunk:
+            yield "\n".join(chunk) + "\n"
+
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(fieldnames)
+        count = 0
+        for row in rows:
+            writer.writerow([_json_value(row[key]) for key in fieldnames])
+            count += 1
+            if count % STREAM_BATCH_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    headers = {}
+    if filename:
+        headers["Content-Disposition"] = f'attachment; filename="{filename}.{fmt}"'
+
+    generator = generate_csv() if fmt == "csv" else generate_ndjson()
+    return StreamingResponse(generator, media_type=STREAM_MEDIA_TYPES[fmt], headers=headers)
@@ -0,0 +1,159 @@
+"""
+Monthly range partitioning of the attendance table on date - Postgres only,
+turned on with ATTENDANCE_PARTITIONING=true.
+
+With partitions, a date range query (today's attendance, a month's report,
+an export) only scans the partitions for those months, and dropping a closed
+year (app/archive.py) is detaching and dropping twelve tables instead of a
+huge DELETE.
+
+`manage.py migrate` converts the table the first time it runs with the
+setting on, and tops up partitions on every run after that. Converting
+copies every attendance row, and the table is locked while it runs, so do
+it outside of peak hours like the index migrations. A brand new database
+converts instantly.
+
+Partitions are named attendance_YYYY_MM. `manage.py maintain-partitions`
+keeps ATTENDANCE_PARTITIONS_AHEAD months ready ahead of today - run it
+monthly from cron. Rows for a month without a partition (a missed cron run,
+a backfill from long ago) land in attendance_default, so writes never fail.
+The next maintenance run moves them into their month's partition.
+
+Postgres requires the primary key of a partitioned table to include the
+partition column, so it becomes (id, date) on the table. id is still unique,
+it comes from the same sequence as before. Looking a record up by id alone
+(updating or deleting one) checks the id index of every partition, which is
+still an index lookup per partition.
+"""
+from datetime import date
+from typing import List, Optional
+from sqlalchemy import text
+from app.config import settings
+from app import models
+
+ATTENDANCE = models.Attendance.__tablename__
+DEFAULT_PARTITION = f"{ATTENDANCE}_default"
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{ATTENDANCE}_{month.year:04d}_{month.month:02d}"
+
+
+def is_partitioned(conn) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    return conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"
+    ), {"table": ATTENDANCE}).first() is not None
+
+
+def partition_names(conn) -> List[str]:
+    return list(conn.execute(text("""
+        SELECT child.relname FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = to_regclass(:table)
+    """), {"table": ATTENDANCE}).scalars())
+
+
+def create_partition(conn, month: date) -> bool:
+    """Create the partition for one month, moving its rows out of the default partition.
+    Returns False if it already exists."""
+    name = partition_name(month)
+    if name in partition_names(conn):
+        return False
+    start, end = month.isoformat(), add_months(month, 1).isoformat()
+    # Built outside the table and attached, since CREATE ... PARTITION OF fails
+    # while the default partition still holds rows for the month
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {ATTENDANCE} INCLUDING DEFAULTS)"))
+    conn.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM {DEFAULT_PARTITION} WHERE date >= '{start}' AND date < '{end}'
+            RETURNING id, employee_id, date, status
+        )
+        INSERT INTO {name} (id, employee_id, date, status) SELECT id, employee_id, date, status FROM moved
+    """))
+    conn.execute(text(f"ALTER TABLE {ATTENDANCE} ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')"))
+    return True
+
+
+def maintain(conn, today: Optional[date] = None, ahead: Optional[int] = None) -> List[str]:
+    """Make sure this month and the next `ahead` months have partitions, and give any
+    month with rows stuck in the default partition its own. Returns the partitions created."""
+    today = today or date.today()
+    ahead = settings.attendance_partitions_ahead if ahead is None else ahead
+    months = {add_months(month_start(today), offset) for offset in range(ahead + 1)}
+    months.update(
+        month_start(day) for day in conn.execute(text(f"SELECT DISTINCT date FROM {DEFAULT_PARTITION}")).scalars()
+    )
+    return [partition_name(month) for month in sorted(months) if create_partition(conn, month)]
+
+
+def partition_table(conn) -> List[str]:
+    """Turn the plain attendance table into a partitioned one, keeping every row and id.
+    Returns the partitions created."""
+    old = f"{ATTENDANCE}_unpartitioned"
+    sequence = conn.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": ATTENDANCE}).scalar()
+
+    conn.execute(text(f"ALTER TABLE {ATTENDANCE} RENAME TO {old}"))
+    # Free up the index names for the new table
+    for (index,) in conn.execute(text("SELECT indexname FROM pg_indexes WHERE tablename = :table"), {"table": old}).all():
+        conn.execute(text(f'ALTER INDEX "{index}" RENAME TO "{index[:50]}_unpartitioned"'))
+
+    conn.execute(text(f"""
+        CREATE TABLE {ATTENDANCE} (
+            LIKE {old} INCLUDING DEFAULTS,
+            PRIMARY KEY (id, date),
+            FOREIGN KEY (employee_id) REFERENCES employees (employee_id) ON DELETE CASCADE
+        ) PARTITION BY RANGE (date)
+    """))
+    for index in models.Attendance.__table__.indexes:
+        index.create(conn)
+    conn.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {ATTENDANCE} DEFAULT"))
+
+    # Partitions for every month that has data, so the copy goes straight to them
+    first, last = conn.execute(text(f"SELECT min(date), max(date) FROM {old}")).one()
+    created = []
+    if first:
+        month = month_start(first)
+        while month <= last:
+            create_partition(conn, month)
+            created.append(partition_name(month))
+            month = add_months(month, 1)
+
+    conn.execute(text(f"""
+        INSERT INTO {ATTENDANCE} (id, employee_id, date, status) SELECT id, employee_id, date, status FROM {old}
+    """))
+    if sequence:
+        # The sequence belongs to the old table's column and would be dropped with it
+        conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {ATTENDANCE}.id"))
+    conn.execute(text(f"DROP TABLE {old}"))
+    return created + [name for name in maintain(conn) if name not in created]
+
+
+def setup(bind) -> List[str]:
+    """What `manage.py migrate` runs with ATTENDANCE_PARTITIONING on - partition the
+    table if it isn't yet, then top up partitions. Returns the partitions created."""
+    with bind.begin() as conn:
+        if is_partitioned(conn):
+            return maintain(conn)
+        return partition_table(conn)
+
+
+def drop_year(conn, year: int):
+    """Remove a year's rows by dropping its partitions - for the archive job, once they're copied"""
+    names = set(partition_names(conn))
+    for month in range(1, 13):
+        name = partition_name(date(year, month, 1))
+        if name in names:
+            conn.execute(text(f"ALTER TABLE {ATTENDANCE} DETACH PARTITION {name}"))
+            conn.execute(text(f"DROP TABLE {name}"))
+    conn.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE date >= '{year:04d}-01-01' AND date < '{year + 1:04d}-01-01'"))
@@ -0,0 +1,132 @@
+"""
+Connection pool configuration and metrics.
+
+The pools are the normal SQLAlchemy QueuePools, sized from Settings, with one
+addition: they time how long each checkout waits for a free connection, so
+/internal/pool can show whether a worker's pool is too small.
+"""
+import os
+import threading
+import time
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from app.config import settings
+
+
+class PoolWaitStats:
+    """Running totals of checkout waits for one pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, waited: float, timed_out: bool = False):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+            if timed_out:
+                self.timeouts += 1
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            average = self.total_wait / self.checkouts if self.checkouts else 0.0
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(average * 1000, 3),
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+            }
+
+
+class _WaitTimingMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def _do_get(self):
+        # _do_get is where QueuePool blocks when every connection is checked out
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.wait_stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.wait_stats.record(time.perf_counter() - start)
+        return connection
+
+
+class TimedQueuePool(_WaitTimingMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_WaitTimingMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def worker_count() -> int:
+    """How many worker processes gunicorn.conf.py starts - WEB_CONCURRENCY, or one per CPU core"""
+    return settings.web_concurrency or os.cpu_count() or 1
+
+
+def pool_sizes() -> tuple:
+    """(pool_size, max_overflow) for one worker's pool.
+
+    With DB_MAX_CONNECTIONS set, each worker gets an even share of it, so adding
+    workers never pushes the database past its connection limit. In async mode a
+    worker has two pools (psycopg2 and asyncpg) and they split the share."""
+    if not settings.db_max_connections:
+        return settings.db_pool_size, settings.db_max_overflow
+    pools = worker_count() * (2 if settings.database_mode == "async" else 1)
+    share = max(1, settings.db_max_connections // pools)
+    pool_size = min(settings.db_pool_size, share)
+    return pool_size, min(settings.db_max_overflow, share - pool_size)
+
+
+def engine_options(url: str, is_async: bool = False) -> dict:
+    """Keyword arguments for create_engine / create_async_engine based on the pool settings"""
+    if url.startswith("sqlite"):
+        # SQLite picks its own pool classes and has no statement timeout
+        return {}
+
+    pool_size, max_overflow = pool_sizes()
+    options = {
+        "poolclass": TimedAsyncQueuePool if is_async else TimedQueuePool,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+    if settings.db_statement_timeout_ms:
+        # Postgres cancels any statement running longer than this
+        if is_async:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(settings.db_statement_timeout_ms)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={settings.db_statement_timeout_ms}"}
+
+    return options
+
+
+def pool_status(engine) -> dict:
+    """Current checkout numbers plus wait stats for an engine's pool"""
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {"pool": type(pool).__name__, "status": pool.status()}
+
+    status = {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": pool._max_overflow,
+        "timeout_seconds": pool.timeout(),
+    }
+    if isinstance(pool, _WaitTimingMixin):
+        status.update(pool.wait_stats.as_dict())
+    return status
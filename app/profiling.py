@@ -0,0 +1,229 @@
+"""
+Opt-in request profiling (PROFILING_ENABLED=true).
+
+For every request we record:
+- handler time - the route function itself, including its queries
+- SQL statements run and their total time (engine cursor events)
+- serialization time - from the route function returning to the response starting
+  (response_model validation, jsonable_encoder and JSON rendering)
+
+Each response gets a Server-Timing header with these, so they show up in the
+browser's network tab, and they're aggregated into Prometheus histograms
+served from /metrics. Metrics are per worker process - Prometheus should
+scrape every worker, or sum them up.
+
+Independently, SLOW_QUERY_MS > 0 logs every statement slower than that to the
+"app.sql.slow" logger along with the route it came from.
+"""
+import asyncio
+import functools
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from app.config import settings
+
+slow_query_logger = logging.getLogger("app.sql.slow")
+
+
+class RequestProfile:
+    __slots__ = ("started", "route", "handler_seconds", "handler_done", "query_count", "query_seconds")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.route = None
+        self.handler_seconds = 0.0
+        self.handler_done = None
+        self.query_count = 0
+        self.query_seconds = 0.0
+
+
+# Profile of the request being handled. Starlette copies the context into the
+# threadpool, so sync route functions and their queries see the same object.
+current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("current_profile", default=None)
+
+
+# --- SQL timing -------------------------------------------------------------
+
+# Start times are keyed by cursor, so a statement that fails (and never gets
+# after_cursor_execute) can't leave its start time behind for the next one
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", {})[id(cursor)] = time.perf_counter()
+
+
+def _handle_error(exception_context):
+    # ExceptionContext.cursor is never filled in - the execution context has the same cursor
+    cursor = getattr(exception_context.execution_context, "cursor", None)
+    if exception_context.connection is not None and cursor is not None:
+        exception_context.connection.info.get("query_started", {}).pop(id(cursor), None)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop(id(cursor))
+    profile = current_profile.get()
+    if profile is not None:
+        profile.query_count += 1
+        profile.query_seconds += elapsed
+
+    if settings.slow_query_ms and elapsed * 1000 >= settings.slow_query_ms:
+        slow_query_logger.warning(
+            "slow query (%.1f ms) on %s: %s",
+            elapsed * 1000,
+            profile.route if profile and profile.route else "-",
+            " ".join(statement.split())[:1000]
+        )
+
+
+def instrument_engine(engine):
+    """Time every statement on this (sync) engine - only if profiling or the slow query log is on"""
+    if settings.profiling_enabled or settings.slow_query_ms:
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+# --- Handler timing ---------------------------------------------------------
+
+def _timed_endpoint(call, route_name: str):
+    def finish(profile, started):
+        now = time.perf_counter()
+        profile.handler_seconds = now - started
+        profile.handler_done = now
+
+    if asyncio.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def timed(*args, **kwargs):
+            profile = current_profile.get()
+            if profile is None:
+                return await call(*args, **kwargs)
+            profile.route = route_name
+            started = time.perf_counter()
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                finish(profile, started)
+    else:
+        @functools.wraps(call)
+        def timed(*args, **kwargs):
+            profile = current_profile.get()
+            if profile is None:
+                return call(*args, **kwargs)
+            profile.route = route_name
+            started = time.perf_counter()
+            try:
+                return call(*args, **kwargs)
+            finally:
+                finish(profile, started)
+    return timed
+
+
+def instrument_routes(app):
+    """Wrap every route function so we know its handler time and route template.
+    Call this after all routers are included."""
+    for route in app.routes:
+        if isinstance(route, APIRoute) and route.dependant.call is not None:
+            method = sorted(route.methods)[0]
+            route.dependant.call = _timed_endpoint(route.dependant.call, f"{method} {route.path}")
+
+
+# --- Prometheus histograms --------------------------------------------------
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+
+class Histogram:
+    def __init__(self, name: str, description: str, buckets: Tuple[float, ...]):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self._series: Dict[Tuple[str, str], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, str], value: float):
+        with self._lock:
+            # One counter per bucket, then sum and count
+            series = self._series.setdefault(labels, [0.0] * (len(self.buckets) + 2))
+            for i, upper in enumerate(self.buckets):
+                if value <= upper:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for (method, route), values in sorted(series.items()):
+            label = f'method="{method}",route="{route}"'
+            for upper, count in zip(self.buckets, values):
+                lines.append(f'{self.name}_bucket{{{label},le="{upper}"}} {count:g}')
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {values[-1]:g}')
+            lines.append(f"{self.name}_sum{{{label}}} {values[-2]:.6f}")
+            lines.append(f"{self.name}_count{{{label}}} {values[-1]:g}")
+        return lines
+
+
+request_seconds = Histogram("hrms_request_duration_seconds", "Time until the response started", LATENCY_BUCKETS)
+handler_seconds = Histogram("hrms_request_handler_seconds", "Time spent in the route function", LATENCY_BUCKETS)
+serialize_seconds = Histogram("hrms_request_serialize_seconds", "Time spent validating and rendering the response", LATENCY_BUCKETS)
+db_seconds = Histogram("hrms_request_db_seconds", "Time spent running SQL statements", LATENCY_BUCKETS)
+db_queries = Histogram("hrms_request_db_queries", "SQL statements run per request", QUERY_COUNT_BUCKETS)
+
+HISTOGRAMS = [request_seconds, handler_seconds, serialize_seconds, db_seconds, db_queries]
+
+
+def render_metrics() -> str:
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    return "\n".join(lines) + "\n"
+
+
+# --- Middleware -------------------------------------------------------------
+
+class ProfilingMiddleware:
+    """Plain ASGI middleware (BaseHTTPMiddleware would add its own overhead to what we measure)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        profile = RequestProfile()
+        token = current_profile.set(profile)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                now = time.perf_counter()
+                total = now - profile.started
+                serialize = now - profile.handler_done if profile.handler_done else 0.0
+
+                timing = (
+                    f'total;dur={total * 1000:.2f}, '
+                    f'handler;dur={profile.handler_seconds * 1000:.2f}, '
+                    f'db;dur={profile.query_seconds * 1000:.2f};desc="{profile.query_count} queries", '
+                    f'serialize;dur={serialize * 1000:.2f}'
+                )
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"server-timing", timing.encode())]
+
+                # Unmatched paths share one label so random URLs can't blow up the series count
+                method, _, route = (profile.route or f'{scope["method"]} unmatched').partition(" ")
+                labels = (method, route)
+                request_seconds.observe(labels, total)
+                handler_seconds.observe(labels, profile.handler_seconds)
+                serialize_seconds.observe(labels, serialize)
+                db_seconds.observe(labels, profile.query_seconds)
+                db_queries.observe(labels, profile.query_count)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_profile.reset(token)
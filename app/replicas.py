@@ -0,0 +1,146 @@
+"""
+Read replicas for the GET routes.
+
+DATABASE_READ_URLS lists replicas of DATABASE_URL (e.g. Postgres streaming
+replicas). Routes that only read take their session from get_read_db
+(app/database.py) instead of get_db, and each request gets a connection to
+the next replica in turn. Writes, and routes that read before they write,
+stay on the primary.
+
+A replica that fails to connect is skipped for DATABASE_READ_RETRY_SECONDS
+and its reads go to the next one - or to the primary once none are left, so
+a replica outage never fails a read.
+
+Replicas lag the primary a little, so a client could mark attendance and
+not see it in the listing it loads straight after. Every successful write
+(POST/PUT/PATCH/DELETE) sets a short-lived cookie, and requests carrying it
+read from the primary for READ_YOUR_WRITES_SECONDS (0 = off). Clients that
+don't keep cookies just read from the replicas.
+"""
+import logging
+import math
+import time
+from itertools import count
+from typing import List
+from sqlalchemy.exc import DBAPIError
+from app.pool import pool_status
+
+logger = logging.getLogger("app.replicas")
+
+# Unix time until which the client reads from the primary
+STICKY_COOKIE = "hrms_read_primary_until"
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+# A replica that's down can fail in the driver (psycopg2 wraps it, asyncpg raises OSError)
+CONNECT_ERRORS = (DBAPIError, OSError)
+
+
+class Replica:
+    def __init__(self, engine):
+        self.engine = engine  # Engine, or AsyncEngine for the async replica set
+        self.down_until = 0.0  # time.monotonic() it gets tried again after failing
+        self.failures = 0
+        self.reads = 0
+
+    @property
+    def name(self) -> str:
+        return self.engine.url.render_as_string(hide_password=True)
+
+
+class ReplicaSet:
+    """Hands out connections to the replicas round-robin, skipping the ones that just failed"""
+
+    def __init__(self, engines: list, retry_seconds: float):
+        self.replicas = [Replica(engine) for engine in engines]
+        self.retry_seconds = retry_seconds
+        self._turn = count()  # next() on a count is atomic, so threads don't need a lock
+
+    def __bool__(self):
+        return bool(self.replicas)
+
+    def candidates(self) -> List[Replica]:
+        """The replicas that are up, starting with the one whose turn it is"""
+        if not self.replicas:
+            return []
+        start = next(self._turn) % len(self.replicas)
+        now = time.monotonic()
+        return [replica for replica in self.replicas[start:] + self.replicas[:start] if replica.down_until <= now]
+
+    def mark_down(self, replica: Replica, error: Exception):
+        replica.failures += 1
+        replica.down_until = time.monotonic() + self.retry_seconds
+        logger.warning("Read replica %s is unavailable, skipping it for %gs: %s", replica.name, self.retry_seconds, error)
+
+    def connect(self):
+        """A Connection to the next replica that's up, or None to read from the primary"""
+        for replica in self.candidates():
+            try:
+                connection = replica.engine.connect()
+            except CONNECT_ERRORS as exc:
+                self.mark_down(replica, exc)
+                continue
+            replica.reads += 1
+            return connection
+        return None
+
+    async def connect_async(self):
+        """connect() for a set of AsyncEngines - an AsyncConnection or None"""
+        for replica in self.candidates():
+            try:
+                connection = await replica.engine.connect()
+            except CONNECT_ERRORS as exc:
+                self.mark_down(replica, exc)
+                continue
+            replica.reads += 1
+            return connection
+        return None
+
+    def engines(self) -> list:
+        return [replica.engine for replica in self.replicas]
+
+    def stats(self) -> List[dict]:
+        now = time.monotonic()
+        return [
+            {
+                "replica": replica.name,
+                "up": replica.down_until <= now,
+                "retry_in_seconds": round(max(replica.down_until - now, 0), 1),
+                "failures": replica.failures,
+                "reads": replica.reads,
+                "pool": pool_status(getattr(replica.engine, "sync_engine", replica.engine)),
+            }
+            for replica in self.replicas
+        ]
+
+
+def sticky_to_primary(request) -> bool:
+    """Whether this client wrote recently enough that it should read its writes from the primary"""
+    try:
+        return float(request.cookies.get(STICKY_COOKIE)) > time.time()
+    except (TypeError, ValueError):
+        return False
+
+
+class ReadYourWritesMiddleware:
+    """Sets the sticky cookie on every successful write.
+    Plain ASGI like ProfilingMiddleware, so reads don't pay for it."""
+
+    def __init__(self, app, seconds: float):
+        self.app = app
+        self.seconds = seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in WRITE_METHODS:
+            return await self.app(scope, receive, send)
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                cookie = (
+                    f"{STICKY_COOKIE}={time.time() + self.seconds:.3f}; Max-Age={math.ceil(self.seconds)}; "
+                    f"Path=/; HttpOnly; SameSite=Lax"
+                )
+                message["headers"] = list(message.get("headers", [])) + [(b"set-cookie", cookie.encode())]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
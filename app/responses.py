@@ -0,0 +1,34 @@
+"""
+Fast JSON path for the big list endpoints.
+
+FastAPI validates whatever a route returns against its response_model before
+encoding it. For a 100k row listing that's 100k Pydantic models built just to
+be turned back into dicts. The listings already SELECT exactly the
+response_model's columns, so they hand the rows straight to orjson instead.
+The response_model stays on the route for the OpenAPI docs.
+
+Only use this where the query's columns match the response_model field for
+field - nothing checks the output any more.
+"""
+from typing import Optional
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+
+# Describe the body, so they come from the rendered JSON, not the Response a route was given
+BODY_HEADERS = {b"content-length", b"content-type"}
+
+
+def rows_response(rows, response: Optional[Response] = None) -> ORJSONResponse:
+    """JSON array of SQL rows, keeping headers (X-Next-Cursor, ETag...) already set on `response`"""
+    # zip with the column names is about twice as fast as Row._asdict(),
+    # and orjson handles the dates and enums in these rows natively
+    fields = rows[0]._fields if rows else ()
+    content = [dict(zip(fields, row)) for row in rows]
+    rendered = ORJSONResponse(content)
+    if response is not None:
+        # The raw list, so repeated headers like Set-Cookie all survive - but not
+        # the empty Response's own content-length, which would contradict ours
+        rendered.raw_headers.extend(
+            (name, value) for name, value in response.raw_headers if name not in BODY_HEADERS
+        )
+    return rendered
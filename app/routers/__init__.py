@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+
+
+def with_async_routes(sync_router: APIRouter, async_router: APIRouter) -> APIRouter:
+    """The sync router's routes, in the same order, with each one that the async router
+    also defines (same path and methods) swapped for the async version.
+
+    Keeping the sync order matters - a fixed path declared before a /{param} path
+    in the sync router has to keep matching first."""
+    async_routes = {(route.path, frozenset(route.methods)): route for route in async_router.routes}
+    merged = APIRouter()
+    for route in sync_router.routes:
+        merged.routes.append(async_routes.get((route.path, frozenset(route.methods)), route))
+    return merged
@@ -0,0 +1,65 @@
+"""
+Async versions of the hot attendance routes, used when DATABASE_MODE=async.
+
+Same paths, parameters and responses as attendance.py - each handler runs
+the shared function from attendance.py through db.run_sync, the same way
+async_employees.py does. Bulk uploads, reports and stats aren't duplicated
+here - they keep running from attendance.py on the sync engine.
+"""
+from fastapi import APIRouter, Depends, status, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import date
+from app.database import get_async_db, get_async_read_db
+from app import schemas
+from app.routers.attendance import (
+    MAX_PAGE_SIZE, delete_attendance_record, list_attendance, load_employee_attendance, save_attendance,
+    today_present_count
+)
+
+router = APIRouter(prefix="/api/attendance", tags=["attendance"])
+
+
+@router.post("/", response_model=schemas.Attendance, status_code=status.HTTP_201_CREATED)
+async def mark_attendance(attendance: schemas.AttendanceCreate, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(save_attendance, attendance)
+
+
+@router.get("/", response_model=List[schemas.AttendanceWithEmployee])
+async def get_all_attendance(
+    request: Request,
+    response: Response,
+    date_filter: Optional[date] = Query(None, description="Filter by specific date"),
+    employee_id: Optional[str] = Query(None, description="Filter by employee ID"),
+    start_date: Optional[date] = Query(None, description="Filter by start date (use with end_date for range)"),
+    end_date: Optional[date] = Query(None, description="Filter by end date (use with start_date for range)"),
+    department: Optional[str] = Query(None, description="Only employees in this department"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size - the next page's cursor is returned in the X-Next-Cursor header"),
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    output_format: str = Query("json", alias="format", pattern="^(json|ndjson|csv)$", description="json, or stream the results as ndjson/csv"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    return await db.run_sync(
+        list_attendance, request, response, date_filter, employee_id, start_date, end_date, department, limit, cursor, output_format
+    )
+
+
+@router.get("/{employee_id}", response_model=List[schemas.Attendance])
+async def get_employee_attendance(employee_id: str, db: AsyncSession = Depends(get_async_read_db)):
+    return await db.run_sync(load_employee_attendance, employee_id)
+
+
+@router.delete("/{attendance_id}", response_model=schemas.MessageResponse)
+async def delete_attendance(attendance_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(delete_attendance_record, attendance_id)
+
+
+@router.get("/today/present-count", response_model=schemas.TodayPresentCountResponse)
+async def get_today_present_count(
+    request: Request,
+    response: Response,
+    department: Optional[str] = Query(None, description="Only count employees in this department"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Get count of present and absent employees for today"""
+    return await db.run_sync(today_present_count, request, response, department)
@@ -0,0 +1,65 @@
+"""
+Async versions of the employee routes, used when DATABASE_MODE=async.
+
+Same paths, parameters and responses as employees.py, but they run on the
+event loop with an AsyncSession (asyncpg) instead of holding a threadpool
+thread for every request. main.py swaps these in for the matching sync
+routes - anything not defined here is still served by employees.py.
+
+The handlers don't repeat the sync routes' logic: each one hands the shared
+function from employees.py to db.run_sync, which runs it against the
+AsyncSession's sync facade with every query still awaited on the event loop.
+"""
+from fastapi import APIRouter, Depends, status, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import date
+from app.database import get_async_db, get_async_read_db
+from app import schemas
+from app.routers.employees import (
+    DEFAULT_RECENT_RECORDS, MAX_PAGE_SIZE, MAX_RECENT_RECORDS, count_employees, create_employee_record,
+    delete_employee_record, list_employees, load_employee_profile
+)
+
+router = APIRouter(prefix="/api/employees", tags=["employees"])
+
+
+@router.post("/", response_model=schemas.Employee, status_code=status.HTTP_201_CREATED)
+async def create_employee(employee: schemas.EmployeeCreate, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(create_employee_record, employee)
+
+
+@router.get("/", response_model=List[schemas.Employee])
+async def get_all_employees(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size - the next page's cursor is returned in the X-Next-Cursor header"),
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    department: Optional[str] = Query(None, description="Only employees in this department"),
+    output_format: str = Query("json", alias="format", pattern="^(json|ndjson|csv)$", description="json, or stream the results as ndjson/csv"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    # Streams (format=ndjson/csv) still use their own sync session from a worker thread
+    return await db.run_sync(list_employees, request, response, limit, cursor, department, output_format)
+
+
+@router.get("/{employee_id}", response_model=schemas.EmployeeWithAttendance)
+async def get_employee(
+    employee_id: str,
+    records_limit: int = Query(DEFAULT_RECENT_RECORDS, ge=0, le=MAX_RECENT_RECORDS, description="How many of the most recent attendance records to include"),
+    start_date: Optional[date] = Query(None, description="Only include attendance records from this date"),
+    end_date: Optional[date] = Query(None, description="Only include attendance records up to this date"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    return await db.run_sync(load_employee_profile, employee_id, records_limit, start_date, end_date)
+
+
+@router.delete("/{employee_id}", response_model=schemas.MessageResponse)
+async def delete_employee(employee_id: str, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(delete_employee_record, employee_id)
+
+
+@router.get("/stats/count", response_model=schemas.EmployeeCountResponse)
+async def get_employees_count(request: Request, response: Response, db: AsyncSession = Depends(get_async_read_db)):
+    """Get total count of employees in the system"""
+    return await db.run_sync(count_employees, request, response)
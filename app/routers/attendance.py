@@ -1,20 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Path, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import func, extract, tuple_, case, and_, select, cast, Date, Float, Numeric
 from typing import List, Optional
 from datetime import date, datetime
-from app.database import get_db
-from app import models, schemas
+from app.database import get_db, get_read_db, dialect_insert, read_session
+from app import models, schemas, summary, counters, http_cache, export, departments, archive, write_behind, replicas, live
+from app.cache import employee_cache
+from app.responses import rows_response
+from app.pagination import STREAM_BATCH_SIZE, decode_cursor, stream_rows, trim_page
+from app.uploads import InvalidRecord, iter_ndjson, validation_detail
 
 router = APIRouter(prefix="/api/attendance", tags=["attendance"])
 
 
-@router.post("/", response_model=schemas.Attendance, status_code=status.HTTP_201_CREATED)
-def mark_attendance(attendance: schemas.AttendanceCreate, db: Session = Depends(get_db)):
-    # First, make sure the employee actually exists
-    employee = db.query(models.Employee).filter(
-        models.Employee.employee_id == attendance.employee_id
-    ).first()
+# The handlers' work lives in plain functions taking a sync Session, so the
+# async routes (async_attendance.py) run the same code through db.run_sync
+
+def save_attendance(db: Session, attendance: schemas.AttendanceCreate) -> models.Attendance:
+    # First, make sure the employee actually exists (usually answered by the employee cache)
+    employee = employee_cache.get(db, attendance.employee_id)
     
     if not employee:
         raise HTTPException(
@@ -22,6 +30,12 @@ def mark_attendance(attendance: schemas.AttendanceCreate, db: Session = Depends(
             detail=f"Employee with ID '{attendance.employee_id}' not found"
         )
     
+    if archive.archived_years(db, [attendance.date]):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=archive.archived_year_detail(attendance.date.year)
+        )
+    
     # Check if attendance was already marked for this date
     existing_attendance = db.query(models.Attendance).filter(
         models.Attendance.employee_id == attendance.employee_id,
@@ -30,6 +44,18 @@ def mark_attendance(attendance: schemas.AttendanceCreate, db: Session = Depends(
     
     if existing_attendance:
         # Update instead of creating duplicate - this is intentional behavior
+        version = summary.record_change(
+            db, attendance.date, employee.department,
+            old_status=existing_attendance.status, new_status=attendance.status
+        )
+        counters.record_change(
+            db, attendance.employee_id, attendance.date,
+            old_status=existing_attendance.status, new_status=attendance.status
+        )
+        live.attendance_changed(
+            db, {**live.attendance_record(existing_attendance), "status": attendance.status}, employee.department,
+            old_status=existing_attendance.status, new_status=attendance.status, version=version
+        )
         existing_attendance.status = attendance.status
         db.commit()
         db.refresh(existing_attendance)
@@ -38,60 +64,537 @@ def mark_attendance(attendance: schemas.AttendanceCreate, db: Session = Depends(
     # All good, create new attendance record
     db_attendance = models.Attendance(**attendance.model_dump())
     db.add(db_attendance)
-    db.commit()
+    version = summary.record_change(db, attendance.date, employee.department, new_status=attendance.status)
+    counters.record_change(db, attendance.employee_id, attendance.date, new_status=attendance.status)
+    try:
+        db.flush()  # for the new record's id in the live event
+        live.attendance_changed(
+            db, live.attendance_record(db_attendance), employee.department, new_status=attendance.status, version=version
+        )
+        db.commit()
+    except IntegrityError:
+        # Most likely the employee was just deleted by another worker and our cache hadn't heard yet
+        db.rollback()
+        employee_cache.invalidate(attendance.employee_id)
+        if not employee_cache.get(db, attendance.employee_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Employee with ID '{attendance.employee_id}' not found"
+            )
+        raise
     db.refresh(db_attendance)
     
     return db_attendance
 
 
+@router.post("/", response_model=schemas.Attendance, status_code=status.HTTP_201_CREATED)
+def mark_attendance(attendance: schemas.AttendanceCreate, db: Session = Depends(get_db)):
+    return save_attendance(db, attendance)
+
+
+# How many employee ids we check per IN (...) query in bulk uploads
+BULK_LOOKUP_CHUNK_SIZE = 10000
+
+# Most rows one bulk upload can have - the whole batch is validated and written in one transaction
+MAX_BULK_ROWS = 10000
+
+
+def _too_many_rows() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"A bulk upload can have at most {MAX_BULK_ROWS} rows - split it into several requests"
+    )
+
+
+async def _read_bulk_payload(request: Request):
+    """Parse a bulk upload body - either a JSON array or NDJSON (one object per line)"""
+    content_type = request.headers.get("content-type", "")
+
+    if "ndjson" in content_type or "jsonl" in content_type:
+        # Read the stream line by line so we never hold the raw body and the parsed rows at once,
+        # and stop reading as soon as there are too many rows
+        items = []
+        async for item in iter_ndjson(request):
+            if len(items) == MAX_BULK_ROWS:
+                raise _too_many_rows()
+            items.append(item)
+        return items
+
+    try:
+        items = await request.json()
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Request body must be a JSON array or NDJSON"
+        )
+
+    if not isinstance(items, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Request body must be a JSON array of attendance records"
+        )
+    if len(items) > MAX_BULK_ROWS:
+        raise _too_many_rows()
+    return items
+
+
+def bulk_upsert_attendance(db: Session, items: list) -> dict:
+    """Validate and upsert a batch of attendance rows, returning per-row results"""
+    results = [None] * len(items)
+    latest_row = {}  # (employee_id, date) -> row index of the last occurrence
+
+    for index, item in enumerate(items):
+        if isinstance(item, InvalidRecord):
+            results[index] = {"row": index, "employee_id": None, "success": False, "detail": item.detail}
+            continue
+
+        try:
+            record = schemas.AttendanceCreate.model_validate(item)
+        except ValidationError as e:
+            employee_id = item.get("employee_id") if isinstance(item, dict) else None
+            results[index] = {"row": index, "employee_id": employee_id, "success": False, "detail": validation_detail(e)}
+            continue
+
+        key = (record.employee_id, record.date)
+        if key in latest_row:
+            # Same employee and day twice in one batch - the later row wins, like repeated POSTs would
+            previous = latest_row[key]
+            results[previous] = {
+                "row": previous,
+                "employee_id": record.employee_id,
+                "success": False,
+                "detail": f"Superseded by row {index} for the same employee and date"
+            }
+        latest_row[key] = index
+        results[index] = record
+
+    # Check which employees exist with a set query instead of one lookup per row
+    employee_ids = list({results[index].employee_id for index in latest_row.values()})
+    existing_ids = set()
+    for start in range(0, len(employee_ids), BULK_LOOKUP_CHUNK_SIZE):
+        chunk = employee_ids[start:start + BULK_LOOKUP_CHUNK_SIZE]
+        existing_ids.update(
+            employee_id for (employee_id,) in db.query(models.Employee.employee_id).filter(
+                models.Employee.employee_id.in_(chunk)
+            )
+        )
+
+    # Closed years that have been archived are read-only
+    frozen_years = archive.archived_years(db, (results[index].date for index in latest_row.values()))
+
+    rows = []
+    for index in latest_row.values():
+        record = results[index]
+        if record.employee_id not in existing_ids:
+            results[index] = {
+                "row": index,
+                "employee_id": record.employee_id,
+                "success": False,
+                "detail": f"Employee with ID '{record.employee_id}' not found"
+            }
+            continue
+        if record.date.year in frozen_years:
+            results[index] = {
+                "row": index,
+                "employee_id": record.employee_id,
+                "success": False,
+                "detail": archive.archived_year_detail(record.date.year)
+            }
+            continue
+        rows.append(record.model_dump())
+        results[index] = {"row": index, "employee_id": record.employee_id, "success": True, "detail": None}
+
+    if rows:
+        # One INSERT ... ON CONFLICT DO UPDATE for the whole batch (SQLAlchemy pages it into multi-row VALUES)
+        insert = dialect_insert(db.bind)
+        stmt = insert(models.Attendance.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["employee_id", "date"],
+            set_={"status": stmt.excluded.status}
+        )
+        db.execute(stmt, rows)
+        # We don't know which rows were updates, so recompute the rollup for the affected days
+        # and the counters of the affected employees
+        summary.refresh_dates(db, (row["date"] for row in rows))
+        counters.refresh(db, (row["employee_id"] for row in rows), (row["date"] for row in rows))
+        live.counts_changed(db)
+        db.commit()
+
+    succeeded = len(rows)
+    return {
+        "total": len(items),
+        "succeeded": succeeded,
+        "failed": len(items) - succeeded,
+        "results": results
+    }
+
+
+@router.post(
+    "/bulk",
+    response_model=schemas.BulkAttendanceResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {"type": "array", "items": {"$ref": "#/components/schemas/AttendanceCreate"}}
+                },
+                "application/x-ndjson": {"schema": {"type": "string"}},
+            },
+        }
+    },
+)
+async def bulk_mark_attendance(request: Request, db: Session = Depends(get_db)):
+    """Mark attendance for many employees in one request (JSON array or NDJSON stream)"""
+    items = await _read_bulk_payload(request)
+    # The database work is blocking, so keep it off the event loop
+    return await run_in_threadpool(bulk_upsert_attendance, db, items)
+
+
+@router.get("/writes/{token}", response_model=schemas.AttendanceWriteStatus)
+def get_attendance_write(token: str, db: Session = Depends(get_db)):
+    """Where a mark sent with ?wait=false stands (ATTENDANCE_BATCHING=true)"""
+    # On the primary, not get_read_db - a replica could still say "unknown" for a committed write
+    return write_behind.write_status(db, token)
+
+
+# Largest page a client can ask for with ?limit=
+MAX_PAGE_SIZE = 1000
+
+ATTENDANCE_FIELDS = ["id", "employee_id", "date", "status", "employee_name"]
+
+
+def parse_attendance_cursor(cursor: Optional[str]):
+    if not cursor:
+        return None
+    cursor_date, cursor_id = decode_cursor(cursor, 2)
+    try:
+        return date.fromisoformat(cursor_date), int(cursor_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+
+def date_filter_conditions(column, date_filter=None, start_date=None, end_date=None) -> list:
+    """The listing's date_filter / start_date / end_date filters as WHERE conditions on `column`"""
+    conditions = []
+    if date_filter:
+        conditions.append(column == date_filter)
+    if start_date:
+        conditions.append(column >= start_date)
+    if end_date:
+        conditions.append(column <= end_date)
+    return conditions
+
+
+def attendance_listing_statement(
+    date_filter: Optional[date] = None,
+    employee_id: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    department_id: Optional[int] = None,
+    after=None
+):
+    """Attendance rows joined with the employee name, newest first, with the listing filters applied.
+    Returns a select() so the sync and async routers can both run it."""
+    # Only the attendance table for ranges starting this year, the archive as well otherwise
+    attendance = archive.attendance_source(date_filter or start_date, date_filter or end_date, employee_id)
+    query = select(
+        attendance.c.employee_id,
+        attendance.c.date,
+        attendance.c.status,
+        attendance.c.id,
+        models.Employee.full_name.label("employee_name")
+    ).join(models.Employee, attendance.c.employee_id == models.Employee.employee_id)
+    
+    query = query.where(*date_filter_conditions(attendance.c.date, date_filter, start_date, end_date))
+    
+    if employee_id:
+        query = query.where(attendance.c.employee_id == employee_id)
+    
+    if department_id is not None:
+        query = query.where(models.Employee.department_id == department_id)
+    
+    # Keyset pagination - continue strictly after the last (date, id) the client saw
+    if after:
+        query = query.where(tuple_(attendance.c.date, attendance.c.id) < after)
+    
+    # id breaks ties between records on the same date so the order (and the cursor) is stable
+    return query.order_by(attendance.c.date.desc(), attendance.c.id.desc())
+
+
+def stream_attendance(filters: dict, after, limit: Optional[int], primary: bool = False):
+    # Dependencies with yield are closed before a StreamingResponse starts sending,
+    # so the stream opens its own session for as long as it runs
+    with read_session(primary) as db:
+        query = attendance_listing_statement(after=after, **filters)
+        if limit:
+            query = query.limit(limit)
+        # yield_per uses a server-side cursor on Postgres, so memory stays flat for any range
+        for row in db.execute(query.execution_options(yield_per=STREAM_BATCH_SIZE)):
+            yield row._asdict()
+
+
+def list_attendance(
+    db: Session, request: Request, response: Response, date_filter: Optional[date], employee_id: Optional[str],
+    start_date: Optional[date], end_date: Optional[date], department: Optional[str], limit: Optional[int],
+    cursor: Optional[str], output_format: str
+):
+    filters = {
+        "date_filter": date_filter,
+        "employee_id": employee_id,
+        "start_date": start_date,
+        "end_date": end_date,
+        "department_id": departments.filter_id(db, department),
+    }
+    after = parse_attendance_cursor(cursor)
+    
+    if output_format != "json":
+        return stream_rows(stream_attendance(filters, after, limit, replicas.sticky_to_primary(request)), output_format, ATTENDANCE_FIELDS, filename="attendance")
+    
+    query = attendance_listing_statement(after=after, **filters)
+    
+    if limit:
+        # Fetch one extra row to find out if there's another page
+        results = db.execute(query.limit(limit + 1)).all()
+        results = trim_page(results, limit, response, lambda row: (row.date, row.id))
+    else:
+        results = db.execute(query).all()
+    
+    return rows_response(results, response)
+
+
 @router.get("/", response_model=List[schemas.AttendanceWithEmployee])
 def get_all_attendance(
+    request: Request,
+    response: Response,
     date_filter: Optional[date] = Query(None, description="Filter by specific date"),
     employee_id: Optional[str] = Query(None, description="Filter by employee ID"),
     start_date: Optional[date] = Query(None, description="Filter by start date (use with end_date for range)"),
     end_date: Optional[date] = Query(None, description="Filter by end date (use with start_date for range)"),
-    db: Session = Depends(get_db)
+    department: Optional[str] = Query(None, description="Only employees in this department"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size - the next page's cursor is returned in the X-Next-Cursor header"),
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    output_format: str = Query("json", alias="format", pattern="^(json|ndjson|csv)$", description="json, or stream the results as ndjson/csv"),
+    db: Session = Depends(get_read_db)
 ):
-    query = db.query(
-        models.Attendance,
-        models.Employee.full_name
-    ).join(models.Employee, models.Attendance.employee_id == models.Employee.employee_id)
-    
+    return list_attendance(
+        db, request, response, date_filter, employee_id, start_date, end_date, department, limit, cursor, output_format
+    )
+
+
+def attendance_history_statement(employee_id: str):
+    """One employee's attendance, newest first - columns in schemas.Attendance order for rows_response"""
+    attendance = archive.attendance_source(employee_id=employee_id)
+    return select(
+        attendance.c.employee_id,
+        attendance.c.date,
+        attendance.c.status,
+        attendance.c.id
+    ).where(
+        attendance.c.employee_id == employee_id
+    ).order_by(attendance.c.date.desc())
+
+
+def period_expression(column, group_by: str, dialect_name: str):
+    """The first day of the day/week/month `column` falls in (weeks start on Monday)"""
+    if group_by == "day":
+        return column
+    if dialect_name == "sqlite":
+        if group_by == "week":
+            # 'weekday 0' moves forward to Sunday (or stays on it), so -6 days lands on Monday
+            return func.date(column, "weekday 0", "-6 days")
+        return func.date(column, "start of month")
+    return cast(func.date_trunc(group_by, column), Date)
+
+
+def percentage_expression(present, total, dialect_name: str):
+    """present / total as a percentage rounded to 2 places, NULL when total is 0"""
+    # A float on SQLite, where CAST AS NUMERIC keeps integers and divides as integers;
+    # numeric on Postgres, which only rounds numerics to a number of places
+    share = cast(present, Float if dialect_name == "sqlite" else Numeric) * 100 / func.nullif(total, 0)
+    return func.round(share, 2)
+
+
+def covers_whole_months(date_filter: Optional[date], start_date: Optional[date], end_date: Optional[date]) -> bool:
+    """Whether a date filter only ever takes whole months - then the monthly counters can answer it"""
     if date_filter:
-        query = query.filter(models.Attendance.date == date_filter)
+        return False
+    return (start_date is None or start_date.day == 1) and (end_date is None or end_date == counters.month_end(end_date))
+
+
+# Declared before /{employee_id} so "analytics" isn't taken for an employee ID
+@router.get("/analytics", response_model=schemas.AttendanceAnalyticsResponse)
+def get_attendance_analytics(
+    group_by: str = Query(..., pattern="^(employee|department|day|week|month)$", description="employee, department, day, week or month"),
+    date_filter: Optional[date] = Query(None, description="Filter by specific date"),
+    employee_id: Optional[str] = Query(None, description="Filter by employee ID"),
+    start_date: Optional[date] = Query(None, description="Filter by start date"),
+    end_date: Optional[date] = Query(None, description="Filter by end date"),
+    department: Optional[str] = Query(None, description="Only include employees from this department"),
+    db: Session = Depends(get_read_db)
+):
+    """Present/absent counts and attendance percentage per employee, department, day, week or month.
+    Takes the same filters as GET /api/attendance/ and aggregates in the database."""
+    dialect_name = db.bind.dialect.name
+    
+    if (group_by == "employee" or employee_id) and group_by not in ("day", "week") and covers_whole_months(date_filter, start_date, end_date):
+        # Per-employee numbers over whole months come straight from the employee counters
+        month_counts = counters.counters_table
+        if group_by == "employee":
+            groups = [month_counts.c.employee_id, models.Employee.full_name]
+        elif group_by == "department":
+            groups = [models.Employee.department]
+        else:
+            groups = [month_counts.c.month]
+        present, absent = func.sum(month_counts.c.present_count), func.sum(month_counts.c.absent_count)
+        
+        query = select(*groups, present, absent).join(
+            models.Employee, month_counts.c.employee_id == models.Employee.employee_id
+        ).where(
+            *date_filter_conditions(month_counts.c.month, None, start_date, end_date)
+        )
+        if employee_id:
+            query = query.where(month_counts.c.employee_id == employee_id)
+        if department:
+            query = query.where(models.Employee.department_id == departments.filter_id(db, department))
+    elif group_by == "employee" or employee_id:
+        # Per-employee numbers for part of a month need the raw attendance rows
+        attendance = archive.attendance_source(date_filter or start_date, date_filter or end_date, employee_id)
+        is_present = attendance.c.status == models.AttendanceStatus.PRESENT
+        is_absent = attendance.c.status == models.AttendanceStatus.ABSENT
+        present = func.sum(case((is_present, 1), else_=0))
+        absent = func.sum(case((is_absent, 1), else_=0))
+        
+        if group_by == "employee":
+            groups = [attendance.c.employee_id, models.Employee.full_name]
+        elif group_by == "department":
+            groups = [models.Employee.department]
+        else:
+            groups = [period_expression(attendance.c.date, group_by, dialect_name)]
+        
+        query = select(*groups, present, absent).select_from(attendance).join(
+            models.Employee, attendance.c.employee_id == models.Employee.employee_id
+        ).where(
+            *date_filter_conditions(attendance.c.date, date_filter, start_date, end_date)
+        )
+        if employee_id:
+            query = query.where(attendance.c.employee_id == employee_id)
+        if department:
+            query = query.where(models.Employee.department_id == departments.filter_id(db, department))
+    else:
+        # Everything else can come from the daily rollup - a row per department per day
+        # instead of a row per employee per day
+        rollup = models.DailyAttendanceSummary
+        if group_by == "department":
+            groups = [rollup.department]
+        else:
+            groups = [period_expression(rollup.date, group_by, dialect_name)]
+        present, absent = func.sum(rollup.present_count), func.sum(rollup.absent_count)
+        
+        query = select(*groups, present, absent).where(
+            *date_filter_conditions(rollup.date, date_filter, start_date, end_date)
+        )
+        if department:
+            query = query.where(rollup.department == department)
     
-    if start_date and end_date:
-        query = query.filter(models.Attendance.date >= start_date, models.Attendance.date <= end_date)
-    elif start_date:
-        query = query.filter(models.Attendance.date >= start_date)
-    elif end_date:
-        query = query.filter(models.Attendance.date <= end_date)
+    query = query.add_columns(percentage_expression(present, present + absent, dialect_name))
+    query = query.group_by(*groups).order_by(groups[0])
     
-    if employee_id:
-        query = query.filter(models.Attendance.employee_id == employee_id)
-    
-    results = query.order_by(models.Attendance.date.desc()).all()
-    
-    attendance_list = []
-    for attendance, employee_name in results:
-        attendance_dict = {
-            "id": attendance.id,
-            "employee_id": attendance.employee_id,
-            "date": attendance.date,
-            "status": attendance.status,
-            "employee_name": employee_name
-        }
-        attendance_list.append(attendance_dict)
+    results = []
+    for row in db.execute(query):
+        present_count, absent_count, percentage = row[-3] or 0, row[-2] or 0, row[-1]
+        total_count = present_count + absent_count
+        if not total_count:
+            continue
+        results.append({
+            "group": str(row[0]),
+            "employee_name": row[1] if group_by == "employee" else None,
+            "present_count": present_count,
+            "absent_count": absent_count,
+            "total_count": total_count,
+            "attendance_percentage": float(percentage)
+        })
     
-    return attendance_list
+    return {"group_by": group_by, "results": results}
 
 
-@router.get("/{employee_id}", response_model=List[schemas.Attendance])
-def get_employee_attendance(employee_id: str, db: Session = Depends(get_db)):
+# Declared before /{employee_id} so "export" isn't taken for an employee ID
+@router.get("/export", response_class=StreamingResponse)
+def export_attendance(
+    request: Request,
+    start_date: date = Query(..., description="First day to export"),
+    end_date: date = Query(..., description="Last day to export"),
+    department: Optional[str] = Query(None, description="Only export employees from this department"),
+    output_format: str = Query("csv", alias="format", pattern="^(csv|parquet)$", description="csv, or parquet (needs pyarrow)"),
+    gzip: bool = Query(False, description="Gzip the file on the fly"),
+):
+    """Download every attendance record in a date range with employee name and department (for payroll)"""
+    if end_date < start_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end_date must be on or after start_date"
+        )
+    if output_format == "parquet" and not export.parquet_available():
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Parquet export needs pyarrow installed on the server"
+        )
+    
+    filename = export.export_filename(start_date, end_date, output_format, gzip)
+    return StreamingResponse(
+        export.export_attendance(start_date, end_date, department, output_format, gzip, replicas.sticky_to_primary(request)),
+        media_type=export.export_media_type(output_format, gzip),
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+def live_snapshot(department: Optional[str]) -> dict:
+    """today_counts() plus the version of each rollup row it added up, read in the same
+    statement - the stream skips the queued events these versions already include"""
+    today = date.today()
+    rollup = models.DailyAttendanceSummary
+    query = select(rollup.department, rollup.present_count, rollup.absent_count, rollup.version).where(rollup.date == today)
+    if department:
+        query = query.where(rollup.department == department)
+    # From the primary - the events that follow are its commits, a replica could be behind them
+    with read_session(primary=True) as db:
+        rows = db.execute(query).all()
+        total_employees = employee_total(db, department)
+    return {
+        "date": today,
+        "present_count": sum(row.present_count for row in rows),
+        "absent_count": sum(row.absent_count for row in rows),
+        "total_employees": total_employees,
+        live.VERSIONS: {row.department: row.version for row in rows},
+    }
+
+
+async def load_live_snapshot(department: Optional[str]) -> dict:
+    return await run_in_threadpool(live_snapshot, department)
+
+
+@router.get("/live", response_class=StreamingResponse)
+async def live_attendance(
+    department: Optional[str] = Query(None, description="Only changes for employees in this department"),
+):
+    """Server-sent events for dashboards: a snapshot of today's counts, then every mark and
+    delete as it's committed (see app/live.py). Replaces polling /today/present-count."""
+    # Subscribed before the snapshot loads, so nothing committed in between is missed
+    subscriber = live.hub.subscribe(department)
+    return StreamingResponse(
+        live.hub.stream(subscriber, load_live_snapshot),
+        media_type="text/event-stream",
+        # X-Accel-Buffering: nginx would otherwise hold events back until its buffer fills
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def load_employee_attendance(db: Session, employee_id: str):
     # verify employee exists
-    employee = db.query(models.Employee).filter(
-        models.Employee.employee_id == employee_id
-    ).first()
+    employee = employee_cache.get(db, employee_id)
     
     if not employee:
         raise HTTPException(
@@ -99,15 +602,17 @@ def get_employee_attendance(employee_id: str, db: Session = Depends(get_db)):
             detail=f"Employee with ID '{employee_id}' not found"
         )
     
-    attendance_records = db.query(models.Attendance).filter(
-        models.Attendance.employee_id == employee_id
-    ).order_by(models.Attendance.date.desc()).all()
+    attendance_records = db.execute(attendance_history_statement(employee_id)).all()
     
-    return attendance_records
+    return rows_response(attendance_records)
 
 
-@router.delete("/{attendance_id}", response_model=schemas.MessageResponse)
-def delete_attendance(attendance_id: int, db: Session = Depends(get_db)):
+@router.get("/{employee_id}", response_model=List[schemas.Attendance])
+def get_employee_attendance(employee_id: str, db: Session = Depends(get_read_db)):
+    return load_employee_attendance(db, employee_id)
+
+
+def delete_attendance_record(db: Session, attendance_id: int) -> dict:
     attendance = db.query(models.Attendance).filter(
         models.Attendance.id == attendance_id
     ).first()
@@ -118,30 +623,48 @@ def delete_attendance(attendance_id: int, db: Session = Depends(get_db)):
             detail=f"Attendance record with ID '{attendance_id}' not found"
         )
     
+    version = summary.record_change(db, attendance.date, attendance.employee.department, old_status=attendance.status)
+    counters.record_change(db, attendance.employee_id, attendance.date, old_status=attendance.status)
+    live.attendance_changed(
+        db, live.attendance_record(attendance), attendance.employee.department, old_status=attendance.status, version=version
+    )
     db.delete(attendance)
     db.commit()
     
     return {"message": "Attendance record deleted successfully"}
 
 
+@router.delete("/{attendance_id}", response_model=schemas.MessageResponse)
+def delete_attendance(attendance_id: int, db: Session = Depends(get_db)):
+    return delete_attendance_record(db, attendance_id)
 
 
-@router.get("/today/present-count", response_model=schemas.TodayPresentCountResponse)
-def get_today_present_count(db: Session = Depends(get_db)):
-    """Get count of present and absent employees for today"""
-    today = date.today()
-    
-    total_employees = db.query(models.Employee).count()
-    
-    present_count = db.query(models.Attendance).filter(
-        models.Attendance.date == today,
-        models.Attendance.status == models.AttendanceStatus.PRESENT
-    ).count()
+
+
+def today_counts_statement(today: date, department: Optional[str] = None):
+    """Present and absent totals for a day from the rollup - a primary key lookup per department"""
+    rollup = models.DailyAttendanceSummary
+    query = select(
+        func.coalesce(func.sum(rollup.present_count), 0),
+        func.coalesce(func.sum(rollup.absent_count), 0)
+    ).where(rollup.date == today)
+    if department:
+        query = query.where(rollup.department == department)
+    return query
+
+
+def employee_total(db: Session, department: Optional[str] = None) -> int:
+    if department:
+        # The department's headcount is kept on its row, so there's nothing to count
+        return departments.headcount(db, department)
+    return db.query(models.Employee).count()
+
+
+def today_counts(db: Session, today: date, department: Optional[str] = None) -> dict:
+    total_employees = employee_total(db, department)
     
-    absent_count = db.query(models.Attendance).filter(
-        models.Attendance.date == today,
-        models.Attendance.status == models.AttendanceStatus.ABSENT
-    ).count()
+    # Read from the daily rollup - one row per department instead of every attendance row
+    present_count, absent_count = db.execute(today_counts_statement(today, department)).one()
     
     return {
         "date": today,
@@ -150,3 +673,109 @@ def get_today_present_count(db: Session = Depends(get_db)):
         "total_employees": total_employees
     }
 
+
+def today_present_count(db: Session, request: Request, response: Response, department: Optional[str]):
+    today = date.today()
+    
+    # Dashboards poll this - answer with 304 if nothing changed since their last poll
+    cached = http_cache.not_modified(
+        db, request, response, "attendance.today", [http_cache.EMPLOYEES, http_cache.ATTENDANCE], day=today
+    )
+    if cached:
+        return cached
+    
+    return today_counts(db, today, department)
+
+
+@router.get("/today/present-count", response_model=schemas.TodayPresentCountResponse)
+def get_today_present_count(
+    request: Request,
+    response: Response,
+    department: Optional[str] = Query(None, description="Only count employees in this department"),
+    db: Session = Depends(get_read_db)
+):
+    """Get count of present and absent employees for today"""
+    return today_present_count(db, request, response, department)
+
+
+@router.get("/stats/departments", response_model=List[schemas.DepartmentAttendanceStats])
+def get_department_stats(
+    start_date: Optional[date] = Query(None, description="First day to include (defaults to today)"),
+    end_date: Optional[date] = Query(None, description="Last day to include (defaults to start_date)"),
+    db: Session = Depends(get_read_db)
+):
+    """Present/absent totals per department over a date range, read from the daily rollup"""
+    start_date = start_date or date.today()
+    end_date = end_date or start_date
+    
+    results = db.query(
+        models.DailyAttendanceSummary.department,
+        func.sum(models.DailyAttendanceSummary.present_count).label("present_count"),
+        func.sum(models.DailyAttendanceSummary.absent_count).label("absent_count")
+    ).filter(
+        models.DailyAttendanceSummary.date >= start_date,
+        models.DailyAttendanceSummary.date <= end_date
+    ).group_by(
+        models.DailyAttendanceSummary.department
+    ).order_by(models.DailyAttendanceSummary.department).all()
+    
+    return [
+        {
+            "department": row.department,
+            "start_date": start_date,
+            "end_date": end_date,
+            "present_count": row.present_count,
+            "absent_count": row.absent_count
+        }
+        for row in results
+    ]
+
+
+@router.get("/monthly-report/{year}/{month}", response_model=schemas.MonthlyReportResponse)
+def get_monthly_report(
+    response: Response,
+    year: int = Path(..., ge=1, le=9999),
+    month: int = Path(..., ge=1, le=12),
+    department: Optional[str] = Query(None, description="Only include employees from this department"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Employees per page - the next page's cursor is returned in the X-Next-Cursor header"),
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    db: Session = Depends(get_read_db)
+):
+    """Present/absent days and attendance percentage for every employee in a month"""
+    first_day = date(year, month, 1)
+    
+    employees = db.query(models.Employee.employee_id, models.Employee.full_name)
+    if department:
+        employees = employees.filter(models.Employee.department_id == departments.filter_id(db, department))
+    if cursor:
+        (after_employee_id,) = decode_cursor(cursor, 1)
+        employees = employees.filter(models.Employee.employee_id > after_employee_id)
+    
+    # Each employee's month is one row of their counters (app/counters.py) - no attendance rows are counted
+    month_counts = counters.counters_table
+    query = employees.add_columns(
+        month_counts.c.present_count.label("present_days"),
+        month_counts.c.absent_count.label("absent_days")
+    ).outerjoin(
+        month_counts,
+        and_(month_counts.c.employee_id == models.Employee.employee_id, month_counts.c.month == first_day)
+    ).order_by(models.Employee.employee_id)
+    
+    results = query.limit(limit + 1).all() if limit else query.all()
+    if limit:
+        results = trim_page(results, limit, response, lambda row: (row.employee_id,))
+    
+    report = []
+    for row in results:
+        present_days, absent_days = row.present_days or 0, row.absent_days or 0
+        total_days = present_days + absent_days
+        report.append({
+            "employee_id": row.employee_id,
+            "employee_name": row.full_name,
+            "total_days": total_days,
+            "present_days": present_days,
+            "absent_days": absent_days,
+            "attendance_percentage": round(present_days / total_days * 100, 2) if total_days else 0.0
+        })
+    
+    return {"year": year, "month": month, "report": report}
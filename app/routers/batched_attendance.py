@@ -0,0 +1,65 @@
+"""
+POST /api/attendance/ through the write-behind batcher, used when
+ATTENDANCE_BATCHING=true (see app/write_behind.py).
+
+Same path, body and 201 response as attendance.py, plus ?wait=false for a
+202 and a status token instead of waiting for the commit. Works with either
+DATABASE_MODE - the checks and the batch writes run on the sync engine in
+the threadpool.
+"""
+from fastapi import APIRouter, HTTPException, status, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
+from app.database import SessionLocal
+from app import schemas, archive, write_behind
+from app.cache import employee_cache
+
+router = APIRouter(prefix="/api/attendance", tags=["attendance"])
+
+
+def check_attendance(attendance: schemas.AttendanceCreate) -> str:
+    """What mark_attendance checks before writing - returns the employee's department"""
+    # The session only connects if the employee cache misses or the date is in a past year
+    with SessionLocal() as db:
+        employee = employee_cache.get(db, attendance.employee_id)
+        if not employee:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Employee with ID '{attendance.employee_id}' not found"
+            )
+        if archive.archived_years(db, [attendance.date]):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=archive.archived_year_detail(attendance.date.year)
+            )
+        return employee.department
+
+
+@router.post(
+    "/",
+    response_model=schemas.Attendance,
+    status_code=status.HTTP_201_CREATED,
+    responses={status.HTTP_202_ACCEPTED: {"model": schemas.AttendanceWriteStatus}}
+)
+async def mark_attendance(
+    attendance: schemas.AttendanceCreate,
+    wait: bool = Query(True, description="Wait for the write to commit. false = 202 with a token to check on it at /api/attendance/writes/{token}")
+):
+    department = await run_in_threadpool(check_attendance, attendance)
+
+    try:
+        write = write_behind.batcher.submit(attendance, department, wait)
+    except write_behind.QueueFull:
+        return ORJSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"detail": "Too many attendance writes queued. Please try again shortly."},
+            headers={"Retry-After": "1"}
+        )
+
+    if not wait:
+        return ORJSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={"token": write.token, "status": write.status},
+            headers={"Location": f"/api/attendance/writes/{write.token}"}
+        )
+    return await write.future
@@ -1,15 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from typing import List
-from app.database import get_db
-from app import models, schemas
+from sqlalchemy import select, func
+from typing import List, Optional
+from datetime import date
+from app.database import get_db, get_read_db, dialect_insert, read_session
+from app import models, schemas, summary, counters, http_cache, search, departments, archive, replicas, live
+from app.cache import employee_cache
+from app.responses import rows_response
+from app.pagination import NEXT_CURSOR_HEADER, STREAM_BATCH_SIZE, decode_cursor, encode_cursor, stream_rows, trim_page
+from app.uploads import InvalidRecord, iter_csv, iter_ndjson, validation_detail
 
 router = APIRouter(prefix="/api/employees", tags=["employees"])
 
 
-@router.post("/", response_model=schemas.Employee, status_code=status.HTTP_201_CREATED)
-def create_employee(employee: schemas.EmployeeCreate, db: Session = Depends(get_db)):
+# The handlers' work lives in plain functions taking a sync Session, so the
+# async routes (async_employees.py) run the same code through db.run_sync
+
+def create_employee_record(db: Session, employee: schemas.EmployeeCreate) -> models.Employee:
     # Make sure employee_id doesn't already exist
     existing_employee = db.query(models.Employee).filter(
         models.Employee.employee_id == employee.employee_id
@@ -35,9 +45,13 @@ def create_employee(employee: schemas.EmployeeCreate, db: Session = Depends(get_
     # All good, create the employee
     try:
         db_employee = models.Employee(**employee.model_dump())
+        db_employee.department_id = departments.ensure_departments(db, [employee.department])[employee.department]
         db.add(db_employee)
+        departments.adjust_headcount(db, db_employee.department_id, 1)
+        live.counts_changed(db)
         db.commit()
         db.refresh(db_employee)
+        employee_cache.invalidate(db_employee.employee_id)
         return db_employee
     except IntegrityError as e:
         db.rollback()
@@ -47,17 +61,323 @@ def create_employee(employee: schemas.EmployeeCreate, db: Session = Depends(get_
         )
 
 
+@router.post("/", response_model=schemas.Employee, status_code=status.HTTP_201_CREATED)
+def create_employee(employee: schemas.EmployeeCreate, db: Session = Depends(get_db)):
+    return create_employee_record(db, employee)
+
+
+# Rows validated and inserted per transaction in an employee import
+IMPORT_CHUNK_SIZE = 1000
+# Most failed rows listed in an import report - the counts always cover the whole file
+MAX_IMPORT_ERRORS = 1000
+
+
+class ImportReport:
+    """Running totals for an import, so the report stays small however big the file is"""
+
+    def __init__(self):
+        self.total = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.errors = []
+
+    def fail(self, row: int, employee_id: Optional[str], detail: str):
+        self.failed += 1
+        if len(self.errors) < MAX_IMPORT_ERRORS:
+            self.errors.append({"row": row, "employee_id": employee_id, "detail": detail})
+
+    def as_dict(self) -> dict:
+        return {
+            "total": self.total,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+def import_employee_chunk(db: Session, chunk: list, report: ImportReport):
+    """Validate, de-duplicate and insert one chunk of (row, item) pairs, then commit it"""
+    records = {}
+    seen_ids, seen_emails = {}, {}
+
+    for row, item in chunk:
+        if isinstance(item, InvalidRecord):
+            report.fail(row, None, item.detail)
+            continue
+        try:
+            record = schemas.EmployeeCreate.model_validate(item)
+        except ValidationError as e:
+            report.fail(row, item.get("employee_id") if isinstance(item, dict) else None, validation_detail(e))
+            continue
+
+        # Duplicates within the file - the first row wins. Earlier chunks are already
+        # committed, so the database checks below catch repeats across chunks.
+        if record.employee_id in seen_ids:
+            report.fail(row, record.employee_id, f"Duplicate employee_id '{record.employee_id}' (also in row {seen_ids[record.employee_id]})")
+            continue
+        if record.email in seen_emails:
+            report.fail(row, record.employee_id, f"Duplicate email '{record.email}' (also in row {seen_emails[record.email]})")
+            continue
+        seen_ids[record.employee_id] = row
+        seen_emails[record.email] = row
+        records[row] = record
+
+    if not records:
+        return
+
+    # One query per unique column for the whole chunk, instead of two SELECTs per employee
+    existing_ids = set(db.scalars(
+        select(models.Employee.employee_id).where(models.Employee.employee_id.in_(list(seen_ids)))
+    ))
+    existing_emails = set(db.scalars(
+        select(models.Employee.email).where(models.Employee.email.in_(list(seen_emails)))
+    ))
+
+    rows = []
+    for row, record in records.items():
+        if record.employee_id in existing_ids:
+            report.fail(row, record.employee_id, f"Employee with ID '{record.employee_id}' already exists")
+        elif record.email in existing_emails:
+            report.fail(row, record.employee_id, f"Employee with email '{record.email}' already exists")
+        else:
+            rows.append((row, record.model_dump()))
+
+    if not rows:
+        return
+
+    department_ids = departments.ensure_departments(db, {values["department"] for _, values in rows})
+    for _, values in rows:
+        values["department_id"] = department_ids[values["department"]]
+
+    # Executemany, which SQLAlchemy batches into multi-row INSERTs (and compiles once, unlike
+    # .values([...])). DO NOTHING skips anyone created by another request since the checks
+    # above, and RETURNING tells us which rows actually went in.
+    stmt = dialect_insert(db.bind)(models.Employee.__table__).on_conflict_do_nothing().returning(
+        models.Employee.employee_id
+    )
+    inserted = set(db.scalars(stmt, [values for _, values in rows]))
+
+    added = {}
+    for row, values in rows:
+        if values["employee_id"] in inserted:
+            report.succeeded += 1
+            added[values["department_id"]] = added.get(values["department_id"], 0) + 1
+        else:
+            report.fail(row, values["employee_id"], "Employee with this ID or email already exists")
+    for department_id, count in added.items():
+        departments.adjust_headcount(db, department_id, count)
+
+    # New employees have no attendance yet, so the rollup doesn't change. The employee
+    # cache only holds employees that exist, so there's nothing stale to invalidate.
+    live.counts_changed(db)
+    db.commit()
+
+
+@router.post(
+    "/import",
+    response_model=schemas.EmployeeImportResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "text/csv": {"schema": {"type": "string"}},
+                "application/x-ndjson": {"schema": {"type": "string"}},
+            },
+        }
+    },
+)
+async def import_employees(request: Request, db: Session = Depends(get_db)):
+    """Add many employees from a CSV file (employee_id,full_name,email,department header) or NDJSON"""
+    content_type = request.headers.get("content-type", "")
+    if "csv" in content_type:
+        items = iter_csv(request)
+    elif "ndjson" in content_type or "jsonl" in content_type:
+        items = iter_ndjson(request)
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Upload a CSV (text/csv) or NDJSON (application/x-ndjson) file"
+        )
+
+    # Only one chunk is held at a time, whatever the size of the file
+    report = ImportReport()
+    chunk = []
+    async for item in items:
+        chunk.append((report.total, item))
+        report.total += 1
+        if len(chunk) == IMPORT_CHUNK_SIZE:
+            await run_in_threadpool(import_employee_chunk, db, chunk, report)
+            chunk = []
+    if chunk:
+        await run_in_threadpool(import_employee_chunk, db, chunk, report)
+
+    return report.as_dict()
+
+
+# Largest page a client can ask for with ?limit=
+MAX_PAGE_SIZE = 1000
+
+EMPLOYEE_FIELDS = ["id", "employee_id", "full_name", "email", "department"]
+
+
+def employee_listing_statement(after_id: Optional[int] = None, department_id: Optional[int] = None):
+    query = select(
+        models.Employee.employee_id,
+        models.Employee.full_name,
+        models.Employee.email,
+        models.Employee.department,
+        models.Employee.id
+    )
+    if department_id is not None:
+        query = query.where(models.Employee.department_id == department_id)
+    if after_id is not None:
+        query = query.where(models.Employee.id > after_id)
+    return query.order_by(models.Employee.id)
+
+
+def parse_employee_cursor(cursor: Optional[str]) -> Optional[int]:
+    if not cursor:
+        return None
+    (cursor_id,) = decode_cursor(cursor, 1)
+    if not cursor_id.isdigit():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+    return int(cursor_id)
+
+
+def stream_employees(after_id: Optional[int], limit: Optional[int], department_id: Optional[int] = None, primary: bool = False):
+    # The request's session is already closed once streaming starts, so use our own
+    with read_session(primary) as db:
+        query = employee_listing_statement(after_id, department_id)
+        if limit:
+            query = query.limit(limit)
+        for row in db.execute(query.execution_options(yield_per=STREAM_BATCH_SIZE)):
+            yield row._asdict()
+
+
+def list_employees(
+    db: Session, request: Request, response: Response, limit: Optional[int], cursor: Optional[str],
+    department: Optional[str], output_format: str
+):
+    after_id = parse_employee_cursor(cursor)
+    
+    department_id = departments.filter_id(db, department)
+    
+    if output_format != "json":
+        return stream_rows(stream_employees(after_id, limit, department_id, replicas.sticky_to_primary(request)), output_format, EMPLOYEE_FIELDS, filename="employees")
+    
+    cached = http_cache.not_modified(db, request, response, "employees.list", [http_cache.EMPLOYEES])
+    if cached:
+        return cached
+    
+    query = employee_listing_statement(after_id, department_id)
+    
+    if limit:
+        employees = db.execute(query.limit(limit + 1)).all()
+        employees = trim_page(employees, limit, response, lambda row: (row.id,))
+    else:
+        employees = db.execute(query).all()
+    
+    return rows_response(employees, response)
+
+
 @router.get("/", response_model=List[schemas.Employee])
-def get_all_employees(db: Session = Depends(get_db)):
-    employees = db.query(models.Employee).all()
-    return employees
+def get_all_employees(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size - the next page's cursor is returned in the X-Next-Cursor header"),
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    department: Optional[str] = Query(None, description="Only employees in this department"),
+    output_format: str = Query("json", alias="format", pattern="^(json|ndjson|csv)$", description="json, or stream the results as ndjson/csv"),
+    db: Session = Depends(get_read_db)
+):
+    return list_employees(db, request, response, limit, cursor, department, output_format)
 
 
-@router.get("/{employee_id}", response_model=schemas.EmployeeWithAttendance)
-def get_employee(employee_id: str, db: Session = Depends(get_db)):
-    employee = db.query(models.Employee).filter(
+# Search results per page by default / at most
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+
+# Declared before /{employee_id}, otherwise "search" would be taken for an employee ID
+@router.get("/search", response_model=List[schemas.Employee])
+def search_employees(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200, description="Words to find in the employee ID, name, email or department"),
+    limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT, description="Page size - the next page's cursor is returned in the X-Next-Cursor header"),
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    db: Session = Depends(get_read_db)
+):
+    """Employees matching every word of q, best match first: exact ID or email, then names starting with q"""
+    if not q.strip():
+        return rows_response([], response)
+
+    # Results are ranked rather than sorted by a column, so the cursor is the position of the next page
+    offset = 0
+    if cursor:
+        (position,) = decode_cursor(cursor, 1)
+        if not position.isdigit():
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid pagination cursor"
+            )
+        offset = int(position)
+
+    employees = search.search_employees(db, q, limit + 1, offset)
+    if len(employees) > limit:
+        employees = employees[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(offset + limit)
+
+    return rows_response(employees, response)
+
+
+# How many recent attendance records the employee profile includes by default / at most
+DEFAULT_RECENT_RECORDS = 30
+MAX_RECENT_RECORDS = 366
+
+
+def employee_profile_statement(employee_id: str):
+    """The employee plus their present/absent totals, in one query"""
+    # Totals cover the whole history, archived years included (see app/archive.py) -
+    # summed from the employee's monthly counters (app/counters.py) instead of
+    # counting every record.
+    totals = counters.totals_subquery(employee_id)
+    return select(
+        models.Employee.id,
+        models.Employee.employee_id,
+        models.Employee.full_name,
+        models.Employee.email,
+        models.Employee.department,
+        func.coalesce(totals.c.total_present_days, 0).label("total_present_days"),
+        func.coalesce(totals.c.total_absent_days, 0).label("total_absent_days")
+    ).outerjoin(
+        totals, totals.c.employee_id == models.Employee.employee_id
+    ).where(
         models.Employee.employee_id == employee_id
-    ).first()
+    )
+
+
+def recent_attendance_statement(employee_id: str, start_date: Optional[date], end_date: Optional[date], limit: int):
+    """The employee's most recent attendance records, optionally within a date range"""
+    attendance = archive.attendance_source(start_date, end_date, employee_id)
+    query = select(
+        attendance.c.employee_id, attendance.c.date, attendance.c.status, attendance.c.id
+    ).where(attendance.c.employee_id == employee_id)
+    if start_date:
+        query = query.where(attendance.c.date >= start_date)
+    if end_date:
+        query = query.where(attendance.c.date <= end_date)
+    return query.order_by(attendance.c.date.desc()).limit(limit)
+
+
+def load_employee_profile(
+    db: Session, employee_id: str, records_limit: int, start_date: Optional[date], end_date: Optional[date]
+) -> dict:
+    # Query 1: profile and totals together - no separate COUNT, and no lazy load of the whole history
+    employee = db.execute(employee_profile_statement(employee_id)).first()
     
     if not employee:
         raise HTTPException(
@@ -65,27 +385,28 @@ def get_employee(employee_id: str, db: Session = Depends(get_db)):
             detail=f"Employee with ID '{employee_id}' not found"
         )
     
-    # get total present days
-    total_present = db.query(models.Attendance).filter(
-        models.Attendance.employee_id == employee_id,
-        models.Attendance.status == models.AttendanceStatus.PRESENT
-    ).count()
-    
-    employee_dict = {
-        "id": employee.id,
-        "employee_id": employee.employee_id,
-        "full_name": employee.full_name,
-        "email": employee.email,
-        "department": employee.department,
-        "total_present_days": total_present,
-        "attendance_records": employee.attendance_records
-    }
+    # Query 2: just the window of records the client asked for
+    attendance_records = []
+    if records_limit:
+        attendance_records = db.execute(
+            recent_attendance_statement(employee_id, start_date, end_date, records_limit)
+        ).all()
     
-    return employee_dict
+    return {**employee._asdict(), "attendance_records": attendance_records}
 
 
-@router.delete("/{employee_id}", response_model=schemas.MessageResponse)
-def delete_employee(employee_id: str, db: Session = Depends(get_db)):
+@router.get("/{employee_id}", response_model=schemas.EmployeeWithAttendance)
+def get_employee(
+    employee_id: str,
+    records_limit: int = Query(DEFAULT_RECENT_RECORDS, ge=0, le=MAX_RECENT_RECORDS, description="How many of the most recent attendance records to include"),
+    start_date: Optional[date] = Query(None, description="Only include attendance records from this date"),
+    end_date: Optional[date] = Query(None, description="Only include attendance records up to this date"),
+    db: Session = Depends(get_read_db)
+):
+    return load_employee_profile(db, employee_id, records_limit, start_date, end_date)
+
+
+def delete_employee_record(db: Session, employee_id: str) -> dict:
     employee = db.query(models.Employee).filter(
         models.Employee.employee_id == employee_id
     ).first()
@@ -96,16 +417,47 @@ def delete_employee(employee_id: str, db: Session = Depends(get_db)):
             detail=f"Employee with ID '{employee_id}' not found"
         )
     
+    # Their attendance is cascade deleted, so take it out of the daily rollup first
+    summary.remove_employee(db, employee.employee_id, employee.department)
+    counters.remove_employee(db, employee.employee_id)
+    archive.remove_employee(db, employee.employee_id)
+    if employee.department_id is not None:
+        departments.adjust_headcount(db, employee.department_id, -1)
+    live.counts_changed(db)
     db.delete(employee)
     db.commit()
+    employee_cache.invalidate(employee_id)
     
     return {"message": f"Employee '{employee.full_name}' deleted successfully"}
 
 
-@router.get("/stats/count", response_model=schemas.EmployeeCountResponse)
-def get_employees_count(db: Session = Depends(get_db)):
-    """Get total count of employees in the system"""
+@router.delete("/{employee_id}", response_model=schemas.MessageResponse)
+def delete_employee(employee_id: str, db: Session = Depends(get_db)):
+    return delete_employee_record(db, employee_id)
+
+
+def count_employees(db: Session, request: Request, response: Response):
+    cached = http_cache.not_modified(db, request, response, "employees.count", [http_cache.EMPLOYEES])
+    if cached:
+        return cached
+    
     total_employees = db.query(models.Employee).count()
     
     return {"total_employees": total_employees}
 
+
+@router.get("/stats/count", response_model=schemas.EmployeeCountResponse)
+def get_employees_count(request: Request, response: Response, db: Session = Depends(get_read_db)):
+    """Get total count of employees in the system"""
+    return count_employees(db, request, response)
+
+
+@router.get("/stats/departments", response_model=List[schemas.DepartmentHeadcount])
+def get_department_headcounts(request: Request, response: Response, db: Session = Depends(get_read_db)):
+    """Number of employees in each department - read from the departments table, not counted"""
+    cached = http_cache.not_modified(db, request, response, "employees.departments", [http_cache.EMPLOYEES])
+    if cached:
+        return cached
+    
+    return rows_response(db.execute(departments.headcount_statement()).all(), response)
+
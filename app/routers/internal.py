@@ -0,0 +1,62 @@
+import secrets
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from app import database, live, write_behind
+from app.cache import employee_cache
+from app.config import settings
+from app.pool import pool_status
+
+
+def require_internal_token(authorization: str = Header(default="")):
+    """Operational endpoints need `Authorization: Bearer <INTERNAL_API_TOKEN>`"""
+    expected = f"Bearer {settings.internal_api_token}"
+    if not settings.internal_api_token or not secrets.compare_digest(authorization.encode(), expected.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Missing or invalid internal API token",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+
+# Operational endpoints - not part of the public API, only included when INTERNAL_API_TOKEN is set
+router = APIRouter(prefix="/internal", tags=["internal"], dependencies=[Depends(require_internal_token)])
+
+
+@router.get("/pool")
+def get_pool_metrics():
+    """Connection pool usage for this worker process (each worker has its own pools)"""
+    pools = {"sync": pool_status(database.engine)}
+    replicas = {"sync": database.read_replicas.stats()}
+    if database.async_engine is not None:
+        pools["async"] = pool_status(database.async_engine.sync_engine)
+        replicas["async"] = database.async_read_replicas.stats()
+
+    return {
+        "settings": {
+            "pool_size": settings.db_pool_size,
+            "max_overflow": settings.db_max_overflow,
+            "pool_timeout": settings.db_pool_timeout,
+            "pool_recycle": settings.db_pool_recycle,
+            "pool_pre_ping": settings.db_pool_pre_ping,
+            "statement_timeout_ms": settings.db_statement_timeout_ms,
+        },
+        "pools": pools,
+        "read_replicas": replicas,
+    }
+
+
+@router.get("/cache")
+def get_cache_metrics():
+    """Employee cache hit/miss counters for this worker process"""
+    return employee_cache.stats()
+
+
+@router.get("/write-queue")
+def get_write_queue_metrics():
+    """Attendance write-behind queue depth and batch sizes for this worker process"""
+    return write_behind.batcher.stats()
+
+
+@router.get("/live")
+def get_live_metrics():
+    """Open live attendance streams and events sent on this worker process"""
+    return live.hub.stats()
@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from app import profiling
+from app.routers.internal import require_internal_token
+
+# Prometheus scrape endpoint - only included when PROFILING_ENABLED=true and INTERNAL_API_TOKEN is set,
+# scrape it with the token as the bearer token (authorization.credentials in the scrape config)
+router = APIRouter(tags=["internal"], dependencies=[Depends(require_internal_token)])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Request latency, SQL and serialization histograms for this worker process"""
+    return PlainTextResponse(profiling.render_metrics(), media_type="text/plain; version=0.0.4")
@@ -47,6 +47,44 @@ class Attendance(AttendanceBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+# Result for a single row of a bulk attendance upload
+class BulkAttendanceResult(BaseModel):
+    row: int  # position in the uploaded batch, starting at 0
+    employee_id: Optional[str] = None
+    success: bool
+    detail: Optional[str] = None
+
+
+class BulkAttendanceResponse(BaseModel):
+    total: int
+    succeeded: int
+    failed: int
+    results: List[BulkAttendanceResult]
+
+
+# Where a write queued with ?wait=false stands (write-behind batching, see app/write_behind.py)
+class AttendanceWriteStatus(BaseModel):
+    token: str
+    status: str  # queued, committed, failed, or unknown (not this worker's write and not in the database)
+    attendance: Optional[Attendance] = None  # once committed
+    detail: Optional[str] = None  # why it failed
+
+
+# A row that failed in an employee import
+class EmployeeImportError(BaseModel):
+    row: int  # position in the uploaded file, starting at 0 (a CSV header doesn't count)
+    employee_id: Optional[str] = None
+    detail: str
+
+
+class EmployeeImportResponse(BaseModel):
+    total: int
+    succeeded: int
+    failed: int
+    errors: List[EmployeeImportError]
+    errors_truncated: bool = False  # more rows failed than are listed in errors
+
+
 class AttendanceWithEmployee(Attendance):
     employee_name: str
     
@@ -55,6 +93,7 @@ class AttendanceWithEmployee(Attendance):
 
 class EmployeeWithAttendance(Employee):
     total_present_days: Optional[int] = None
+    total_absent_days: Optional[int] = None
     attendance_records: List[Attendance] = []
     
     model_config = ConfigDict(from_attributes=True)
@@ -79,6 +118,33 @@ class TodayPresentCountResponse(BaseModel):
     total_employees: int
 
 
+class DepartmentHeadcount(BaseModel):
+    department: str
+    headcount: int
+
+
+class DepartmentAttendanceStats(BaseModel):
+    department: str
+    start_date: date
+    end_date: date
+    present_count: int
+    absent_count: int
+
+
+class AttendanceAnalyticsRow(BaseModel):
+    group: str  # employee_id, department, or the first day of the day/week/month (YYYY-MM-DD)
+    employee_name: Optional[str] = None  # only when grouping by employee
+    present_count: int
+    absent_count: int
+    total_count: int
+    attendance_percentage: float
+
+
+class AttendanceAnalyticsResponse(BaseModel):
+    group_by: str
+    results: List[AttendanceAnalyticsRow]
+
+
 class MonthlyAttendanceReport(BaseModel):
     employee_id: str
     employee_name: str
@@ -0,0 +1,215 @@
+"""
+Employee search - GET /api/employees/search?q=...
+
+Every word of the query has to match one of employee_id, full_name, email or
+department.
+
+On Postgres, a pg_trgm GIN index covers one lowercased string of the four
+fields (models.EMPLOYEE_SEARCH_TEXT), so `LIKE '%word%'` for each word is an index scan
+however many employees there are. Words need at least 3 characters to use
+the index.
+
+SQLite has no trigram index, so each worker keeps an in-process prefix index
+instead: a sorted list of the words in every employee's fields, searched with
+bisect. Each search checks the employee roster's version (app/http_cache.py),
+and the index is rebuilt when a write has changed the roster since. It holds
+a few strings per employee in every worker, which is fine for the
+development-sized databases SQLite is used for here.
+
+Results are ranked the same way on both: an exact employee_id or email match
+first, then names starting with the query, then the rest, with ties sorted by
+name. "The rest" is substring matches on Postgres and word-prefix matches on
+SQLite.
+"""
+import heapq
+import re
+import threading
+from array import array
+from bisect import bisect_left
+from itertools import repeat
+from typing import List
+from sqlalchemy import case, func, literal_column, or_, select, text
+from app import models
+from app.http_cache import employees_version
+
+# SQL text rather than a SQLAlchemy expression, so it renders exactly like the
+# index definition - a bound ' ' parameter wouldn't match it
+SEARCH_TEXT = literal_column(models.EMPLOYEE_SEARCH_TEXT)
+
+# Ranks, best first
+EXACT_MATCH, NAME_PREFIX, OTHER_MATCH = 0, 1, 2
+
+_WORD = re.compile(r"[^\W_]+")
+_MAX_CHAR = "\U0010ffff"
+
+
+def query_words(q: str) -> List[str]:
+    """Lowercased words of a search query, without duplicates"""
+    return list(dict.fromkeys(q.lower().split()))
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _search_columns():
+    E = models.Employee
+    return select(E.employee_id, E.full_name, E.email, E.department, E.id)
+
+
+def trigram_search_statement(q: str, limit: int, offset: int = 0):
+    """Postgres: every word is a substring of SEARCH_TEXT, ranked in SQL"""
+    E = models.Employee
+    words = query_words(q)
+    phrase = " ".join(words)
+    rank = case(
+        (or_(func.lower(E.employee_id) == phrase, func.lower(E.email) == phrase), EXACT_MATCH),
+        (func.lower(E.full_name).like(_escape_like(phrase) + "%", escape="\\"), NAME_PREFIX),
+        else_=OTHER_MATCH
+    )
+    query = _search_columns()
+    for word in words:
+        query = query.where(SEARCH_TEXT.like("%" + _escape_like(word) + "%", escape="\\"))
+    return query.order_by(rank, E.full_name, E.id).limit(limit).offset(offset)
+
+
+class PrefixIndex:
+    """Every word of every employee, sorted - the SQLite fallback.
+
+    Employees are numbered by their position in name order, so ranking the
+    matches is mostly taking the smallest positions. The index is one snapshot,
+    replaced whole on rebuild, so a search never sees half of an old index:
+    - names: position -> lowercased full name, sorted (name prefixes are a bisect away)
+    - row_ids: position -> employee row id
+    - words / positions: every word and the position of its employee, sorted by word
+      (parallel sequences instead of tuples, there are several entries per employee)
+    - texts: position -> " word word ...", to check a word against one employee
+    - exact: lowercased employee_id / email -> position"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.version = None
+        self._snapshot = ([], array("q"), [], array("q"), [], {})
+
+    def build(self, db, version: int):
+        E = models.Employee
+        rows = db.execute(select(E.full_name, E.id, E.employee_id, E.email, E.department)).all()
+        # Lowercased in Python rather than SQL - SQLite's lower() only knows ASCII
+        rows = sorted((name.lower(), row_id, employee_id.lower(), email.lower(), department.lower())
+                      for name, row_id, employee_id, email, department in rows)
+
+        pairs, texts, exact = [], [], {}
+        # Names and departments repeat a lot - keep one copy of each word
+        shared = {}
+        for position, (name, _, employee_id, email, department) in enumerate(rows):
+            # Every word of every field, plus the whole ID and email. The email's domain
+            # is left out - everyone shares it, so it would only bloat the index.
+            words = {shared.setdefault(word, word) for word in _WORD.findall(f"{employee_id} {name} {email.partition('@')[0]} {department}")}
+            words.add(employee_id)
+            words.add(email)
+            pairs.extend(zip(words, repeat(position)))
+            texts.append(" " + " ".join(words))
+            exact[employee_id] = position
+            exact[email] = position
+        pairs.sort()
+
+        self._snapshot = (
+            [row[0] for row in rows],
+            array("q", (row[1] for row in rows)),
+            [word for word, _ in pairs],
+            array("q", (position for _, position in pairs)),
+            texts,
+            exact,
+        )
+        self.version = version
+
+    def refresh(self, db):
+        """Rebuild if the employees table changed since the last build"""
+        version, _ = employees_version(db)
+        if version == self.version:
+            return
+        with self._lock:
+            # Another thread may have rebuilt it while we waited
+            if version != self.version:
+                self.build(db, version)
+
+    def search(self, q: str, count: int) -> List[int]:
+        """Row ids of the best `count` employees matching all the words, best first"""
+        query = query_words(q)
+        if not query or count <= 0:
+            return []
+        names, row_ids, words, positions, texts, exact = self._snapshot
+
+        # Each word matches a contiguous run of the sorted words - narrowest run first
+        runs = sorted(
+            ((bisect_left(words, word), bisect_left(words, word + _MAX_CHAR), word) for word in query),
+            key=lambda run: run[1] - run[0]
+        )
+        start, end, _ = runs[0]
+        matches = set(positions[start:end])
+        for start, end, word in runs[1:]:
+            if not matches:
+                return []
+            if end - start < 8 * len(matches):
+                matches.intersection_update(positions[start:end])
+            else:
+                # A very common word - check the few candidates instead of building its whole set
+                needle = " " + word
+                matches = {position for position in matches if needle in texts[position]}
+
+        phrase = " ".join(query)
+        best = []
+        # Exact employee_id / email first
+        exact_match = exact.get(phrase)
+        if exact_match in matches:
+            best.append(exact_match)
+        # Then names starting with the phrase - positions name_start..name_end, already in name order.
+        # Walk whichever is shorter, that range or the matches.
+        name_start = bisect_left(names, phrase)
+        name_end = bisect_left(names, phrase + _MAX_CHAR, name_start)
+        if name_end - name_start <= len(matches):
+            name_matches = (p for p in range(name_start, name_end) if p in matches)
+        else:
+            name_matches = iter(sorted(p for p in matches if name_start <= p < name_end))
+        for position in name_matches:
+            if len(best) >= count:
+                break
+            if position != exact_match:
+                best.append(position)
+        # Then everything else, in name order - the smallest positions
+        if len(best) < count:
+            chosen = set(best)
+            best.extend(
+                p for p in heapq.nsmallest(count + len(chosen), matches) if p not in chosen
+            )
+        return [row_ids[p] for p in best[:count]]
+
+
+prefix_index = PrefixIndex()
+
+
+def prefix_search_rows(db, q: str, limit: int, offset: int = 0) -> list:
+    """SQLite: rank with the in-process index, then load just the page's rows"""
+    prefix_index.refresh(db)
+    page_ids = prefix_index.search(q, offset + limit)[offset:]
+    if not page_ids:
+        return []
+    rows = db.execute(_search_columns().where(models.Employee.id.in_(page_ids))).all()
+    position = {row_id: i for i, row_id in enumerate(page_ids)}
+    return sorted(rows, key=lambda row: position[row.id])
+
+
+def create_trigram_index(conn):
+    """Migration step for databases created before search - Postgres only"""
+    if conn.dialect.name != "postgresql":
+        return
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    index = next(i for i in models.Employee.__table__.indexes if i.name == "ix_employees_search_trgm")
+    index.create(conn, checkfirst=True)
+
+
+def search_employees(db, q: str, limit: int, offset: int = 0) -> list:
+    """Up to `limit` employees matching q, skipping the first `offset`"""
+    if db.bind.dialect.name == "postgresql":
+        return db.execute(trigram_search_statement(q, limit, offset)).all()
+    return prefix_search_rows(db, q, limit, offset)
@@ -0,0 +1,167 @@
+"""
+Maintenance of the daily_attendance_summary rollup.
+
+Every write that changes attendance calls one of these helpers in the same
+transaction (before db.commit()), so the rollup never drifts from the raw
+rows. rebuild() recomputes it from scratch - use it to backfill or repair:
+
+    python manage.py rebuild-summary
+
+Both count archived attendance too (app/archive.py). Years archived to
+Parquet have no rows left to count, so rebuild() leaves their days alone.
+"""
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import DateTime, and_, case, func, literal, not_, select, update
+from sqlalchemy.orm import Session
+from app.database import dialect_insert
+from app import archive, models
+
+summary_table = models.DailyAttendanceSummary.__table__
+employees_table = models.Employee.__table__
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def apply_delta(db, day: date, department: str, present: int = 0, absent: int = 0) -> Optional[int]:
+    """Add to (or subtract from) the counts for one day and department. Returns the row's
+    new version (None if nothing changed) - the live stream uses it to tell which
+    changes a snapshot of the counts already includes (app/live.py)."""
+    if not present and not absent:
+        return None
+    now = _utcnow()
+    stmt = dialect_insert(db.bind)(summary_table).values(
+        date=day, department=department, present_count=present, absent_count=absent, version=1, updated_at=now
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["date", "department"],
+        set_={
+            "present_count": summary_table.c.present_count + stmt.excluded.present_count,
+            "absent_count": summary_table.c.absent_count + stmt.excluded.absent_count,
+            "version": summary_table.c.version + 1,
+            "updated_at": now,
+        }
+    ).returning(summary_table.c.version)
+    return db.execute(stmt).scalar_one()
+
+
+def record_change(db, day: date, department: str, old_status=None, new_status=None) -> Optional[int]:
+    """Update the rollup for one attendance record being created (no old_status),
+    changed (both) or deleted (no new_status) - returns the row's version, like apply_delta()"""
+    present = absent = 0
+    for status, amount in ((old_status, -1), (new_status, 1)):
+        if status == models.AttendanceStatus.PRESENT:
+            present += amount
+        elif status == models.AttendanceStatus.ABSENT:
+            absent += amount
+    return apply_delta(db, day, department, present=present, absent=absent)
+
+
+def record_changes(db, changes: Iterable[tuple]) -> Dict[Tuple[date, str], int]:
+    """record_change() for many records at once - (day, department, old_status, new_status)
+    tuples, added up so each day and department is one upsert. Returns the new version
+    of every (day, department) row that changed."""
+    totals = {}
+    for day, department, old_status, new_status in changes:
+        counts = totals.setdefault((day, department), [0, 0])
+        for status, amount in ((old_status, -1), (new_status, 1)):
+            if status == models.AttendanceStatus.PRESENT:
+                counts[0] += amount
+            elif status == models.AttendanceStatus.ABSENT:
+                counts[1] += amount
+    # Day by day, so concurrent batches take the rollup rows' locks in the same order and never deadlock
+    versions = {}
+    for (day, department), (present, absent) in sorted(totals.items()):
+        version = apply_delta(db, day, department, present=present, absent=absent)
+        if version is not None:
+            versions[(day, department)] = version
+    return versions
+
+
+def remove_employee(db, employee_id: str, department: str):
+    """Take an employee's attendance out of the rollup - call before deleting the employee"""
+    attendance = archive.attendance_source(employee_id=employee_id)
+
+    def count_for(status):
+        return select(func.count()).select_from(attendance).where(
+            attendance.c.employee_id == employee_id,
+            attendance.c.date == summary_table.c.date,
+            attendance.c.status == status
+        ).scalar_subquery()
+
+    # One set-based UPDATE for all of the employee's days instead of one per record
+    db.execute(
+        update(summary_table).where(
+            summary_table.c.department == department,
+            summary_table.c.date.in_(
+                select(attendance.c.date).where(attendance.c.employee_id == employee_id)
+            )
+        ).values(
+            present_count=summary_table.c.present_count - count_for(models.AttendanceStatus.PRESENT),
+            absent_count=summary_table.c.absent_count - count_for(models.AttendanceStatus.ABSENT),
+            version=summary_table.c.version + 1,
+            updated_at=_utcnow()
+        )
+    )
+
+
+def _recompute(db, date_condition=None, start_date: Optional[date] = None, end_date: Optional[date] = None):
+    """Recount the rollup rows matching date_condition (all rows if None).
+    start_date / end_date bound the attendance that gets read."""
+    attendance = archive.attendance_source(start_date, end_date)
+    present = func.sum(case((attendance.c.status == models.AttendanceStatus.PRESENT, 1), else_=0))
+    absent = func.sum(case((attendance.c.status == models.AttendanceStatus.ABSENT, 1), else_=0))
+    now = _utcnow()
+
+    counts = select(
+        attendance.c.date, employees_table.c.department, present, absent, literal(1), literal(now, DateTime)
+    ).select_from(
+        attendance.join(employees_table, attendance.c.employee_id == employees_table.c.employee_id)
+    ).group_by(attendance.c.date, employees_table.c.department)
+
+    # Zeroed and counted again rather than deleted and re-inserted, so the row versions
+    # only ever go up and an old ETag can never match again
+    clear = update(summary_table).values(
+        present_count=0, absent_count=0, version=summary_table.c.version + 1, updated_at=now
+    )
+    if date_condition is not None:
+        counts = counts.where(date_condition(attendance.c.date))
+        clear = clear.where(date_condition(summary_table.c.date))
+
+    db.execute(clear)
+    # A Session from the routes and manage.py, a Connection from migrations
+    bind = db.get_bind() if isinstance(db, Session) else db
+    stmt = dialect_insert(bind)(summary_table).from_select(
+        ["date", "department", "present_count", "absent_count", "version", "updated_at"], counts
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["date", "department"],
+        set_={"present_count": stmt.excluded.present_count, "absent_count": stmt.excluded.absent_count}
+    ))
+
+
+def refresh_dates(db, dates: Iterable[date]):
+    """Recompute the rollup for specific days - used after bulk upserts where we don't know the old statuses"""
+    dates = sorted(set(dates))
+    if dates:
+        _recompute(db, lambda column: column.in_(dates), dates[0], dates[-1])
+
+
+def rebuild(db, start_date: Optional[date] = None, end_date: Optional[date] = None):
+    """Backfill the rollup from raw attendance, optionally only for a date range"""
+    frozen = archive.parquet_years(db)
+
+    def date_condition(column):
+        conditions = [not_(column.between(date(year, 1, 1), date(year, 12, 31))) for year in frozen]
+        if start_date:
+            conditions.append(column >= start_date)
+        if end_date:
+            conditions.append(column <= end_date)
+        return and_(*conditions)
+
+    if frozen or start_date or end_date:
+        _recompute(db, date_condition, start_date, end_date)
+    else:
+        _recompute(db)
@@ -0,0 +1,123 @@
+"""
+Helpers for the bulk upload endpoints (attendance bulk, employee import).
+
+Bodies are read from request.stream() a piece at a time, so NDJSON and CSV
+uploads never hold the raw body in memory. Lines or records that can't be
+parsed come out as InvalidRecord, so they turn into per-row errors instead
+of failing the whole upload.
+
+A line (or a CSV record, which can span lines inside quotes) has a size
+limit, so a body without newlines - or with a quote that's never closed -
+can't grow the buffer without bound. Going over it is a 413.
+"""
+import csv
+import json
+from fastapi import HTTPException, Request, status
+from pydantic import ValidationError
+
+# Longest line, and longest CSV record, an upload can have
+MAX_LINE_BYTES = 64 * 1024
+MAX_RECORD_BYTES = 256 * 1024
+
+
+class InvalidRecord:
+    """A line or record that couldn't be parsed"""
+
+    def __init__(self, detail: str):
+        self.detail = detail
+
+
+INVALID_JSON = InvalidRecord("Invalid JSON")
+
+
+def parse_ndjson_line(line: bytes):
+    try:
+        return json.loads(line)
+    except ValueError:
+        return INVALID_JSON
+
+
+def validation_detail(e: ValidationError) -> str:
+    """Same "field: message" format as the global validation error handler"""
+    errors = []
+    for error in e.errors():
+        field = " -> ".join(str(loc) for loc in error["loc"])
+        errors.append(f"{field}: {error['msg']}" if field else error["msg"])
+    return "; ".join(errors)
+
+
+def _too_large(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=detail)
+
+
+async def iter_lines(request: Request):
+    """Every line of the body as bytes, without the newline"""
+    # Only ever holds the start of one line, so only the new piece needs searching for newlines
+    buffer = bytearray()
+    line_number = 0
+    async for chunk in request.stream():
+        start = 0
+        while (end := chunk.find(b"\n", start)) != -1:
+            buffer += chunk[start:end]
+            line_number += 1
+            if len(buffer) > MAX_LINE_BYTES:
+                raise _too_large(f"Line {line_number} is longer than {MAX_LINE_BYTES} bytes")
+            yield bytes(buffer)
+            buffer.clear()
+            start = end + 1
+        buffer += chunk[start:]
+        if len(buffer) > MAX_LINE_BYTES:
+            raise _too_large(f"Line {line_number + 1} is longer than {MAX_LINE_BYTES} bytes")
+    if buffer:
+        yield bytes(buffer)
+
+
+async def iter_ndjson(request: Request):
+    async for line in iter_lines(request):
+        if line.strip():
+            yield parse_ndjson_line(line)
+
+
+async def iter_csv(request: Request):
+    """Rows of a CSV body as dicts keyed by the header row"""
+    header = None
+    pending = []
+    pending_size = 0
+    quotes = 0
+    first_line = True
+
+    async for line in iter_lines(request):
+        try:
+            # utf-8-sig drops the byte order mark Excel likes to add
+            text = line.decode("utf-8-sig" if first_line else "utf-8").rstrip("\r")
+        except UnicodeDecodeError:
+            yield InvalidRecord("Invalid UTF-8")
+            continue
+        first_line = False
+
+        # A newline inside a quoted field doesn't end the record - wait until the quotes balance
+        pending.append(text)
+        pending_size += len(line) + 1
+        quotes += text.count('"')
+        if quotes % 2:
+            if pending_size > MAX_RECORD_BYTES:
+                raise _too_large(f"A CSV record is longer than {MAX_RECORD_BYTES} bytes - is a quote never closed?")
+            continue
+        record = "\n".join(pending)
+        pending, pending_size, quotes = [], 0, 0
+
+        if not record.strip():
+            continue
+        try:
+            values = next(csv.reader([record]))
+        except csv.Error:
+            yield InvalidRecord("Invalid CSV")
+            continue
+
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        yield dict(zip(header, values))
+
+    if pending:
+        yield InvalidRecord("Unterminated quoted field")
@@ -0,0 +1,370 @@
+"""
+Write-behind batching for POST /api/attendance/ (ATTENDANCE_BATCHING=true).
+
+Everyone marks attendance in the same few minutes each morning. Each mark
+is normally its own transaction, so the database's commit latency caps how
+many marks per second get through. With batching on, the route validates
+the request and checks the employee exists (usually from the employee
+cache), then queues the write. One flusher per worker takes everything that
+queued up - after ATTENDANCE_BATCH_MAX_WAIT_MS, or as soon as
+ATTENDANCE_BATCH_MAX_ROWS are waiting - and writes it with one multi-row
+INSERT ... ON CONFLICT DO NOTHING for the new records, one locked upsert for
+the ones that already existed, and one commit. While a batch is being
+written the next one queues up, so batches grow with the load.
+
+Callers pick per request:
+- ?wait=true (default): the response comes after the commit, with the same
+  201 and body as without batching. The only difference is up to
+  ATTENDANCE_BATCH_MAX_WAIT_MS of extra latency when traffic is low.
+- ?wait=false: 202 straight away with a token. GET
+  /api/attendance/writes/{token} tells you when it's committed. Until then
+  the write only lives in the worker's memory, so a crash loses it. A clean
+  shutdown flushes the queue first.
+
+Backpressure: each worker holds at most ATTENDANCE_BATCH_MAX_PENDING queued
+writes (including the batch being written). Beyond that, new writes get a
+503 with Retry-After instead of piling up in memory.
+
+Tokens encode the employee, date and status, so any worker can answer for
+a committed write from the database. Only the worker that took the write
+knows it's still queued or that it failed. Other workers answer "unknown"
+until it's committed.
+"""
+import asyncio
+import base64
+import json
+import logging
+import uuid
+from collections import OrderedDict, deque
+from typing import Dict, Optional, Tuple
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, tuple_
+from sqlalchemy.exc import IntegrityError
+from app.config import settings
+from app.database import SessionLocal, dialect_insert
+from app import counters, live, models, schemas, summary
+from app.cache import employee_cache
+
+logger = logging.getLogger("app.write_behind")
+
+attendance_table = models.Attendance.__table__
+
+QUEUED, COMMITTED, FAILED, UNKNOWN = "queued", "committed", "failed", "unknown"
+
+
+class QueueFull(Exception):
+    """This worker already holds ATTENDANCE_BATCH_MAX_PENDING writes"""
+
+
+class PendingWrite:
+    """One queued mark - the record, plus its outcome once the flusher gets to it"""
+    __slots__ = ("record", "department", "queued_at", "future", "token", "status", "attendance_id", "error")
+
+    def __init__(self, record: schemas.AttendanceCreate, department: str, queued_at: float, future=None, token=None):
+        self.record = record
+        self.department = department
+        self.queued_at = queued_at
+        self.future = future  # only when the caller waits for the commit
+        self.token = token  # only when it doesn't
+        self.status = QUEUED
+        self.attendance_id = None
+        self.error: Optional[Exception] = None
+
+    @property
+    def key(self) -> Tuple[str, object]:
+        return self.record.employee_id, self.record.date
+
+    def attendance(self) -> dict:
+        return {**self.record.model_dump(), "id": self.attendance_id}
+
+
+def _employee_not_found(employee_id: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Employee with ID '{employee_id}' not found"
+    )
+
+
+def _upsert(db, writes: Dict[tuple, PendingWrite]) -> Dict[tuple, int]:
+    """Write the last mark for each (employee, date) in one commit, returning the attendance ids"""
+    # The previous statuses, so the rollup and counters can be adjusted instead of recounted.
+    # They have to be read under the same locks as the write, or two overlapping flushes
+    # (two workers) would both adjust from the same old status.
+    old_statuses, ids = {}, {}
+    # Always in key order, so two flushes lock the same rows in the same order instead of deadlocking
+    remaining = sorted(writes)
+    while remaining:
+        # New records first - anything this returns had no previous status
+        stmt = dialect_insert(db.bind)(attendance_table).values(
+            [writes[key].record.model_dump() for key in remaining]
+        ).on_conflict_do_nothing(index_elements=["employee_id", "date"]).returning(
+            attendance_table.c.id, attendance_table.c.employee_id, attendance_table.c.date
+        )
+        for row in db.execute(stmt):
+            key = (row.employee_id, row.date)
+            ids[key], old_statuses[key] = row.id, None
+        remaining = [key for key in remaining if key not in ids]
+        if not remaining:
+            break
+
+        # The rest already exist - lock them, then read and update them (SQLite already holds
+        # the database's write lock from the INSERT, so FOR UPDATE isn't needed there)
+        locked = {
+            (row.employee_id, row.date): row.status
+            for row in db.execute(
+                select(attendance_table.c.employee_id, attendance_table.c.date, attendance_table.c.status).where(
+                    tuple_(attendance_table.c.employee_id, attendance_table.c.date).in_(remaining)
+                ).order_by(attendance_table.c.employee_id, attendance_table.c.date).with_for_update()
+            )
+        }
+        if locked:
+            stmt = dialect_insert(db.bind)(attendance_table).values(
+                [writes[key].record.model_dump() for key in remaining if key in locked]
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["employee_id", "date"],
+                set_={"status": stmt.excluded.status}
+            ).returning(attendance_table.c.id, attendance_table.c.employee_id, attendance_table.c.date)
+            ids.update({(row.employee_id, row.date): row.id for row in db.execute(stmt)})
+            old_statuses.update(locked)
+        # Deleted since the INSERT - go round again and insert them
+        remaining = [key for key in remaining if key not in locked]
+
+    versions = summary.record_changes(db, (
+        (write.record.date, write.department, old_statuses.get(key), write.record.status)
+        for key, write in writes.items()
+    ))
+    counters.record_changes(db, (
+        (write.record.employee_id, write.record.date, old_statuses.get(key), write.record.status)
+        for key, write in writes.items()
+    ))
+    live.publish(db, [
+        live.attendance_event(
+            {"id": ids[key], **write.record.model_dump()}, write.department, old_statuses.get(key), write.record.status,
+            versions.get((write.record.date, write.department))
+        )
+        for key, write in writes.items() if old_statuses.get(key) != write.record.status
+    ])
+    db.commit()
+    return ids
+
+
+def write_batch(batch: list):
+    """Write a batch and record each write's outcome on it. Runs in the threadpool."""
+    # Two marks for the same employee and day - the later one wins, like two POSTs would
+    latest = {}
+    for write in batch:
+        latest[write.key] = write
+
+    ids = {}
+    with SessionLocal() as db:
+        try:
+            ids = _upsert(db, latest)
+        except IntegrityError:
+            # An employee was deleted after their write was queued - drop those and retry the rest
+            db.rollback()
+            existing = set(db.execute(
+                select(models.Employee.employee_id).where(models.Employee.employee_id.in_({key[0] for key in latest}))
+            ).scalars())
+            for key in [key for key in latest if key[0] not in existing]:
+                employee_cache.invalidate(key[0])
+                del latest[key]
+            if latest:
+                ids = _upsert(db, latest)
+
+    for write in batch:
+        if write.key in ids:
+            write.status = COMMITTED
+            write.attendance_id = ids[write.key]
+        else:
+            write.status = FAILED
+            write.error = _employee_not_found(write.record.employee_id)
+
+
+class AttendanceBatcher:
+    """Per worker queue of attendance writes and the task that flushes it"""
+
+    def __init__(self, max_rows: int, max_wait_ms: float, max_pending: int):
+        self.max_rows = max_rows
+        self.max_wait = max_wait_ms / 1000
+        self.max_pending = max_pending
+        self._pending = deque()
+        self._in_flight = 0
+        self._task = None
+        self._stopping = False
+        self._arrived = None  # asyncio.Events, created on the worker's event loop
+        self._full = None
+        # Writes queued with ?wait=false, by token - the oldest are forgotten once it's full
+        self.recent: "OrderedDict[str, PendingWrite]" = OrderedDict()
+        self.recent_limit = max_pending * 10
+        self.batches = 0
+        self.rows = 0
+        self.largest_batch = 0
+        self.rejected = 0
+
+    def _start(self):
+        # Also after the flusher died - whatever it left queued goes in the next batch
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._arrived = asyncio.Event()
+            self._full = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            self._task.add_done_callback(self._stopped)
+
+    def _stopped(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Attendance flusher died, restarting on the next write", exc_info=task.exception())
+
+    def submit(self, record: schemas.AttendanceCreate, department: str, wait: bool) -> PendingWrite:
+        """Queue a validated write - raises QueueFull when the worker is at its limit"""
+        if len(self._pending) + self._in_flight >= self.max_pending:
+            self.rejected += 1
+            raise QueueFull()
+        self._start()
+        loop = asyncio.get_running_loop()
+        if wait:
+            write = PendingWrite(record, department, loop.time(), future=loop.create_future())
+        else:
+            write = PendingWrite(record, department, loop.time(), token=encode_token(record))
+            self.recent[write.token] = write
+            while len(self.recent) > self.recent_limit:
+                self.recent.popitem(last=False)
+        self._pending.append(write)
+        self._arrived.set()
+        if self._batch_ready():
+            self._full.set()
+        return write
+
+    def _batch_ready(self) -> bool:
+        # A full batch, or a full queue - no point waiting for writes that would be turned away
+        return len(self._pending) >= self.max_rows or len(self._pending) + self._in_flight >= self.max_pending
+
+    async def _next_batch(self) -> list:
+        await self._arrived.wait()
+        if not self._batch_ready():
+            self._full.clear()  # it may have been set while the last batch was in flight
+        if not self._pending:
+            return []  # woken up to stop
+        # Give the batch until the oldest write has waited max_wait to fill up - unless shutting down
+        delay = self.max_wait - (asyncio.get_running_loop().time() - self._pending[0].queued_at)
+        if delay > 0 and not self._batch_ready() and not self._stopping:
+            try:
+                await asyncio.wait_for(self._full.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+        batch = self._take()
+        if not self._batch_ready():
+            self._full.clear()
+        if not self._pending:
+            self._arrived.clear()
+        return batch
+
+    def _take(self) -> list:
+        return [self._pending.popleft() for _ in range(min(self.max_rows, len(self._pending)))]
+
+    async def _flush(self, batch: list):
+        self._in_flight = len(batch)
+        try:
+            await run_in_threadpool(write_batch, batch)
+        except Exception as e:
+            for write in batch:
+                write.status = FAILED
+                write.error = e
+        finally:
+            self._in_flight = 0
+        self.batches += 1
+        self.rows += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        for write in batch:
+            if write.future is not None and not write.future.done():
+                if write.error is not None:
+                    write.future.set_exception(write.error)
+                else:
+                    write.future.set_result(write.attendance())
+
+    async def _run(self):
+        while self._pending or not self._stopping:
+            batch = await self._next_batch()
+            if batch:
+                await self._flush(batch)
+
+    async def close(self):
+        """Let the flusher write whatever is still queued, then stop it - on worker shutdown"""
+        if self._task is None:
+            return
+        # Not cancelled - that could land in the middle of a flush and leave its callers waiting forever
+        self._stopping = True
+        self._arrived.set()
+        self._full.set()
+        task = self._task
+        try:
+            await task
+        except Exception:
+            pass  # logged by _stopped
+        if self._task is task:
+            self._task = None
+        # Only if the flusher died before it got to them
+        while self._pending:
+            await self._flush(self._take())
+
+    def stats(self) -> dict:
+        return {
+            "enabled": settings.attendance_batching,
+            "max_rows": self.max_rows,
+            "max_wait_ms": self.max_wait * 1000,
+            "max_pending": self.max_pending,
+            "pending": len(self._pending),
+            "in_flight": self._in_flight,
+            "batches": self.batches,
+            "rows": self.rows,
+            "average_batch": round(self.rows / self.batches, 1) if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "rejected": self.rejected,
+        }
+
+
+batcher = AttendanceBatcher(
+    max_rows=settings.attendance_batch_max_rows,
+    max_wait_ms=settings.attendance_batch_max_wait_ms,
+    max_pending=settings.attendance_batch_max_pending
+)
+
+
+def encode_token(record: schemas.AttendanceCreate) -> str:
+    raw = json.dumps([record.employee_id, record.date.isoformat(), record.status.value, uuid.uuid4().hex])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_token(token: str) -> list:
+    """[employee_id, date, status, nonce], or 400 if it isn't one of our tokens"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token.encode()))
+        if isinstance(values, list) and len(values) == 4:
+            return values
+    except ValueError:
+        pass
+    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid write token")
+
+
+def write_status(db, token: str) -> dict:
+    """Where a ?wait=false write stands - from this worker's memory, or from the database"""
+    employee_id, day, status_value, _ = decode_token(token)
+    write = batcher.recent.get(token)
+    if write is not None:
+        result = {"token": token, "status": write.status}
+        if write.status == COMMITTED:
+            result["attendance"] = write.attendance()
+        elif write.status == FAILED:
+            result["detail"] = getattr(write.error, "detail", None) or "Database error occurred"
+        return result
+
+    # Not this worker's write (or long forgotten) - committed if the database has it
+    row = db.execute(
+        select(attendance_table.c.employee_id, attendance_table.c.date, attendance_table.c.status, attendance_table.c.id).where(
+            attendance_table.c.employee_id == employee_id, attendance_table.c.date == day
+        )
+    ).first()
+    if row is not None and row.status.value == status_value:
+        return {"token": token, "status": COMMITTED, "attendance": row._asdict()}
+    return {"token": token, "status": UNKNOWN}
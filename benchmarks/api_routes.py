@@ -0,0 +1,464 @@
+"""
+Latency benchmark for every route in app/routers/employees.py and attendance.py.
+
+Seeds N employees x D days of attendance into a throwaway database, then drives
+each route in-process - requests go straight into the ASGI app, no server or
+sockets - at a fixed concurrency. Reports p50/p95/p99 latency, throughput and
+database queries per request for each route.
+
+With --url the same requests go over HTTP to a running server instead, to
+compare server setups (uvicorn vs gunicorn.conf.py, worker counts). Start the
+server against the same --database-url; the benchmark migrates and seeds it.
+
+Usage:
+    python -m benchmarks.api_routes --employees 1000 --days 90
+    python -m benchmarks.api_routes --concurrency 32 --requests 500 --output before.json
+    python -m benchmarks.api_routes --database-url postgresql://... --database-mode async
+    python -m benchmarks.api_routes --output after.json --compare before.json
+    python -m benchmarks.api_routes --routes get_employee,mark_attendance
+    python -m benchmarks.api_routes --database-url sqlite:////tmp/bench.db --url http://127.0.0.1:8000
+
+Defaults to a throwaway SQLite file. Point --database-url at an empty Postgres
+database for realistic numbers - the benchmark creates and seeds its own tables.
+Keep the JSON files around to compare commits.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import tempfile
+import time
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from typing import Callable, NamedTuple, Optional
+from urllib.parse import urlsplit
+from sqlalchemy import event, text
+from benchmarks.seed import seed, bench_employee_id
+
+# Query counter for the request being driven right now. Starlette copies the
+# context into the threadpool, so sync routes see the same list.
+_query_count: ContextVar[Optional[list]] = ContextVar("query_count", default=None)
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _query_count.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+class Result(NamedTuple):
+    status: int
+    body: bytes
+    headers: dict
+
+
+async def call(app, method: str, path: str, query: str = "", body=None, headers: Optional[dict] = None) -> Result:
+    """Send one request straight into the ASGI app"""
+    headers = dict(headers or {})
+    payload = b""
+    if body is not None:
+        payload = json.dumps(body).encode()
+        headers["content-type"] = "application/json"
+    headers["content-length"] = str(len(payload))
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(b"host", b"benchmark")] + [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        "client": ("127.0.0.1", 0),
+        "server": ("benchmark", 80),
+    }
+
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+        # Streaming responses listen for a disconnect - the client never leaves
+        await asyncio.Event().wait()
+
+    response = {"status": 0, "headers": {}, "body": []}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {k.decode(): v.decode() for k, v in message.get("headers", [])}
+        elif message["type"] == "http.response.body":
+            response["body"].append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return Result(response["status"], b"".join(response["body"]), response["headers"])
+
+
+class HttpClient:
+    """Bare bones HTTP/1.1 client for --url. Connections are kept alive and reused,
+    like a load balancer's, so the numbers are about the server and not TCP setup."""
+
+    def __init__(self, url: str):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self._idle = []
+
+    async def __call__(self, method: str, path: str, query: str = "", body=None, headers: Optional[dict] = None) -> Result:
+        headers = dict(headers or {})
+        payload = b""
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers["content-type"] = "application/json"
+        headers["content-length"] = str(len(payload))
+        headers["host"] = f"{self.host}:{self.port}"
+
+        target = f"{path}?{query}" if query else path
+        head = f"{method} {target} HTTP/1.1\r\n" + "".join(f"{k}: {v}\r\n" for k, v in headers.items()) + "\r\n"
+
+        reader, writer = self._idle.pop() if self._idle else await asyncio.open_connection(self.host, self.port)
+        writer.write(head.encode() + payload)
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError(f"{self.host}:{self.port} closed the connection")
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while (line := await reader.readline()) not in (b"\r\n", b""):
+            name, _, value = line.decode().partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+
+        if response_headers.get("transfer-encoding") == "chunked":
+            chunks = []
+            while size := int((await reader.readline()).split(b";")[0], 16):
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            await reader.readline()
+            data = b"".join(chunks)
+        else:
+            data = await reader.readexactly(int(response_headers.get("content-length", 0)))
+
+        if response_headers.get("connection") == "close":
+            writer.close()
+        else:
+            self._idle.append((reader, writer))
+        return Result(status, data, response_headers)
+
+
+class Route(NamedTuple):
+    name: str
+    method: str
+    # build(ctx, i) -> (path, query, body, headers) for the i-th request
+    build: Callable
+    expected_status: int = 200
+    # prepare(ctx, request) runs once before the route is driven, e.g. to grab ids to delete
+    prepare: Optional[Callable] = None
+
+
+def _random_employee(ctx, i):
+    # Spread requests over the whole dataset, but deterministically
+    return bench_employee_id((i * 7919) % ctx["employees"])
+
+
+async def _prepare_count_etag(ctx, request):
+    result = await request("GET", "/api/employees/stats/count")
+    ctx["count_etag"] = result.headers.get("etag", "")
+
+
+async def _prepare_attendance_ids(ctx, request):
+    # Delete records from the oldest seeded day so the other routes' data is untouched
+    with ctx["engine"].connect() as conn:
+        ctx["attendance_ids"] = conn.execute(
+            text("SELECT id FROM attendance WHERE date = :day ORDER BY id LIMIT :limit"),
+            {"day": ctx["first_day"].isoformat(), "limit": ctx["requests"]}
+        ).scalars().all()
+
+
+def _load_employee_id(ctx, i):
+    return f"LOAD{ctx['run_id']}{i:07d}"
+
+
+ROUTES = [
+    # employees.py
+    Route("create_employee", "POST", lambda ctx, i: (
+        "/api/employees/", "", {
+            "employee_id": _load_employee_id(ctx, i),
+            "full_name": f"Load Test {i}",
+            "email": f"load{ctx['run_id']}{i}@example.com",
+            "department": "Engineering",
+        }, None
+    ), expected_status=201),
+    Route("list_employees_page", "GET", lambda ctx, i: ("/api/employees/", "limit=100", None, None)),
+    Route("list_employees_csv", "GET", lambda ctx, i: ("/api/employees/", "format=csv", None, None)),
+    Route("get_employee", "GET", lambda ctx, i: (f"/api/employees/{_random_employee(ctx, i)}", "", None, None)),
+    Route("search_employees_id", "GET", lambda ctx, i: (
+        "/api/employees/search", f"q={_random_employee(ctx, i)}", None, None
+    )),
+    Route("search_employees_name", "GET", lambda ctx, i: (
+        "/api/employees/search", f"q=employee+{(i * 7919) % ctx['employees']}", None, None
+    )),
+    # Matches an eighth of all employees - the worst case for ranking
+    Route("search_employees_department", "GET", lambda ctx, i: ("/api/employees/search", "q=sales", None, None)),
+    Route("employees_count", "GET", lambda ctx, i: ("/api/employees/stats/count", "", None, None)),
+    Route("employees_count_not_modified", "GET", lambda ctx, i: (
+        "/api/employees/stats/count", "", None, {"if-none-match": ctx["count_etag"]}
+    ), expected_status=304, prepare=_prepare_count_etag),
+    Route("delete_employee", "DELETE", lambda ctx, i: (
+        f"/api/employees/{_load_employee_id(ctx, i)}", "", None, None
+    )),
+    # attendance.py
+    Route("mark_attendance", "POST", lambda ctx, i: (
+        "/api/attendance/", "", {
+            "employee_id": bench_employee_id(i % ctx["employees"]),
+            "date": (ctx["last_day"] + timedelta(days=1)).isoformat(),
+            "status": "Present",
+        }, None
+    ), expected_status=201),
+    Route("bulk_mark_attendance", "POST", lambda ctx, i: (
+        "/api/attendance/bulk", "", [
+            {
+                "employee_id": bench_employee_id((i * ctx["bulk_size"] + n) % ctx["employees"]),
+                "date": (ctx["last_day"] + timedelta(days=2)).isoformat(),
+                "status": "Absent",
+            }
+            for n in range(ctx["bulk_size"])
+        ], None
+    )),
+    Route("list_attendance_day_page", "GET", lambda ctx, i: (
+        "/api/attendance/", f"date_filter={ctx['last_day']}&limit=100", None, None
+    )),
+    Route("list_attendance_range_page", "GET", lambda ctx, i: (
+        "/api/attendance/", f"start_date={ctx['last_day'] - timedelta(days=6)}&end_date={ctx['last_day']}&limit=100", None, None
+    )),
+    Route("list_attendance_day_csv", "GET", lambda ctx, i: (
+        "/api/attendance/", f"date_filter={ctx['last_day']}&format=csv", None, None
+    )),
+    Route("employee_attendance", "GET", lambda ctx, i: (f"/api/attendance/{_random_employee(ctx, i)}", "", None, None)),
+    Route("today_present_count", "GET", lambda ctx, i: ("/api/attendance/today/present-count", "", None, None)),
+    Route("department_stats", "GET", lambda ctx, i: (
+        "/api/attendance/stats/departments", f"start_date={ctx['first_day']}&end_date={ctx['last_day']}", None, None
+    )),
+    Route("analytics_month", "GET", lambda ctx, i: (
+        "/api/attendance/analytics", f"group_by=month&start_date={ctx['first_day']}&end_date={ctx['last_day']}", None, None
+    )),
+    Route("analytics_employee_range", "GET", lambda ctx, i: (
+        "/api/attendance/analytics", f"group_by=employee&start_date={ctx['last_day'] - timedelta(days=6)}&end_date={ctx['last_day']}", None, None
+    )),
+    Route("monthly_report_page", "GET", lambda ctx, i: (
+        f"/api/attendance/monthly-report/{ctx['last_day'].year}/{ctx['last_day'].month}", "limit=100", None, None
+    )),
+    Route("delete_attendance", "DELETE", lambda ctx, i: (
+        f"/api/attendance/{ctx['attendance_ids'][i % len(ctx['attendance_ids'])]}", "", None, None
+    ), prepare=_prepare_attendance_ids),
+]
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def drive(request, route: Route, ctx: dict, requests: int, concurrency: int, warmup: int) -> dict:
+    """request(method, path, query, body, headers) -> Result sends one request, in-process or over HTTP"""
+    if route.prepare:
+        await route.prepare(ctx, request)
+
+    async def send(i):
+        path, query, body, headers = route.build(ctx, i)
+        counter = [0]
+        token = _query_count.set(counter)
+        start = time.perf_counter()
+        try:
+            result = await request(route.method, path, query, body, headers)
+        finally:
+            _query_count.reset(token)
+        return (time.perf_counter() - start) * 1000, counter[0], result
+
+    # Warm up read routes only - a warm-up write would change what the measured requests do
+    if route.method == "GET":
+        for i in range(warmup):
+            await send(i)
+
+    latencies, queries, errors = [], [], {}
+    next_request = iter(range(requests))
+
+    async def worker():
+        for i in next_request:
+            elapsed_ms, query_count, result = await send(i)
+            latencies.append(elapsed_ms)
+            queries.append(query_count)
+            if result.status != route.expected_status:
+                errors[result.status] = errors.get(result.status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall_seconds = time.perf_counter() - start
+
+    latencies.sort()
+    # Only in-process runs can see the queries - over HTTP they run in the server
+    counted = ctx["count_queries"]
+    return {
+        "method": route.method,
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "max_ms": round(latencies[-1], 3),
+        "throughput_rps": round(requests / wall_seconds, 1),
+        "queries_per_request": round(sum(queries) / len(queries), 2) if counted else None,
+        "max_queries": max(queries) if counted else None,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, baseline=None):
+    header = f"{'route':<30}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'queries':>9}{'errors':>8}"
+    if baseline:
+        header += f"{'p50 vs base':>13}"
+    print(header)
+    for name, row in results.items():
+        queries = "-" if row["queries_per_request"] is None else f"{row['queries_per_request']:.1f}"
+        line = (
+            f"{name:<30}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}"
+            f"{row['throughput_rps']:>10.1f}{queries:>9}{sum(row['errors'].values()):>8}"
+        )
+        base = (baseline or {}).get(name)
+        if base:
+            change = (row["p50_ms"] - base["p50_ms"]) / max(base["p50_ms"], 0.001) * 100
+            line += f"{change:>+12.0f}%"
+        print(line)
+
+
+async def run(app, ctx, routes, args):
+    if args.url:
+        request = HttpClient(args.url)
+    else:
+        request = partial(call, app)
+        # Startup/shutdown handlers normally run by uvicorn
+        await app.router.startup()
+    try:
+        results = {}
+        for route in routes:
+            print(f"  {route.name}...", flush=True)
+            results[route.name] = await drive(request, route, ctx, args.requests, args.concurrency, args.warmup)
+        return results
+    finally:
+        if not args.url:
+            await app.router.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Empty database to benchmark against (default: temporary SQLite file)")
+    parser.add_argument("--database-mode", choices=["sync", "async"], default="sync")
+    parser.add_argument("--employees", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per route")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight at once")
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests per read route")
+    parser.add_argument("--bulk-size", type=int, default=100, help="Rows per bulk attendance request")
+    parser.add_argument("--routes", help="Comma separated route names to run (default: all)")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON file from an earlier run to compare p50 against")
+    parser.add_argument("--url", help="Send the requests to a server running against --database-url, e.g. http://127.0.0.1:8000")
+    parser.add_argument("--label", help="Free text stored in the --output file, e.g. the server command")
+    args = parser.parse_args(argv)
+    if args.url and not args.database_url:
+        parser.error("--url needs the --database-url the server is running against")
+
+    routes = ROUTES
+    if args.routes:
+        wanted = set(args.routes.split(","))
+        unknown = wanted - {route.name for route in ROUTES}
+        if unknown:
+            parser.error(f"unknown routes: {', '.join(sorted(unknown))}")
+        routes = [route for route in ROUTES if route.name in wanted]
+
+    database_url = args.database_url
+    if not database_url:
+        database_url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "api_routes.db")
+
+    # The app builds its engine from settings at import time, so configure it first
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["DATABASE_MODE"] = args.database_mode
+    from main import app
+    from app import counters, database, migrations, summary
+
+    engine = database.engine
+    migrations.upgrade(engine)
+    event.listen(engine, "before_cursor_execute", _count_query)
+    if args.database_mode == "async":
+        event.listen(database.get_async_engine().sync_engine, "before_cursor_execute", _count_query)
+
+    print(f"Seeding {args.employees} employees x {args.days} days = {args.employees * args.days:,} rows...")
+    start = time.perf_counter()
+    first_day, last_day = seed(engine, args.employees, args.days)
+    with database.SessionLocal() as db:
+        summary.rebuild(db)
+        counters.rebuild(db)
+        db.commit()
+    seed_seconds = time.perf_counter() - start
+    print(f"  done in {seed_seconds:.1f}s")
+
+    ctx = {
+        "engine": engine,
+        "employees": args.employees,
+        "first_day": first_day,
+        "last_day": last_day,
+        "requests": args.requests,
+        "bulk_size": args.bulk_size,
+        "run_id": datetime.now(timezone.utc).strftime("%H%M%S"),
+        "count_queries": not args.url,
+    }
+
+    target = args.url or "in-process"
+    print(f"Driving {len(routes)} routes ({target}), {args.requests} requests each at concurrency {args.concurrency}:")
+    results = asyncio.run(run(app, ctx, routes, args))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["routes"]
+
+    print()
+    print_results(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "commit": git_commit(),
+                "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "dialect": engine.dialect.name,
+                "database_mode": args.database_mode,
+                "url": args.url,
+                "label": args.label,
+                "employees": args.employees,
+                "days": args.days,
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+                "seed_seconds": round(seed_seconds, 2),
+                "routes": results,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Benchmark for the attendance indexes (uq_attendance_employee_date, ix_attendance_date_status).
+
+Seeds a synthetic attendance table, then runs the hot queries from the routers
+with the indexes dropped and again with them created, printing the query plan
+and latency of each.
+
+Usage:
+    python -m benchmarks.attendance_indexes --employees 10000 --days 1000   # 10M rows
+    python -m benchmarks.attendance_indexes --database-url postgresql://... --employees 10000 --days 1000
+
+Defaults to a throwaway SQLite file. Point it at an empty Postgres database
+for realistic numbers - the benchmark creates and seeds its own tables.
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from datetime import timedelta
+from sqlalchemy import create_engine, text
+from app import migrations
+from benchmarks.seed import seed, bench_employee_id
+
+INDEXES = {
+    "uq_attendance_employee_date": "CREATE UNIQUE INDEX uq_attendance_employee_date ON attendance (employee_id, date)",
+    "ix_attendance_date_status": "CREATE INDEX ix_attendance_date_status ON attendance (date, status)",
+}
+
+# The hot queries from attendance.py / employees.py, written out as SQL
+QUERIES = {
+    "today_present_count": (
+        "SELECT count(*) FROM attendance WHERE date = :day AND status = 'PRESENT'"
+    ),
+    "date_range_listing": (
+        "SELECT attendance.id, attendance.employee_id, attendance.date, attendance.status, employees.full_name "
+        "FROM attendance JOIN employees ON attendance.employee_id = employees.employee_id "
+        "WHERE attendance.date >= :start AND attendance.date <= :day ORDER BY attendance.date DESC"
+    ),
+    "employee_present_days": (
+        "SELECT count(*) FROM attendance WHERE employee_id = :employee_id AND status = 'PRESENT'"
+    ),
+    "employee_history": (
+        "SELECT id, employee_id, date, status FROM attendance WHERE employee_id = :employee_id ORDER BY date DESC"
+    ),
+    "existing_record_lookup": (
+        "SELECT id FROM attendance WHERE employee_id = :employee_id AND date = :day"
+    ),
+}
+
+
+def explain(conn, sql, params):
+    if conn.dialect.name == "sqlite":
+        rows = conn.execute(text("EXPLAIN QUERY PLAN " + sql), params).fetchall()
+        return [row[-1] for row in rows]
+    rows = conn.execute(text("EXPLAIN (ANALYZE, BUFFERS) " + sql), params).fetchall()
+    return [row[0] for row in rows]
+
+
+def time_query(conn, sql, params, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(text(sql), params).fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "median_ms": round(statistics.median(timings), 3),
+        "min_ms": round(min(timings), 3),
+        "max_ms": round(max(timings), 3),
+    }
+
+
+def run_queries(engine, params, repeat):
+    results = {}
+    with engine.connect() as conn:
+        for name, sql in QUERIES.items():
+            results[name] = {
+                "plan": explain(conn, sql, params),
+                **time_query(conn, sql, params, repeat),
+            }
+    return results
+
+
+def analyze(engine):
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Empty database to benchmark against (default: temporary SQLite file)")
+    parser.add_argument("--employees", type=int, default=10000)
+    parser.add_argument("--days", type=int, default=1000)
+    parser.add_argument("--range-days", type=int, default=7, help="Width of the date range listing query")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    database_url = args.database_url
+    if not database_url:
+        database_url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "attendance_indexes.db")
+    engine = create_engine(database_url)
+
+    migrations.upgrade(engine)
+    # Seed without the indexes - it's much faster and gives us the "before" picture
+    with engine.begin() as conn:
+        for name in INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+    print(f"Seeding {args.employees} employees x {args.days} days = {args.employees * args.days:,} rows...")
+    start = time.perf_counter()
+    first_day, last_day = seed(engine, args.employees, args.days)
+    seed_seconds = time.perf_counter() - start
+    print(f"  done in {seed_seconds:.1f}s")
+
+    params = {
+        "day": last_day.isoformat(),
+        "start": (last_day - timedelta(days=args.range_days - 1)).isoformat(),
+        "employee_id": bench_employee_id(args.employees // 2),
+    }
+
+    analyze(engine)
+    before = run_queries(engine, params, args.repeat)
+
+    index_build = {}
+    for name, sql in INDEXES.items():
+        start = time.perf_counter()
+        with engine.begin() as conn:
+            conn.execute(text(sql))
+        index_build[name] = round(time.perf_counter() - start, 2)
+    analyze(engine)
+    after = run_queries(engine, params, args.repeat)
+
+    print(f"\nIndex build time (s): {index_build}\n")
+    print(f"{'query':<26}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for name in QUERIES:
+        speedup = before[name]["median_ms"] / max(after[name]["median_ms"], 0.001)
+        print(f"{name:<26}{before[name]['median_ms']:>12.2f}{after[name]['median_ms']:>12.2f}{speedup:>9.1f}x")
+
+    for name in QUERIES:
+        print(f"\n== {name}")
+        print("  before: " + "\n          ".join(before[name]["plan"]))
+        print("  after:  " + "\n          ".join(after[name]["plan"]))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "dialect": engine.dialect.name,
+                "rows": args.employees * args.days,
+                "seed_seconds": round(seed_seconds, 2),
+                "index_build_seconds": index_build,
+                "params": params,
+                "before": before,
+                "after": after,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Synthetic data for benchmarks.
+
+Rows are generated inside the database (generate_series on Postgres, a
+recursive CTE on SQLite) so seeding millions of attendance rows doesn't
+have to push every row through Python.
+"""
+from datetime import date, timedelta
+from sqlalchemy import text
+
+DEPARTMENTS = ["Engineering", "Sales", "Marketing", "Finance", "HR", "Operations", "Support", "Legal"]
+
+
+def _department_case(column):
+    cases = " ".join(f"WHEN {i} THEN '{name}'" for i, name in enumerate(DEPARTMENTS))
+    return f"CASE {column} % {len(DEPARTMENTS)} {cases} END"
+
+
+SQLITE_EMPLOYEES = """
+WITH RECURSIVE seq(n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM seq WHERE n < :count - 1)
+INSERT INTO employees (employee_id, full_name, email, department)
+SELECT printf('BENCH%07d', n), 'Bench Employee ' || n, 'bench' || n || '@example.com', {department}
+FROM seq
+"""
+
+SQLITE_ATTENDANCE = """
+WITH RECURSIVE days(n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM days WHERE n < :days - 1)
+INSERT INTO attendance (employee_id, date, status)
+SELECT e.employee_id, date(:end_date, '-' || days.n || ' days'),
+       CASE WHEN abs(random()) % 100 < :present_pct THEN 'PRESENT' ELSE 'ABSENT' END
+FROM days CROSS JOIN employees e
+WHERE e.employee_id LIKE 'BENCH%'
+ORDER BY days.n DESC, e.employee_id
+"""
+
+POSTGRES_EMPLOYEES = """
+INSERT INTO employees (employee_id, full_name, email, department)
+SELECT 'BENCH' || lpad(n::text, 7, '0'), 'Bench Employee ' || n, 'bench' || n || '@example.com', {department}
+FROM generate_series(0, :count - 1) AS n
+"""
+
+POSTGRES_ATTENDANCE = """
+INSERT INTO attendance (employee_id, date, status)
+SELECT e.employee_id, CAST(:end_date AS date) - d,
+       CAST(CASE WHEN random() * 100 < :present_pct THEN 'PRESENT' ELSE 'ABSENT' END AS attendancestatus)
+FROM generate_series(0, :days - 1) AS d CROSS JOIN employees e
+WHERE e.employee_id LIKE 'BENCH%'
+ORDER BY d DESC, e.employee_id
+"""
+
+
+def bench_employee_id(n: int) -> str:
+    return f"BENCH{n:07d}"
+
+
+def seed(engine, employees: int, days: int, end_date: date = None, present_pct: int = 90):
+    """Insert `employees` synthetic employees with `days` days of attendance each, ending at end_date"""
+    end_date = end_date or date.today()
+
+    if engine.dialect.name == "sqlite":
+        employees_sql, attendance_sql = SQLITE_EMPLOYEES, SQLITE_ATTENDANCE
+    else:
+        employees_sql, attendance_sql = POSTGRES_EMPLOYEES, POSTGRES_ATTENDANCE
+
+    from app import departments
+
+    with engine.begin() as conn:
+        conn.execute(text(employees_sql.format(department=_department_case("n"))), {"count": employees})
+        # The departments table and department_id, the same way migration 0005 fills them
+        departments.backfill(conn)
+        conn.execute(
+            text(attendance_sql),
+            {"days": days, "end_date": end_date.isoformat(), "present_pct": present_pct}
+        )
+
+    return end_date - timedelta(days=days - 1), end_date
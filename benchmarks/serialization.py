@@ -0,0 +1,85 @@
+"""
+Microbenchmark for the JSON path of GET /api/attendance/.
+
+Loads a listing of N rows once, then times only turning those rows into the
+response body:
+
+- validated + json     what FastAPI did before: validate the list against
+                       List[AttendanceWithEmployee], then stdlib json
+- validated + orjson   the same validation, rendered with ORJSONResponse
+                       (the app's default response class now)
+- TypeAdapter          one TypeAdapter for the whole list, validate + dump_json
+- rows -> orjson       app.responses.rows_response, what the listings use now
+
+Usage:
+    python -m benchmarks.serialization --rows 100000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from typing import List
+
+
+def time_it(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), body
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    # Throwaway database - the app builds its engine from settings at import time
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "serialization.db")
+    from fastapi.responses import JSONResponse, ORJSONResponse
+    from fastapi.routing import serialize_response
+    from pydantic import TypeAdapter
+    from app import database, migrations, schemas
+    from app.responses import rows_response
+    from app.routers import attendance
+    from benchmarks.seed import seed
+
+    migrations.upgrade(database.engine)
+    employees = 1000
+    seed(database.engine, employees, -(-args.rows // employees))
+    with database.SessionLocal() as db:
+        rows = db.execute(attendance.attendance_listing_statement().limit(args.rows)).all()
+    print(f"Serializing {len(rows):,} attendance rows (median of {args.repeat}):\n")
+
+    # The same response field FastAPI validates the route's return value against
+    route = next(r for r in attendance.router.routes if r.path == "/api/attendance/" and "GET" in r.methods)
+
+    def validated(response_class):
+        def run():
+            content = asyncio.run(serialize_response(field=route.response_field, response_content=[row._asdict() for row in rows]))
+            return response_class(content).body
+        return run
+
+    adapter = TypeAdapter(List[schemas.AttendanceWithEmployee])
+
+    paths = {
+        "validated + json": validated(JSONResponse),
+        "validated + orjson": validated(ORJSONResponse),
+        "TypeAdapter": lambda: adapter.dump_json(adapter.validate_python([row._asdict() for row in rows])),
+        "rows -> orjson": lambda: rows_response(rows).body,
+    }
+
+    baseline = None
+    print(f"{'path':<22}{'ms':>10}{'speedup':>10}{'MB':>8}")
+    for name, fn in paths.items():
+        elapsed, body = time_it(fn, args.repeat)
+        baseline = baseline or elapsed
+        print(f"{name:<22}{elapsed:>10.1f}{baseline / elapsed:>9.1f}x{len(body) / 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Morning burst benchmark - sustained POST /api/attendance/ throughput with and
+without write-behind batching (ATTENDANCE_BATCHING, see app/write_behind.py).
+
+Seeds N employees into a throwaway database, then every mode marks one day
+for every employee, --concurrency requests at a time, in-process like
+api_routes.py. Each mode runs in a fresh Python process so it picks up its
+own settings:
+
+- direct          one transaction per request (batching off)
+- batched         batching on, callers wait for the commit (201)
+- batched no-wait batching on, ?wait=false (202) - writes/sec counts until
+                  the last queued write is committed, not just accepted
+
+Reports writes per second, p50/p99 latency, commits, and the batch sizes the
+queue ended up with.
+
+Usage:
+    python -m benchmarks.write_burst
+    python -m benchmarks.write_burst --employees 20000 --output burst.json
+    python -m benchmarks.write_burst --database-url postgresql://... --database-mode async --concurrency 200
+
+Defaults to a throwaway SQLite file. Point --database-url at an empty Postgres
+database for realistic numbers - SQLite serializes writers, so every mode is
+bound by one writer there.
+
+Keep --concurrency below the threadpool's 40 threads for the direct mode in
+sync DATABASE_MODE. Above it, sync requests waiting for a pooled connection
+can hold every thread while the sessions that would release one wait for a
+thread to close in - it stalls until DB_POOL_TIMEOUT. A mode that doesn't
+finish within --timeout seconds is reported as failed.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import date, timedelta
+from sqlalchemy import create_engine
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = {
+    "direct": {"ATTENDANCE_BATCHING": "false"},
+    "batched": {"ATTENDANCE_BATCHING": "true"},
+    "batched no-wait": {"ATTENDANCE_BATCHING": "true"},
+}
+
+# Runs in the mode's own process - prints one JSON line of results
+MODE_SCRIPT = """
+import asyncio, json, sys, time
+from datetime import date
+from sqlalchemy import event
+import main
+from app import database, write_behind
+from app.config import settings
+from benchmarks.api_routes import call, percentile
+from benchmarks.seed import bench_employee_id
+
+employees, concurrency, day, query, expected = int(sys.argv[1]), int(sys.argv[2]), sys.argv[3], sys.argv[4], int(sys.argv[5])
+commits = [0]
+engines = [database.engine]
+if settings.database_mode == "async":
+    engines.append(database.get_async_engine().sync_engine)
+for engine in engines:
+    event.listen(engine, "commit", lambda conn: commits.__setitem__(0, commits[0] + 1))
+
+async def run():
+    latencies, errors = [], {}
+    next_employee = iter(range(employees))
+
+    async def worker():
+        for i in next_employee:
+            body = {"employee_id": bench_employee_id(i), "date": day, "status": "Present" if i % 10 else "Absent"}
+            start = time.perf_counter()
+            result = await call(main.app, "POST", "/api/attendance/", query, body)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if result.status != expected:
+                errors[result.status] = errors.get(result.status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    accepted = time.perf_counter() - start
+    # No-wait writes may still be queued - the run ends when they're committed
+    await write_behind.batcher.close()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "writes_per_second": round(employees / elapsed, 1),
+        "accepted_per_second": round(employees / accepted, 1),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "commits": commits[0],
+        "errors": errors,
+        "queue": write_behind.batcher.stats(),
+    }
+
+print(json.dumps(asyncio.run(run())))
+"""
+
+
+def run_mode(name: str, env: dict, employees: int, concurrency: int, day: date, timeout: float) -> dict:
+    query, expected = ("wait=false", 202) if name == "batched no-wait" else ("", 201)
+    try:
+        result = subprocess.run(
+            [sys.executable, "-c", MODE_SCRIPT, str(employees), str(concurrency), day.isoformat(), query, str(expected)],
+            env={**os.environ, **env}, cwd=ROOT, capture_output=True, text=True, timeout=timeout
+        )
+    except subprocess.TimeoutExpired:
+        return {"ok": False, "error": [f"didn't finish in {timeout:g}s"]}
+    if result.returncode != 0:
+        return {"ok": False, "error": result.stderr.strip().splitlines()[-1:]}
+    return {"ok": True, **json.loads(result.stdout.strip().splitlines()[-1])}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Empty database to run against (default: temporary SQLite file)")
+    parser.add_argument("--database-mode", choices=["sync", "async"], default="sync")
+    parser.add_argument("--employees", type=int, default=5000, help="Employees, and writes per mode")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--max-rows", type=int, help="ATTENDANCE_BATCH_MAX_ROWS for the batched modes")
+    parser.add_argument("--max-wait-ms", type=float, help="ATTENDANCE_BATCH_MAX_WAIT_MS for the batched modes")
+    parser.add_argument("--timeout", type=float, default=300, help="Seconds each mode gets to finish")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    database_url = args.database_url
+    if not database_url:
+        database_url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "write_burst.db")
+    base_env = {"DATABASE_URL": database_url, "DATABASE_MODE": args.database_mode}
+    if args.max_rows:
+        base_env["ATTENDANCE_BATCH_MAX_ROWS"] = str(args.max_rows)
+    if args.max_wait_ms is not None:
+        base_env["ATTENDANCE_BATCH_MAX_WAIT_MS"] = str(args.max_wait_ms)
+
+    subprocess.run([sys.executable, "manage.py", "migrate"], env={**os.environ, **base_env},
+                   cwd=ROOT, check=True, capture_output=True)
+    from benchmarks.seed import seed
+    engine = create_engine(database_url)
+    # One old day of attendance comes with the seed - the modes mark the days after it
+    seed(engine, args.employees, days=1, end_date=date.today() - timedelta(days=len(MODES) + 1))
+    engine.dispose()
+
+    results = {}
+    for offset, (name, env) in enumerate(MODES.items()):
+        # Each mode marks its own day, so they all insert
+        day = date.today() - timedelta(days=offset)
+        results[name] = run_mode(name, {**base_env, **env}, args.employees, args.concurrency, day, args.timeout)
+
+    print(f"{'mode':<18}{'writes/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'commits':>9}{'avg batch':>11}  errors")
+    for name, row in results.items():
+        if not row["ok"]:
+            print(f"{name:<18}FAILED {row['error']}")
+            continue
+        batch = row["queue"]["average_batch"] if name != "direct" else 1
+        print(f"{name:<18}{row['writes_per_second']:>10.1f}{row['p50_ms']:>10.2f}{row['p99_ms']:>10.2f}"
+              f"{row['commits']:>9}{batch:>11}  {row['errors'] or '-'}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "database_url": database_url.split("@")[-1], "database_mode": args.database_mode,
+                "employees": args.employees, "concurrency": args.concurrency, "results": results
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Fixtures shared by the test files: an in-memory SQLite database with every
+table, a session on it set up like the app's (app/database.py), and a GET
+request for the handlers that take one.
+
+A test file that needs data in the database overrides `db`, asking for this
+one and adding to it:
+
+    @pytest.fixture
+    def db(db):
+        create_employee(..., db=db)
+        return db
+"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from starlette.requests import Request
+from app import departments
+from app.database import Base
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    """An empty database - every session shares its one connection, so they all see the same data"""
+    # Department ids are cached per process, and every test starts from an empty database
+    monkeypatch.setattr(departments, "_ids", {})
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture
+def db(engine):
+    with sessionmaker(autocommit=False, autoflush=False, bind=engine)() as db:
+        yield db
+
+
+def make_request(etag=None, cookies=None):
+    """A GET / request, sending If-None-Match and cookies if given"""
+    headers = []
+    if etag:
+        headers.append((b"if-none-match", etag.encode()))
+    if cookies:
+        headers.append((b"cookie", "; ".join(f"{name}={value}" for name, value in cookies.items()).encode()))
+    return Request({"type": "http", "method": "GET", "path": "/", "query_string": b"", "headers": headers})
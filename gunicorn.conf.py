@@ -0,0 +1,50 @@
+"""
+Production server config: gunicorn managing uvicorn workers.
+
+    gunicorn main:app            (gunicorn picks this file up automatically)
+
+Every worker is its own process with its own event loop, threadpool and
+database pool, so the API uses every CPU core instead of one. The knobs live in
+Settings (WEB_CONCURRENCY, WEB_KEEPALIVE, ...) next to the pool sizes, see
+app/config.py.
+"""
+import os
+from app.config import settings
+from app.pool import pool_sizes, worker_count
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = worker_count()
+
+# UvicornWorker runs uvicorn with loop="auto" and http="auto" - uvloop and
+# httptools when they're installed, asyncio and h11 when they're not
+worker_class = "uvicorn.workers.UvicornWorker"
+
+keepalive = settings.web_keepalive
+timeout = settings.web_timeout
+graceful_timeout = settings.web_graceful_timeout
+max_requests = settings.web_max_requests
+max_requests_jitter = settings.web_max_requests // 10  # so the workers don't all restart at once
+
+# Import the app once in the master and fork it - workers boot faster and share
+# the imported code's memory. Importing main doesn't connect to the database.
+preload_app = True
+
+accesslog = "-"
+errorlog = "-"
+
+
+def when_ready(server):
+    pool_size, max_overflow = pool_sizes()
+    server.log.info(
+        "%d workers, each with a database pool of %d + %d overflow", workers, pool_size, max_overflow
+    )
+
+
+def post_fork(server, worker):
+    # A forked worker must never reuse a connection the master opened - two
+    # processes on one socket corrupt each other's results. close=False drops the
+    # inherited connections without closing the master's copies.
+    from app import database
+    database.engine.dispose(close=False)
+    if database.async_engine is not None:
+        database.async_engine.sync_engine.dispose(close=False)
@@ -1,14 +1,18 @@
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.exceptions import RequestValidationError
-from sqlalchemy.exc import SQLAlchemyError
-from app.database import engine, Base
-from app.routers import employees, attendance
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import SQLAlchemyError, TimeoutError as PoolTimeoutError
+from app import database
+from app.routers import employees, attendance, internal, metrics, with_async_routes
 from app.config import settings
+from app import live, migrations, profiling, replicas, write_behind
+from app.pagination import NEXT_CURSOR_HEADER
 
-# Create all database tables on startup
-Base.metadata.create_all(bind=engine)
+# Nothing here talks to the database - the engine connects on the first request.
+# Tables and migrations are applied with `python manage.py migrate` (the Procfile's
+# release step), not by every worker on boot.
 
 
 app = FastAPI(
@@ -34,6 +38,7 @@ app = FastAPI(
     docs_url="/swagger",  # Swagger UI
     redoc_url="/redoc",  # ReDoc
     openapi_url="/openapi.json",  
+    default_response_class=ORJSONResponse,  # orjson renders responses several times faster than the stdlib json
 )
 
 # Enable CORS so frontend can talk to this API
@@ -43,6 +48,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", "Last-Modified"],  # so browsers can read the pagination cursor and cache validators
 )
 
 
@@ -61,6 +67,16 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     )
 
 
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_exception_handler(request: Request, exc: PoolTimeoutError):
+    # Every pooled connection was busy for db_pool_timeout seconds - that's overload, not a broken database
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Server is busy. Please try again shortly."},
+        headers={"Retry-After": "1"}
+    )
+
+
 @app.exception_handler(SQLAlchemyError)
 async def sqlalchemy_exception_handler(request: Request, exc: SQLAlchemyError):
     return JSONResponse(
@@ -69,8 +85,68 @@ async def sqlalchemy_exception_handler(request: Request, exc: SQLAlchemyError):
     )
 
 
-app.include_router(employees.router)
-app.include_router(attendance.router)
+employee_router, attendance_router = employees.router, attendance.router
+if settings.database_mode == "async":
+    # Hot routes run on the event loop with asyncpg, everything else stays on the sync routers.
+    # Only imported here so sync workers don't build routes they never use.
+    from app.routers import async_employees, async_attendance
+    employee_router = with_async_routes(employee_router, async_employees.router)
+    attendance_router = with_async_routes(attendance_router, async_attendance.router)
+if settings.attendance_batching:
+    # Marking attendance goes through the write-behind queue, in either mode
+    from app.routers import batched_attendance
+    attendance_router = with_async_routes(attendance_router, batched_attendance.router)
+app.include_router(employee_router)
+app.include_router(attendance_router)
+
+if settings.internal_api_token:
+    # Pool, cache and queue stats - off unless a token is set, and every request has to send it
+    app.include_router(internal.router)
+
+if settings.database_read_urls and settings.read_your_writes_seconds:
+    # A client that just wrote something reads from the primary for a few seconds (see app/replicas.py)
+    app.add_middleware(replicas.ReadYourWritesMiddleware, seconds=settings.read_your_writes_seconds)
+
+if settings.profiling_enabled:
+    # Server-Timing headers on every response, histograms on /metrics (behind the internal token)
+    app.add_middleware(profiling.ProfilingMiddleware)
+    if settings.internal_api_token:
+        app.include_router(metrics.router)
+    profiling.instrument_routes(app)
+
+
+@app.on_event("startup")
+async def auto_migrate():
+    # Local development convenience - don't use with several workers, they'd all race to migrate
+    if settings.auto_migrate:
+        await run_in_threadpool(migrations.upgrade, database.engine)
+
+
+@app.on_event("startup")
+async def listen_for_live_updates():
+    # Every worker hears every worker's attendance changes through Postgres (see app/live.py)
+    if settings.live_updates_notify:
+        live.hub.start_listener(settings.database_url)
+
+
+@app.on_event("shutdown")
+async def stop_live_updates():
+    await live.hub.stop_listener()
+
+
+@app.on_event("shutdown")
+async def flush_write_queue():
+    # Write out anything still queued before the worker exits (registered first, so it runs before the engine goes)
+    await write_behind.batcher.close()
+
+
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    # Close asyncpg connections cleanly when a worker stops
+    if database.async_engine is not None:
+        await database.async_engine.dispose()
+        for replica_engine in database.async_read_replicas.engines():
+            await replica_engine.dispose()
 
 
 # OpenAPI tags metadata for better Swagger organization
@@ -0,0 +1,162 @@
+"""
+Management commands for the HRMS backend.
+
+Usage:
+    python manage.py migrate
+    python manage.py rebuild-summary [--start-date 2026-01-01] [--end-date 2026-01-31]
+    python manage.py rebuild-departments
+    python manage.py check-counters [--repair]
+    python manage.py maintain-partitions
+    python manage.py archive-attendance [--keep-years 1] [--to parquet] [--dry-run]
+    python manage.py export --start-date 2026-01-01 --end-date 2026-01-31 [--format parquet] [--gzip] [--output FILE]
+"""
+import argparse
+import sys
+from datetime import date
+from app.config import settings
+from app.database import engine, SessionLocal
+from app import archive, counters, departments, export, migrations, partitions, summary
+
+
+def migrate(args):
+    applied = migrations.upgrade(engine)
+    if applied:
+        for version in applied:
+            print(f"✓ Applied {version}")
+    else:
+        print("✓ Database is up to date")
+    if settings.attendance_partitioning:
+        maintain_partitions(args)
+
+
+def maintain_partitions(args):
+    if engine.dialect.name != "postgresql":
+        sys.exit("Attendance partitioning needs Postgres")
+    created = partitions.setup(engine)
+    for name in created:
+        print(f"✓ Created partition {name}")
+    if not created:
+        print("✓ Attendance partitions are up to date")
+
+
+def rebuild_summary(args):
+    with SessionLocal() as db:
+        summary.rebuild(db, args.start_date, args.end_date)
+        db.commit()
+    print("✓ Rebuilt daily attendance summary")
+
+
+def rebuild_departments(args):
+    with SessionLocal() as db:
+        departments.backfill(db)
+        db.commit()
+    print("✓ Rebuilt departments and headcounts")
+
+
+def check_counters(args):
+    with SessionLocal() as db:
+        drift = counters.check(db)
+        if not drift:
+            print("✓ Employee attendance counters match the attendance records")
+            return
+        for row in drift[:args.show]:
+            print(f"  {row['employee_id']} {row['month']:%Y-%m}: stored {row['stored'][0]} present / {row['stored'][1]} absent,"
+                  f" counted {row['counted'][0]} present / {row['counted'][1]} absent")
+        if len(drift) > args.show:
+            print(f"  ... and {len(drift) - args.show} more")
+        employee_ids = {row["employee_id"] for row in drift}
+        if not args.repair:
+            sys.exit(f"✗ {len(drift)} employee months are off, for {len(employee_ids)} employees - run with --repair to recount them")
+        counters.rebuild(db, employee_ids)
+        db.commit()
+    print(f"✓ Recounted {len(employee_ids)} employees ({len(drift)} employee months were off)")
+
+
+def archive_attendance(args):
+    if args.to == archive.PARQUET and not export.parquet_available():
+        sys.exit("Archiving to Parquet needs pyarrow - pip install -r requirements.txt")
+
+    with SessionLocal() as db:
+        years = archive.archivable_years(db, args.keep_years)
+    if not years:
+        print("✓ Nothing to archive")
+        return
+    for year in years:
+        if args.dry_run:
+            print(f"Would archive {year} to {args.to}")
+            continue
+        # One transaction per year, so a failure keeps the years already done
+        with SessionLocal() as db:
+            rows = archive.archive_year(db, year, args.to, args.dir)
+            db.commit()
+        print(f"✓ Archived {year} to {args.to} ({rows} rows)")
+
+
+def export_attendance(args):
+    if args.format == "parquet" and not export.parquet_available():
+        sys.exit("Parquet export needs pyarrow - pip install -r requirements.txt")
+    if args.end_date < args.start_date:
+        sys.exit("--end-date must be on or after --start-date")
+
+    chunks = export.export_attendance(args.start_date, args.end_date, args.department, args.format, args.gzip)
+    if args.output == "-":
+        for chunk in chunks:
+            sys.stdout.buffer.write(chunk)
+        return
+
+    output = args.output or export.export_filename(args.start_date, args.end_date, args.format, args.gzip)
+    size = 0
+    with open(output, "wb") as f:
+        for chunk in chunks:
+            f.write(chunk)
+            size += len(chunk)
+    print(f"✓ Exported attendance to {output} ({size / 1e6:.1f} MB)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HRMS management commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = commands.add_parser("migrate", help="Create tables and apply pending schema migrations")
+    migrate_parser.set_defaults(func=migrate)
+
+    rebuild_parser = commands.add_parser("rebuild-summary", help="Recompute the daily attendance rollup from raw attendance")
+    rebuild_parser.add_argument("--start-date", type=date.fromisoformat, help="Only rebuild from this date (YYYY-MM-DD)")
+    rebuild_parser.add_argument("--end-date", type=date.fromisoformat, help="Only rebuild up to this date (YYYY-MM-DD)")
+    rebuild_parser.set_defaults(func=rebuild_summary)
+
+    departments_parser = commands.add_parser("rebuild-departments", help="Link employees to departments and recount headcounts")
+    departments_parser.set_defaults(func=rebuild_departments)
+
+    counters_parser = commands.add_parser("check-counters", help="Compare the per-employee attendance counters with the attendance records")
+    counters_parser.add_argument("--repair", action="store_true", help="Recount the employees whose counters are off")
+    counters_parser.add_argument("--show", type=int, default=20, help="How many mismatches to list")
+    counters_parser.set_defaults(func=check_counters)
+
+    partitions_parser = commands.add_parser("maintain-partitions", help="Partition attendance by month and create upcoming partitions (Postgres)")
+    partitions_parser.set_defaults(func=maintain_partitions)
+
+    archive_parser = commands.add_parser("archive-attendance", help="Move closed years of attendance out of the attendance table")
+    archive_parser.add_argument("--keep-years", type=int, default=settings.attendance_hot_years,
+                                help="Closed years to keep in the attendance table (default: ATTENDANCE_HOT_YEARS)")
+    archive_parser.add_argument("--to", choices=[archive.TABLE, archive.PARQUET], default=archive.TABLE,
+                                help="table: attendance_archive, still readable through the API. parquet: one file per year, removed from the database")
+    archive_parser.add_argument("--dir", default=settings.attendance_archive_dir, help="Where Parquet files go (default: ATTENDANCE_ARCHIVE_DIR)")
+    archive_parser.add_argument("--dry-run", action="store_true", help="Only list the years that would be archived")
+    archive_parser.set_defaults(func=archive_attendance)
+
+    export_parser = commands.add_parser("export", help="Export attendance for a date range as CSV or Parquet")
+    export_parser.add_argument("--start-date", type=date.fromisoformat, required=True, help="First day (YYYY-MM-DD)")
+    export_parser.add_argument("--end-date", type=date.fromisoformat, required=True, help="Last day (YYYY-MM-DD)")
+    export_parser.add_argument("--department", help="Only export employees from this department")
+    export_parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    export_parser.add_argument("--gzip", action="store_true", help="Gzip the output")
+    export_parser.add_argument("--output", help="File to write (default: attendance_<start>_<end>.<format>), - for stdout")
+    export_parser.set_defaults(func=export_attendance)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Checks the attendance analytics (GET /api/attendance/analytics): for every
+group_by, with and without the date, employee and department filters, the
+groups and counts match the raw records grouped in Python, whichever source
+answers - the daily rollup, the monthly counters for whole months, or the
+attendance table for part of a month. Weeks start on Monday, and a year
+archived to Parquet counts the same per employee as per department.
+
+Runs against an in-memory SQLite database, no server or .env needed:
+    python -m pytest test_analytics.py
+"""
+import re
+from datetime import date, timedelta
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.orm import sessionmaker
+from app import archive, counters, database, models, schemas
+from app.routers.attendance import bulk_upsert_attendance, get_attendance_analytics
+from app.routers.employees import create_employee
+
+PEOPLE = [("EMP001", "Ann", "Engineering"), ("EMP002", "Bob", "Engineering"), ("EMP003", "Cy", "Sales")]
+# Monday 26 January to Sunday 8 March - a week across two months, and Sundays at the end of weeks
+FIRST_DAY, LAST_DAY = date(2026, 1, 26), date(2026, 3, 8)
+
+PERIODS = {
+    "day": lambda day: day,
+    "week": lambda day: day - timedelta(days=day.weekday()),
+    "month": lambda day: day.replace(day=1),
+}
+
+
+@pytest.fixture
+def db(db):
+    for employee_id, name, department in PEOPLE:
+        create_employee(schemas.EmployeeCreate(
+            employee_id=employee_id, full_name=name, email=f"{employee_id}@example.com", department=department
+        ), db=db)
+    # Through the bulk upload, which keeps the rollup and the monthly counters like single marks do
+    assert all(result["success"] for result in bulk_upsert_attendance(db, marks_between(FIRST_DAY, LAST_DAY))["results"])
+    return db
+
+
+def marks_between(first_day, last_day):
+    """Marks for everyone, missing some days on different patterns"""
+    marks = []
+    for n, (employee_id, _, _) in enumerate(PEOPLE):
+        day = first_day
+        while day <= last_day:
+            if (day.toordinal() + n) % 4:
+                status = "Absent" if (day.toordinal() * (n + 2)) % 5 == 0 else "Present"
+                marks.append({"employee_id": employee_id, "date": day.isoformat(), "status": status})
+            day += timedelta(days=1)
+    return marks
+
+
+def analytics(db, group_by, **filters):
+    filters = {"date_filter": None, "employee_id": None, "start_date": None, "end_date": None, "department": None, **filters}
+    result = get_attendance_analytics(group_by=group_by, db=db, **filters)
+    # Valid against the route's response_model
+    schemas.AttendanceAnalyticsResponse.model_validate(result)
+    assert result["group_by"] == group_by
+    return result["results"]
+
+
+def expected(db, group_by, date_filter=None, employee_id=None, start_date=None, end_date=None, department=None):
+    """The same numbers, grouped in Python from the raw records"""
+    names = {employee_id: (name, department) for employee_id, name, department in PEOPLE}
+    counts = {}
+    for record_employee, day, status in db.execute(select(models.Attendance.employee_id, models.Attendance.date, models.Attendance.status)):
+        name, record_department = names[record_employee]
+        if (date_filter and day != date_filter) or (start_date and day < start_date) or (end_date and day > end_date):
+            continue
+        if (employee_id and record_employee != employee_id) or (department and record_department != department):
+            continue
+        if group_by == "employee":
+            key = (record_employee, name)
+        elif group_by == "department":
+            key = (record_department, None)
+        else:
+            key = (PERIODS[group_by](day).isoformat(), None)
+        present, absent = counts.get(key, (0, 0))
+        counts[key] = (present + (status == models.AttendanceStatus.PRESENT), absent + (status == models.AttendanceStatus.ABSENT))
+
+    return [
+        {
+            "group": group, "employee_name": name, "present_count": present, "absent_count": absent,
+            "total_count": present + absent, "attendance_percentage": round(present / (present + absent) * 100, 2)
+        }
+        for (group, name), (present, absent) in sorted(counts.items())
+    ]
+
+
+FILTERS = [
+    {},
+    {"start_date": date(2026, 2, 1), "end_date": date(2026, 2, 28)},  # whole months
+    {"start_date": date(2026, 2, 3), "end_date": date(2026, 3, 4)},  # part of a month
+    {"date_filter": date(2026, 2, 9)},
+    {"department": "Engineering", "start_date": date(2026, 2, 1)},
+    {"employee_id": "EMP002"},
+    {"employee_id": "EMP003", "start_date": date(2026, 2, 1), "end_date": date(2026, 3, 31)},
+    {"employee_id": "EMP001", "end_date": date(2026, 2, 15)},
+]
+
+
+@pytest.mark.parametrize("group_by", ["employee", "department", "day", "week", "month"])
+@pytest.mark.parametrize("filters", FILTERS)
+def test_groups_match_the_raw_records(db, group_by, filters):
+    results = analytics(db, group_by, **filters)
+
+    assert results == expected(db, group_by, **filters)
+    assert results
+
+
+def test_weeks_start_on_monday(db):
+    weeks = [row["group"] for row in analytics(db, "week")]
+
+    assert weeks == ["2026-01-26", "2026-02-02", "2026-02-09", "2026-02-16", "2026-02-23", "2026-03-02"]
+    assert all(date.fromisoformat(week).weekday() == 0 for week in weeks)
+
+
+def test_unknown_department_is_empty(db):
+    assert analytics(db, "department", department="Nowhere") == []
+    assert analytics(db, "employee", department="Nowhere") == []
+
+
+@pytest.mark.parametrize("group_by, filters, table", [
+    ("department", {"start_date": date(2026, 2, 3)}, "daily_attendance_summary"),
+    ("week", {}, "daily_attendance_summary"),
+    ("employee", {"start_date": date(2026, 2, 1), "end_date": date(2026, 2, 28)}, "employee_attendance_months"),
+    ("month", {"employee_id": "EMP001"}, "employee_attendance_months"),
+    ("employee", {"start_date": date(2026, 2, 3)}, "attendance"),
+    ("week", {"employee_id": "EMP001"}, "attendance"),
+])
+def test_each_query_reads_the_smallest_source(engine, db, group_by, filters, table):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    analytics(db, group_by, **filters)
+
+    # One aggregate query, apart from looking up a department's id
+    queries = [statement for statement in statements if "GROUP BY" in statement]
+    assert len(queries) == 1
+    sources = {name for name in ("daily_attendance_summary", "employee_attendance_months", "attendance") if re.search(rf"\b{name}\b", queries[0])}
+    assert sources == {table}
+
+
+def test_parquet_archived_year_counts_the_same_per_employee(engine, db, monkeypatch, tmp_path):
+    pytest.importorskip("pyarrow")
+    # The archive writes the year's export with its own session
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(bind=engine))
+    assert all(result["success"] for result in bulk_upsert_attendance(db, marks_between(date(2024, 1, 1), date(2024, 12, 31)))["results"])
+    year = {"start_date": date(2024, 1, 1), "end_date": date(2024, 12, 31)}
+    before = {group_by: analytics(db, group_by, **year) for group_by in ("employee", "department", "month")}
+    by_employee = analytics(db, "month", employee_id="EMP002", **year)
+
+    archive.archive_year(db, 2024, archive.PARQUET, str(tmp_path))
+    db.commit()
+
+    assert db.query(models.Attendance).filter(models.Attendance.date < date(2025, 1, 1)).count() == 0
+    # Employees from their counters, departments from the rollup - both still count the year
+    for group_by, results in before.items():
+        assert analytics(db, group_by, **year) == results
+    assert analytics(db, "month", employee_id="EMP002", **year) == by_employee
+    assert sum(row["total_count"] for row in before["employee"]) == sum(row["total_count"] for row in before["department"]) > 0
+
+    # There are no rows to recount the year from, so the checks leave it alone
+    assert counters.check(db) == []
+    counters.rebuild(db)
+    db.commit()
+    assert analytics(db, "employee", **year) == before["employee"]
@@ -0,0 +1,158 @@
+"""
+Checks that DATABASE_MODE=async serves the same API as the sync routes: one
+script of calls runs through employees.py / attendance.py on one database and
+through async_employees.py / async_attendance.py (AsyncSession on aiosqlite)
+on another, and every response, error and ETag has to come out the same.
+
+Runs against temporary SQLite files, no server or .env needed (needs aiosqlite):
+    python -m pytest test_async_parity.py
+"""
+import asyncio
+import sys
+from datetime import date, timedelta
+import orjson
+import pytest
+from fastapi import HTTPException, Response
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from app import cache, departments, models, schemas
+from app.database import Base
+from app.routers import async_attendance, async_employees, attendance, employees
+from conftest import make_request
+
+pytest.importorskip("aiosqlite")
+
+PRESENT, ABSENT = models.AttendanceStatus.PRESENT, models.AttendanceStatus.ABSENT
+TODAY = date.today()
+
+
+def as_json(route, result, response):
+    """What the client would see: status, body and the headers the routes set"""
+    if isinstance(result, Response):
+        body = orjson.loads(result.body) if result.body else None
+        headers = result.headers
+        status_code = result.status_code
+    else:
+        model = next(r.response_model for r in sys.modules[route.__module__].router.routes if r.endpoint is route)
+        adapter = TypeAdapter(model)
+        body = adapter.dump_python(adapter.validate_python(result, from_attributes=True), mode="json")
+        headers = response.headers
+        status_code = 200
+    return status_code, body, headers.get("etag"), headers.get("x-next-cursor")
+
+
+def run_script(employee_routes, attendance_routes, call):
+    """The same calls in the same order - `call(route, *args, **kwargs)` adds the session"""
+    seen = []
+
+    def record(route, *args, **kwargs):
+        response = Response()
+        if "response" in kwargs:
+            kwargs["response"] = response
+        try:
+            seen.append(as_json(route, call(route, *args, **kwargs), response))
+        except HTTPException as e:
+            seen.append((e.status_code, e.detail))
+        return seen[-1]
+
+    def new_employee(employee_id, email, department):
+        return schemas.EmployeeCreate(employee_id=employee_id, full_name=f"{employee_id} Roe", email=email, department=department)
+
+    def mark(employee_id, status, day=TODAY):
+        return record(attendance_routes.mark_attendance, schemas.AttendanceCreate(employee_id=employee_id, date=day, status=status))
+
+    record(employee_routes.create_employee, new_employee("EMP001", "one@example.com", "Engineering"))
+    record(employee_routes.create_employee, new_employee("EMP002", "two@example.com", "Engineering"))
+    record(employee_routes.create_employee, new_employee("EMP003", "three@example.com", "Sales"))
+    record(employee_routes.create_employee, new_employee("EMP001", "other@example.com", "Sales"))
+    record(employee_routes.create_employee, new_employee("EMP004", "one@example.com", "Sales"))
+
+    listing = dict(request=make_request(), response=None, limit=2, cursor=None, department=None, output_format="json")
+    first_page = record(employee_routes.get_all_employees, **listing)
+    record(employee_routes.get_all_employees, **{**listing, "cursor": first_page[3]})
+    record(employee_routes.get_all_employees, **{**listing, "limit": None, "department": "Sales"})
+    record(employee_routes.get_all_employees, **{**listing, "cursor": "not-a-cursor"})
+    counted = record(employee_routes.get_employees_count, request=make_request(), response=None)
+    record(employee_routes.get_employees_count, request=make_request(counted[2]), response=None)
+
+    created = mark("EMP001", PRESENT)
+    mark("EMP002", ABSENT)
+    mark("EMP003", PRESENT, day=TODAY - timedelta(days=1))
+    mark("EMP001", ABSENT)  # re-mark
+    mark("EMP999", PRESENT)
+
+    record(employee_routes.get_employee, "EMP001", records_limit=10, start_date=None, end_date=None)
+    record(employee_routes.get_employee, "EMP001", records_limit=0, start_date=None, end_date=None)
+    record(employee_routes.get_employee, "EMP999", records_limit=10, start_date=None, end_date=None)
+
+    filters = dict(
+        request=make_request(), response=None, date_filter=None, employee_id=None, start_date=None, end_date=None,
+        department=None, limit=2, cursor=None, output_format="json"
+    )
+    first_page = record(attendance_routes.get_all_attendance, **filters)
+    record(attendance_routes.get_all_attendance, **{**filters, "cursor": first_page[3]})
+    record(attendance_routes.get_all_attendance, **{**filters, "limit": None, "department": "Engineering"})
+    record(attendance_routes.get_employee_attendance, "EMP001")
+    record(attendance_routes.get_employee_attendance, "EMP999")
+
+    today = record(attendance_routes.get_today_present_count, request=make_request(), response=None, department=None)
+    record(attendance_routes.get_today_present_count, request=make_request(today[2]), response=None, department=None)
+    record(attendance_routes.get_today_present_count, request=make_request(), response=None, department="Engineering")
+
+    record(attendance_routes.delete_attendance, created[1]["id"])
+    record(attendance_routes.delete_attendance, created[1]["id"])
+    record(employee_routes.delete_employee, "EMP002")
+    record(employee_routes.delete_employee, "EMP002")
+    record(attendance_routes.get_today_present_count, request=make_request(), response=None, department=None)
+    record(employee_routes.get_all_employees, **{**listing, "limit": None})
+    return seen
+
+
+def cold_caches(monkeypatch):
+    # Each run starts cold - the id and employee caches are per process, the databases aren't
+    fresh = cache.EmployeeCache(cache.InMemoryBackend(100), ttl=60)
+    for module in (cache, employees, attendance):
+        monkeypatch.setattr(module, "employee_cache", fresh)
+    monkeypatch.setattr(departments, "_ids", {})
+
+
+def sync_run(path, monkeypatch):
+    cold_caches(monkeypatch)
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def call(route, *args, **kwargs):
+        with Session() as db:
+            return route(*args, db=db, **kwargs)
+
+    return run_script(employees, attendance, call)
+
+
+def async_run(path, monkeypatch):
+    cold_caches(monkeypatch)
+    Base.metadata.create_all(create_engine(f"sqlite:///{path}"))
+    # NullPool - every call gets its own event loop, and aiosqlite connections belong to one
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+    # Same options as app/database.py's AsyncSessionLocal
+    Session = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+    def call(route, *args, **kwargs):
+        async def run():
+            async with Session() as db:
+                return await route(*args, db=db, **kwargs)
+        return asyncio.run(run())
+
+    return run_script(async_employees, async_attendance, call)
+
+
+def test_async_routes_answer_like_the_sync_routes(tmp_path, monkeypatch):
+    expected = sync_run(tmp_path / "sync.db", monkeypatch)
+    assert async_run(tmp_path / "async.db", monkeypatch) == expected
+
+    # The script does hit the interesting cases
+    statuses = [result[0] for result in expected]
+    assert {200, 304, 400, 404} <= set(statuses)
@@ -0,0 +1,101 @@
+"""
+Checks the attendance table's unique key and indexes and the migrations that
+add them (app/migrations.py): one record per employee and day, re-marking
+updates it in place, an older database with duplicate records keeps the
+newest of each and gets the indexes, and the date and employee lookups use
+them.
+
+Runs against an in-memory SQLite database, no server or .env needed:
+    python -m pytest test_attendance_indexes.py
+"""
+from datetime import date
+import pytest
+from sqlalchemy import create_engine, inspect, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app import counters, migrations, models, schemas
+from app.database import Base
+from app.routers.attendance import mark_attendance
+
+DAY = date(2026, 3, 2)
+
+
+def make_engine():
+    return create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+
+
+def attendance_indexes(engine):
+    indexes = {index["name"]: index["unique"] for index in inspect(engine).get_indexes("attendance")}
+    return {name: indexes.get(name) for name in ("uq_attendance_employee_date", "ix_attendance_date_status")}
+
+
+def query_plan(engine, sql):
+    with engine.connect() as conn:
+        return " ".join(row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+
+
+def test_one_record_per_employee_and_day():
+    engine = make_engine()
+    migrations.upgrade(engine)
+    with sessionmaker(bind=engine)() as db:
+        db.add(models.Employee(employee_id="EMP001", full_name="Jane Roe", email="jane@example.com", department="Sales"))
+        db.commit()
+
+        first = mark_attendance(schemas.AttendanceCreate(employee_id="EMP001", date=DAY, status="Present"), db=db)
+        again = mark_attendance(schemas.AttendanceCreate(employee_id="EMP001", date=DAY, status="Absent"), db=db)
+        assert again.id == first.id
+        assert db.execute(select(models.Attendance.status)).scalars().all() == [models.AttendanceStatus.ABSENT]
+
+        db.add(models.Attendance(employee_id="EMP001", date=DAY, status="Present"))
+        with pytest.raises(IntegrityError):
+            db.commit()
+
+
+def test_fresh_database_is_created_with_every_migration_applied():
+    engine = make_engine()
+
+    assert migrations.upgrade(engine) == [version for version, _ in migrations.MIGRATIONS]
+    assert migrations.upgrade(engine) == []
+    assert attendance_indexes(engine) == {"uq_attendance_employee_date": True, "ix_attendance_date_status": False}
+
+
+def test_old_database_is_deduped_and_indexed():
+    engine = make_engine()
+    # A database from before the migrations - same tables, none of the indexes, duplicate records
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX uq_attendance_employee_date"))
+        conn.execute(text("DROP INDEX ix_attendance_date_status"))
+        conn.execute(text("INSERT INTO employees (employee_id, full_name, email, department) VALUES ('EMP001', 'Jane Roe', 'jane@example.com', 'Sales')"))
+        conn.execute(text("""
+            INSERT INTO attendance (id, employee_id, date, status) VALUES
+                (1, 'EMP001', '2026-03-02', 'PRESENT'),
+                (2, 'EMP001', '2026-03-02', 'ABSENT'),
+                (3, 'EMP001', '2026-03-03', 'PRESENT')
+        """))
+
+    applied = migrations.upgrade(engine)
+
+    assert applied[:2] == ["0001_attendance_unique_employee_date", "0002_attendance_date_status_index"]
+    assert attendance_indexes(engine) == {"uq_attendance_employee_date": True, "ix_attendance_date_status": False}
+    with sessionmaker(bind=engine)() as db:
+        # The newest record of each day is kept
+        assert db.execute(select(models.Attendance.id, models.Attendance.status).order_by(models.Attendance.id)).all() == [
+            (2, models.AttendanceStatus.ABSENT), (3, models.AttendanceStatus.PRESENT)
+        ]
+        # ...and the backfills count what's left
+        assert counters.check(db) == []
+        assert db.execute(select(models.DailyAttendanceSummary.present_count, models.DailyAttendanceSummary.absent_count).order_by(
+            models.DailyAttendanceSummary.date
+        )).all() == [(0, 1), (1, 0)]
+
+
+def test_lookups_use_the_indexes():
+    engine = make_engine()
+    migrations.upgrade(engine)
+
+    assert "ix_attendance_date_status" in query_plan(engine, "SELECT status FROM attendance WHERE date = '2026-03-02'")
+    assert "uq_attendance_employee_date" in query_plan(
+        engine, "SELECT date, status FROM attendance WHERE employee_id = 'EMP001' ORDER BY date DESC"
+    )
@@ -0,0 +1,137 @@
+"""
+Checks the bulk attendance upload (POST /api/attendance/bulk): a JSON array
+or NDJSON body is written with one INSERT ... ON CONFLICT statement, existing
+records are updated in place, and every row gets its own result - a later
+row for the same employee and day wins, unknown employees, invalid rows and
+archived years fail alone - with the rollup and counters matching the rows,
+and a batch over MAX_BULK_ROWS is turned away with a 413.
+
+Runs against an in-memory SQLite database, no server or .env needed:
+    python -m pytest test_bulk_attendance.py
+"""
+import asyncio
+from datetime import date, datetime
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event, select
+from starlette.requests import Request
+from app import counters, models, summary
+from app.routers import attendance
+from app.routers.attendance import bulk_mark_attendance
+
+PRESENT, ABSENT = models.AttendanceStatus.PRESENT, models.AttendanceStatus.ABSENT
+DAY = date(2026, 3, 2)
+
+
+@pytest.fixture
+def db(db):
+    for employee_id, department in (("EMP001", "Engineering"), ("EMP002", "Sales")):
+        db.add(models.Employee(employee_id=employee_id, full_name=employee_id, email=f"{employee_id}@example.com", department=department))
+    db.commit()
+    return db
+
+
+def make_request(body: bytes, content_type="application/json"):
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+
+    async def receive():
+        return messages.pop(0)
+
+    scope = {"type": "http", "method": "POST", "path": "/api/attendance/bulk", "query_string": b"", "headers": [(b"content-type", content_type.encode())]}
+    return Request(scope, receive)
+
+
+def upload(db, body: bytes, content_type="application/json"):
+    return asyncio.run(bulk_mark_attendance(make_request(body, content_type), db=db))
+
+
+def stored(db):
+    table = models.Attendance.__table__
+    return {(row.employee_id, row.date): (row.id, row.status) for row in db.execute(select(table))}
+
+
+def assert_counts_match_rows(db):
+    assert counters.check(db) == []
+    table = models.DailyAttendanceSummary.__table__
+    before = sorted(db.execute(select(table.c.date, table.c.department, table.c.present_count, table.c.absent_count)).all())
+    summary.rebuild(db)
+    assert sorted(db.execute(select(table.c.date, table.c.department, table.c.present_count, table.c.absent_count)).all()) == before
+
+
+def test_json_batch_upserts_and_reports_every_row(db):
+    upload(db, b'[{"employee_id": "EMP001", "date": "2026-03-02", "status": "Present"}]')
+    existing_id = stored(db)[("EMP001", DAY)][0]
+    db.add(models.ArchivedAttendanceYear(year=2020, destination="table", row_count=0, archived_at=datetime(2026, 1, 1)))
+    db.commit()
+
+    report = upload(db, b"""[
+        {"employee_id": "EMP001", "date": "2026-03-02", "status": "Absent"},
+        {"employee_id": "EMP002", "date": "2026-03-02", "status": "Present"},
+        {"employee_id": "EMP404", "date": "2026-03-02", "status": "Present"},
+        {"employee_id": "EMP002", "date": "2026-03-02", "status": "Absent"},
+        {"employee_id": "EMP001", "date": "2026-03-03", "status": "Sick"},
+        {"employee_id": "EMP001", "date": "2020-06-01", "status": "Present"}
+    ]""")
+
+    assert (report["total"], report["succeeded"], report["failed"]) == (6, 2, 4)
+    assert [result["success"] for result in report["results"]] == [True, False, False, True, False, False]
+    assert report["results"][1]["detail"] == "Superseded by row 3 for the same employee and date"
+    assert report["results"][2]["detail"] == "Employee with ID 'EMP404' not found"
+    assert report["results"][4]["detail"].startswith("status:")
+    assert "2020" in report["results"][5]["detail"]
+
+    # Updated in place, not duplicated
+    assert stored(db) == {("EMP001", DAY): (existing_id, ABSENT), ("EMP002", DAY): (existing_id + 1, ABSENT)}
+    assert_counts_match_rows(db)
+
+
+def test_ndjson_bad_lines_fail_alone(db):
+    body = b"""{"employee_id": "EMP001", "date": "2026-03-02", "status": "Present"}
+{"employee_id": "EMP002", "date": "2026-03-02",
+
+{"employee_id": "EMP002", "date": "2026-03-02", "status": "Absent"}"""
+
+    report = upload(db, body, "application/x-ndjson")
+
+    assert (report["total"], report["succeeded"]) == (3, 2)
+    assert report["results"][1] == {"row": 1, "employee_id": None, "success": False, "detail": "Invalid JSON"}
+    assert {key: status for key, (_, status) in stored(db).items()} == {("EMP001", DAY): PRESENT, ("EMP002", DAY): ABSENT}
+    assert_counts_match_rows(db)
+
+
+def test_whole_batch_is_one_insert(engine, db):
+    items = ",".join(
+        f'{{"employee_id": "EMP00{1 + n % 2}", "date": "2026-03-{1 + n // 2:02d}", "status": "Present"}}' for n in range(40)
+    )
+    inserts = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: inserts.append(statement) if statement.startswith("INSERT INTO attendance") else None)
+
+    report = upload(db, f"[{items}]".encode())
+
+    assert report["succeeded"] == 40
+    assert len(inserts) == 1
+    assert len(stored(db)) == 40
+
+
+@pytest.mark.parametrize("body", [b'{"employee_id": "EMP001"}', b"not json"])
+def test_body_must_be_a_json_array(db, body):
+    with pytest.raises(HTTPException) as error:
+        upload(db, body)
+    assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize("content_type, join", [
+    ("application/json", lambda rows: b"[" + b",".join(rows) + b"]"),
+    ("application/x-ndjson", lambda rows: b"\n".join(rows)),
+])
+def test_batch_size_is_capped(db, monkeypatch, content_type, join):
+    monkeypatch.setattr(attendance, "MAX_BULK_ROWS", 3)
+    rows = [f'{{"employee_id": "EMP001", "date": "2026-03-{day:02d}", "status": "Present"}}'.encode() for day in range(1, 5)]
+
+    with pytest.raises(HTTPException) as error:
+        upload(db, join(rows), content_type)
+    assert error.value.status_code == 413
+    # Nothing from the rejected batch was written
+    assert stored(db) == {}
+
+    assert upload(db, join(rows[:3]), content_type)["succeeded"] == 3
@@ -0,0 +1,118 @@
+"""
+Checks the daily attendance rollup (app/summary.py): after marks, re-marks
+to the same or the other status, deleted records and deleted employees, every
+day and department holds the same counts as a recount of the raw records,
+and the today count and department stats read them back.
+
+Runs against an in-memory SQLite database, no server or .env needed:
+    python -m pytest test_daily_summary.py
+"""
+from collections import Counter
+from datetime import date
+import pytest
+from fastapi import Response
+from sqlalchemy import select
+from app import models, schemas, summary
+from app.routers.attendance import delete_attendance, get_department_stats, get_today_present_count, mark_attendance
+from app.routers.employees import create_employee, delete_employee
+from conftest import make_request
+
+PRESENT, ABSENT = models.AttendanceStatus.PRESENT, models.AttendanceStatus.ABSENT
+MONDAY, TUESDAY = date(2026, 3, 2), date(2026, 3, 3)
+TODAY = date.today()
+
+
+@pytest.fixture
+def db(db):
+    for employee_id, department in (("EMP001", "Engineering"), ("EMP002", "Engineering"), ("EMP003", "Sales")):
+        create_employee(schemas.EmployeeCreate(
+            employee_id=employee_id, full_name=employee_id, email=f"{employee_id}@example.com", department=department
+        ), db=db)
+    return db
+
+
+def mark(db, employee_id, day, status):
+    return mark_attendance(schemas.AttendanceCreate(employee_id=employee_id, date=day, status=status), db=db)
+
+
+def rollup(db):
+    """Non-empty rollup rows as {(date, department): (present, absent)}"""
+    table = models.DailyAttendanceSummary.__table__
+    return {
+        (row.date, row.department): (row.present_count, row.absent_count)
+        for row in db.execute(select(table)) if row.present_count or row.absent_count
+    }
+
+
+def recount(db):
+    """The same, counted from the raw records"""
+    counts = Counter()
+    rows = db.execute(
+        select(models.Attendance.date, models.Employee.department, models.Attendance.status).join(models.Employee)
+    )
+    for day, department, status in rows:
+        counts[(day, department, status)] += 1
+    return {
+        (day, department): (counts[(day, department, PRESENT)], counts[(day, department, ABSENT)])
+        for day, department, _ in counts
+    }
+
+
+def test_rollup_follows_marks_and_remarks(db):
+    mark(db, "EMP001", MONDAY, PRESENT)
+    mark(db, "EMP002", MONDAY, ABSENT)
+    mark(db, "EMP003", MONDAY, PRESENT)
+    mark(db, "EMP001", TUESDAY, ABSENT)
+    assert rollup(db) == recount(db) == {
+        (MONDAY, "Engineering"): (1, 1), (MONDAY, "Sales"): (1, 0), (TUESDAY, "Engineering"): (0, 1)
+    }
+
+    mark(db, "EMP001", MONDAY, PRESENT)  # same status again - no change
+    mark(db, "EMP002", MONDAY, PRESENT)  # flipped
+    mark(db, "EMP001", TUESDAY, PRESENT)
+
+    assert rollup(db) == recount(db) == {
+        (MONDAY, "Engineering"): (2, 0), (MONDAY, "Sales"): (1, 0), (TUESDAY, "Engineering"): (1, 0)
+    }
+
+
+def test_rollup_follows_deleted_records_and_employees(db):
+    record = mark(db, "EMP001", MONDAY, PRESENT)
+    mark(db, "EMP002", MONDAY, ABSENT)
+    mark(db, "EMP002", TUESDAY, PRESENT)
+    mark(db, "EMP003", TUESDAY, ABSENT)
+
+    delete_attendance(record.id, db=db)
+    assert rollup(db) == recount(db) == {
+        (MONDAY, "Engineering"): (0, 1), (TUESDAY, "Engineering"): (1, 0), (TUESDAY, "Sales"): (0, 1)
+    }
+
+    # Their records go with them (cascade), so their days are taken out of the rollup first
+    delete_employee("EMP002", db=db)
+    assert rollup(db) == recount(db) == {(TUESDAY, "Sales"): (0, 1)}
+
+    # A recount from scratch agrees with what the writes kept up
+    kept = rollup(db)
+    summary.rebuild(db)
+    db.commit()
+    assert rollup(db) == kept
+
+
+def test_today_count_and_department_stats_read_the_rollup(db):
+    mark(db, "EMP001", TODAY, PRESENT)
+    mark(db, "EMP002", TODAY, ABSENT)
+    mark(db, "EMP003", TODAY, PRESENT)
+    mark(db, "EMP003", MONDAY, ABSENT)
+
+    request = make_request()
+    assert get_today_present_count(request, Response(), department=None, db=db) == {
+        "date": TODAY, "present_count": 2, "absent_count": 1, "total_employees": 3
+    }
+    assert get_today_present_count(request, Response(), department="Engineering", db=db) == {
+        "date": TODAY, "present_count": 1, "absent_count": 1, "total_employees": 2
+    }
+
+    stats = get_department_stats(start_date=min(MONDAY, TODAY), end_date=max(MONDAY, TODAY), db=db)
+    assert {row["department"]: (row["present_count"], row["absent_count"]) for row in stats} == {
+        "Engineering": (1, 1), "Sales": (1, 1)
+    }
@@ -0,0 +1,125 @@
+"""
+Checks the departments table (app/departments.py): after employees are
+created, imported and deleted, every department's headcount matches a count
+of its employees, departments with nobody left drop out of
+GET /api/employees/stats/departments, failed creates change nothing, the
+backfill and rebuild recount an older database, and department filters go
+through the department_id index.
+
+Runs against an in-memory SQLite database, no server or .env needed:
+    python -m pytest test_departments.py
+"""
+import json
+import pytest
+from fastapi import HTTPException, Response
+from sqlalchemy import func, select, text, update
+from app import departments, models, schemas
+from app.routers.employees import (
+    create_employee, delete_employee, employee_listing_statement, get_all_employees, get_department_headcounts, import_employee_chunk,
+    ImportReport
+)
+from conftest import make_request
+
+
+def add(db, employee_id, department):
+    return create_employee(schemas.EmployeeCreate(
+        employee_id=employee_id, full_name=employee_id, email=f"{employee_id}@example.com", department=department
+    ), db=db)
+
+
+def headcounts(db):
+    """What GET /api/employees/stats/departments returns"""
+    response = get_department_headcounts(make_request(), Response(), db=db)
+    return {row["department"]: row["headcount"] for row in json.loads(response.body)}
+
+
+def recount(db):
+    return dict(db.execute(select(models.Employee.department, func.count()).group_by(models.Employee.department)).all())
+
+
+def listed(db, department):
+    response = get_all_employees(make_request(), Response(), limit=None, cursor=None, department=department, output_format="json", db=db)
+    return [row["employee_id"] for row in json.loads(response.body)]
+
+
+def test_headcounts_follow_creates_and_deletes(db):
+    for n, department in enumerate(["Engineering", "Sales", "Engineering", "Support", "Engineering"], start=1):
+        add(db, f"EMP{n:03d}", department)
+    assert headcounts(db) == recount(db) == {"Engineering": 3, "Sales": 1, "Support": 1}
+    assert departments.headcount(db, "Engineering") == 3
+
+    delete_employee("EMP002", db=db)
+    delete_employee("EMP003", db=db)
+
+    # Sales is still a department, just with nobody in it
+    assert headcounts(db) == recount(db) == {"Engineering": 2, "Support": 1}
+    assert departments.headcount(db, "Sales") == 0
+    assert departments.headcount(db, "Nowhere") == 0
+
+    # Coming back to an emptied department reuses its row
+    add(db, "EMP006", "Sales")
+    assert headcounts(db) == recount(db) == {"Engineering": 2, "Sales": 1, "Support": 1}
+    assert db.scalar(select(func.count()).select_from(models.Department)) == 3
+
+
+def test_imports_and_failed_writes(db):
+    add(db, "EMP001", "Engineering")
+
+    report = ImportReport()
+    import_employee_chunk(db, list(enumerate([
+        {"employee_id": "EMP002", "full_name": "A", "email": "a@example.com", "department": "Engineering"},
+        {"employee_id": "EMP003", "full_name": "B", "email": "b@example.com", "department": "Marketing"},
+        {"employee_id": "EMP001", "full_name": "C", "email": "c@example.com", "department": "Marketing"},
+    ])), report)
+    assert (report.succeeded, report.failed) == (2, 1)
+    assert headcounts(db) == recount(db) == {"Engineering": 2, "Marketing": 1}
+
+    with pytest.raises(HTTPException):
+        add(db, "EMP001", "Finance")
+    with pytest.raises(HTTPException):
+        delete_employee("EMP999", db=db)
+    assert headcounts(db) == recount(db) == {"Engineering": 2, "Marketing": 1}
+
+
+def test_department_filter(db):
+    for n, department in enumerate(["Engineering", "Sales", "Engineering"], start=1):
+        add(db, f"EMP{n:03d}", department)
+
+    assert listed(db, "Engineering") == ["EMP001", "EMP003"]
+    assert listed(db, "Sales") == ["EMP002"]
+    assert listed(db, "Nowhere") == []
+    assert listed(db, None) == ["EMP001", "EMP002", "EMP003"]
+
+
+def test_backfill_and_rebuild(db):
+    # Employees from before the departments table - no department_id, no departments
+    db.execute(models.Employee.__table__.insert(), [
+        {"employee_id": f"EMP{n:03d}", "full_name": "x", "email": f"{n}@example.com", "department": department}
+        for n, department in enumerate(["Engineering", "Sales", "Engineering"], start=1)
+    ])
+    db.commit()
+
+    departments.backfill(db)
+    db.commit()
+
+    assert headcounts(db) == recount(db) == {"Engineering": 2, "Sales": 1}
+    assert db.scalar(select(func.count()).where(models.Employee.department_id.is_(None))) == 0
+    assert listed(db, "Sales") == ["EMP002"]
+
+    # A drifted headcount is put right by a rebuild
+    db.execute(update(models.Department).values(headcount=42))
+    departments.rebuild_headcounts(db)
+    db.commit()
+    assert headcounts(db) == recount(db)
+
+
+def test_department_filter_uses_the_index(engine, db):
+    add(db, "EMP001", "Engineering")
+    department_id = departments.department_id(db, "Engineering")
+    sql = str(employee_listing_statement(after_id=1, department_id=department_id).compile(engine, compile_kwargs={"literal_binds": True}))
+
+    with engine.connect() as conn:
+        plan = " ".join(row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+
+    assert "ix_employees_department_id_id" in plan
+    assert "SCAN employees" not in plan
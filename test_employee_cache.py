@@ -0,0 +1,78 @@
+"""
+Checks the employee lookup cache (app/cache.py): creating and deleting an
+employee invalidates their entry, so an employee ID that's deleted and
+created again in another department is never served from the cache with
+the old one, and the hit/miss counters stay exact across threads.
+
+Runs against an in-memory SQLite database, no server or .env needed:
+    python -m pytest test_employee_cache.py
+"""
+import threading
+import pytest
+from app import cache, schemas
+from app.routers import employees
+
+
+@pytest.fixture
+def employee_cache(monkeypatch):
+    fresh = cache.EmployeeCache(cache.InMemoryBackend(100), ttl=60)
+    monkeypatch.setattr(cache, "employee_cache", fresh)
+    monkeypatch.setattr(employees, "employee_cache", fresh)
+    return fresh
+
+
+def create(db, department, email="jane@example.com"):
+    employee = schemas.EmployeeCreate(employee_id="EMP001", full_name="Jane Roe", email=email, department=department)
+    return employees.create_employee(employee, db=db)
+
+
+def test_backend_must_implement_every_method():
+    class GetOnly(cache.CacheBackend):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        GetOnly()
+
+
+def test_create_drops_a_stale_entry(employee_cache, db):
+    # Left behind by an employee with the same ID that another worker deleted
+    employee_cache.backend.set("EMP001", {"id": 99, "employee_id": "EMP001", "full_name": "Old", "email": "old@example.com", "department": "Sales"}, 60)
+
+    create(db, "Engineering")
+
+    assert employee_cache.backend.get("EMP001") is None
+    assert cache.get_employee(db, "EMP001").department == "Engineering"
+
+
+def test_delete_and_department_change(employee_cache, db):
+    create(db, "Sales")
+    assert cache.get_employee(db, "EMP001").department == "Sales"
+    assert cache.get_employee(db, "EMP001").department == "Sales"
+    assert (employee_cache.hits, employee_cache.misses) == (1, 1)
+
+    employees.delete_employee("EMP001", db=db)
+    assert employee_cache.backend.get("EMP001") is None
+    assert cache.get_employee(db, "EMP001") is None
+
+    # There's no update route - moving someone to another department is a delete and a create
+    create(db, "Engineering", email="jane.roe@example.com")
+    assert cache.get_employee(db, "EMP001").department == "Engineering"
+
+
+def test_counters_are_exact_across_threads(employee_cache, db):
+    create(db, "Sales")
+    cache.get_employee(db, "EMP001")
+
+    def lookups():
+        for _ in range(2000):
+            employee_cache.get(None, "EMP001")
+
+    threads = [threading.Thread(target=lookups) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = employee_cache.stats()
+    assert (stats["hits"], stats["misses"]) == (16000, 1)
@@ -0,0 +1,167 @@
+"""
+Checks the employee import (POST /api/employees/import): CSV and NDJSON
+bodies, read a piece at a time, add every valid row, and each bad row fails
+alone with its position - invalid fields, unparsable lines, duplicates within
+the file (also across chunks) and employees that already exist - while the
+department headcounts count only the rows that went in. A line or CSV record
+over the size limit is a 413.
+
+Runs against an in-memory SQLite database, no server or .env needed:
+    python -m pytest test_employee_import.py
+"""
+import asyncio
+import json
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+from starlette.requests import Request
+from app import departments, models, schemas, uploads
+from app.routers import employees
+from app.routers.employees import create_employee, import_employees
+
+
+@pytest.fixture
+def db(db):
+    create_employee(schemas.EmployeeCreate(
+        employee_id="EMP001", full_name="Jane Roe", email="jane@example.com", department="Sales"
+    ), db=db)
+    return db
+
+
+def make_request(body: bytes, content_type: str, piece_size=7):
+    """The body arrives in small pieces, so lines and quoted fields are split across them"""
+    messages = [
+        {"type": "http.request", "body": body[i:i + piece_size], "more_body": i + piece_size < len(body)}
+        for i in range(0, len(body), piece_size)
+    ] or [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        return messages.pop(0)
+
+    scope = {"type": "http", "method": "POST", "path": "/api/employees/import", "query_string": b"", "headers": [(b"content-type", content_type.encode())]}
+    return Request(scope, receive)
+
+
+def upload(db, body: bytes, content_type: str):
+    report = asyncio.run(import_employees(make_request(body, content_type), db=db))
+    # Valid against the route's response_model
+    schemas.EmployeeImportResponse.model_validate(report)
+    return report
+
+
+def stored(db):
+    return dict(db.execute(select(models.Employee.employee_id, models.Employee.full_name)).all())
+
+
+def headcounts(db):
+    return {row.department: row.headcount for row in db.execute(departments.headcount_statement())}
+
+
+def failures(report):
+    return [(error["row"], error["employee_id"], error["detail"]) for error in report["errors"]]
+
+
+def test_csv_import(db):
+    body = (
+        "\ufeffemployee_id,full_name,email,department\r\n"
+        'EMP002,"Smith, John",john@example.com,Engineering\r\n'
+        'EMP003,"Multi\nLine",multi@example.com,Engineering\r\n'
+        "EMP004,No Email,not-an-email,Sales\r\n"
+        "EMP002,Again,again@example.com,Sales\r\n"
+        "EMP005,Same Email,john@example.com,Sales\r\n"
+        "EMP001,Existing,someone@example.com,Sales\r\n"
+        "EMP006,Existing Email,jane@example.com,Sales\r\n"
+        "\r\n"
+        "EMP007,Last One,last@example.com,Marketing\r\n"
+    ).encode()
+
+    report = upload(db, body, "text/csv")
+
+    assert (report["total"], report["succeeded"], report["failed"], report["errors_truncated"]) == (8, 3, 5, False)
+    errors = failures(report)
+    assert [(row, employee_id) for row, employee_id, _ in errors] == [(2, "EMP004"), (3, "EMP002"), (4, "EMP005"), (5, "EMP001"), (6, "EMP006")]
+    assert errors[0][2].startswith("email:")
+    assert errors[1][2] == "Duplicate employee_id 'EMP002' (also in row 0)"
+    assert errors[2][2] == "Duplicate email 'john@example.com' (also in row 0)"
+    assert errors[3][2] == "Employee with ID 'EMP001' already exists"
+    assert errors[4][2] == "Employee with email 'jane@example.com' already exists"
+
+    assert stored(db) == {"EMP001": "Jane Roe", "EMP002": "Smith, John", "EMP003": "Multi\nLine", "EMP007": "Last One"}
+    assert headcounts(db) == {"Engineering": 2, "Marketing": 1, "Sales": 1}
+
+
+def test_ndjson_import(db):
+    lines = [
+        json.dumps({"employee_id": "EMP002", "full_name": "Zoë", "email": "zoe@example.com", "department": "Engineering"}),
+        "{not json",
+        json.dumps({"employee_id": "EMP003", "email": "missing@example.com", "department": "Sales"}),
+        json.dumps(["not", "an", "object"]),
+        "",
+        json.dumps({"employee_id": "EMP004", "full_name": "Sam", "email": "sam@example.com", "department": "Sales"}),
+    ]
+
+    report = upload(db, "\n".join(lines).encode(), "application/x-ndjson")
+
+    assert (report["total"], report["succeeded"], report["failed"]) == (5, 2, 3)
+    errors = failures(report)
+    assert errors[0] == (1, None, "Invalid JSON")
+    assert errors[1][:2] == (2, "EMP003") and "full_name" in errors[1][2]
+    assert errors[2][:2] == (3, None)
+    assert stored(db) == {"EMP001": "Jane Roe", "EMP002": "Zoë", "EMP004": "Sam"}
+    assert headcounts(db) == {"Engineering": 1, "Sales": 2}
+
+
+def test_duplicates_across_chunks(db, monkeypatch):
+    monkeypatch.setattr(employees, "IMPORT_CHUNK_SIZE", 2)
+    people = [("EMP002", "a"), ("EMP003", "b"), ("EMP002", "c"), ("EMP004", "b"), ("EMP005", "d")]
+    body = "\n".join(
+        json.dumps({"employee_id": employee_id, "full_name": employee_id, "email": f"{email}@example.com", "department": "Sales"})
+        for employee_id, email in people
+    ).encode()
+
+    report = upload(db, body, "application/x-ndjson")
+
+    # The first chunk is committed before the next one is read, so later repeats hit the database check
+    assert (report["succeeded"], report["failed"]) == (3, 2)
+    assert failures(report) == [
+        (2, "EMP002", "Employee with ID 'EMP002' already exists"),
+        (3, "EMP004", "Employee with email 'b@example.com' already exists"),
+    ]
+    assert set(stored(db)) == {"EMP001", "EMP002", "EMP003", "EMP005"}
+    assert headcounts(db) == {"Sales": 4}
+
+
+def test_error_list_is_truncated(db, monkeypatch):
+    monkeypatch.setattr(employees, "MAX_IMPORT_ERRORS", 2)
+
+    report = upload(db, b"{\n{\n{\n", "application/x-ndjson")
+
+    assert (report["total"], report["failed"], len(report["errors"]), report["errors_truncated"]) == (3, 3, 2, True)
+
+
+def test_unsupported_content_type(db):
+    with pytest.raises(HTTPException) as error:
+        upload(db, b"[]", "application/json")
+    assert error.value.status_code == 415
+
+
+def test_oversized_lines_and_records_are_rejected(db, monkeypatch):
+    monkeypatch.setattr(uploads, "MAX_LINE_BYTES", 200)
+    monkeypatch.setattr(uploads, "MAX_RECORD_BYTES", 500)
+    fine = json.dumps({"employee_id": "EMP002", "full_name": "Zoë", "email": "zoe@example.com", "department": "Sales"})
+
+    # A line over the limit, whether or not a newline ever comes
+    for body in (f'{fine}\n{{"full_name": "{"x" * 300}"}}\n', f'{fine}\n{"x" * 300}'):
+        with pytest.raises(HTTPException) as error:
+            upload(db, body.encode(), "application/x-ndjson")
+        assert error.value.status_code == 413
+        assert error.value.detail == "Line 2 is longer than 200 bytes"
+
+    # A quote that's never closed keeps the record going line after line
+    body = "employee_id,full_name,email,department\n" + 'EMP003,"never closed,a@example.com,Sales\n' + "EMP004,Short line,b@example.com,Sales\n" * 20
+    with pytest.raises(HTTPException) as error:
+        upload(db, body.encode(), "text/csv")
+    assert error.value.status_code == 413
+
+    # Lines at the limit are fine
+    assert upload(db, (fine + " " * (200 - len(fine.encode()))).encode(), "application/x-ndjson")["succeeded"] == 1
@@ -0,0 +1,86 @@
+"""
+Checks that the employee profile endpoint stays at two queries no matter
+how much attendance history an employee has, and that the attendance
+counters behind its totals follow marks, status flips and deletes.
+
+Runs against an in-memory SQLite database, no server or .env needed:
+    python -m pytest test_employee_queries.py
+"""
+from datetime import date, timedelta
+from sqlalchemy import event
+from app import counters, models, schemas
+from app.routers.attendance import delete_attendance, mark_attendance
+from app.routers.employees import get_employee
+
+
+def count_queries(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+def seed_history(db, days):
+    db.add(models.Employee(employee_id="EMP001", full_name="John Doe", email="john@example.com", department="Engineering"))
+    start = date(2024, 1, 1)
+    for offset in range(days):
+        status = models.AttendanceStatus.ABSENT if offset % 5 == 0 else models.AttendanceStatus.PRESENT
+        db.add(models.Attendance(employee_id="EMP001", date=start + timedelta(days=offset), status=status))
+    db.flush()
+    # Rows added straight to the table, so count them into the counters like the 0006 migration does
+    counters.rebuild(db)
+    db.commit()
+
+
+def test_get_employee_uses_two_queries(engine, db):
+    seed_history(db, 500)
+    statements = count_queries(engine)
+
+    result = get_employee("EMP001", records_limit=30, start_date=None, end_date=None, db=db)
+
+    assert len(statements) == 2, statements
+    assert result["total_present_days"] == 400
+    assert result["total_absent_days"] == 100
+    assert len(result["attendance_records"]) == 30
+    # newest first
+    assert result["attendance_records"][0].date == date(2024, 1, 1) + timedelta(days=499)
+
+
+def test_get_employee_date_range(engine, db):
+    seed_history(db, 60)
+    statements = count_queries(engine)
+
+    result = get_employee("EMP001", records_limit=366, start_date=date(2024, 1, 1), end_date=date(2024, 1, 10), db=db)
+
+    assert len(statements) == 2, statements
+    assert len(result["attendance_records"]) == 10
+    # totals always cover the full history
+    assert result["total_present_days"] + result["total_absent_days"] == 60
+
+
+def test_counters_follow_marks_and_deletes(db):
+    seed_history(db, 10)
+    day = date.today()
+
+    def totals():
+        result = get_employee("EMP001", records_limit=0, start_date=None, end_date=None, db=db)
+        return result["total_present_days"], result["total_absent_days"]
+
+    assert totals() == (8, 2)
+    mark_attendance(schemas.AttendanceCreate(employee_id="EMP001", date=day, status="Absent"), db=db)
+    assert totals() == (8, 3)
+    # Re-marking the same day goes through the update branch - Absent flips to Present
+    record = mark_attendance(schemas.AttendanceCreate(employee_id="EMP001", date=day, status="Present"), db=db)
+    assert totals() == (9, 2)
+    delete_attendance(record.id, db=db)
+    assert totals() == (8, 2)
+    assert counters.check(db) == []
+
+    # Drift is reported with both sets of counts, and rebuild() repairs it
+    db.execute(counters.counters_table.update().values(present_count=counters.counters_table.c.present_count + 1))
+    drift = counters.check(db)
+    assert drift and drift[0]["employee_id"] == "EMP001"
+    assert drift[0]["stored"][0] == drift[0]["counted"][0] + 1
+    counters.rebuild(db)
+    assert counters.check(db) == []
+    assert totals() == (8, 2)
+
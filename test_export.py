@@ -0,0 +1,151 @@
+"""
+Checks the attendance export (GET /api/attendance/export, app/export.py): the
+CSV and Parquet files hold every record in the date range - bounds included -
+with the employee's name and department, in date order, the department filter
+works, gzip decompresses to the same file, and big exports go out in several
+chunks (and Parquet row groups) rather than one.
+
+Runs against an in-memory SQLite database, no server or .env needed:
+    python -m pytest test_export.py
+"""
+import asyncio
+import csv
+import gzip
+import io
+from datetime import date, timedelta
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.orm import sessionmaker
+from app import database, departments, export, models
+from app.routers.attendance import export_attendance
+from conftest import make_request
+
+START, END = date(2026, 3, 2), date(2026, 3, 6)
+
+
+@pytest.fixture
+def db(engine, db, monkeypatch):
+    # The export opens its own session
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    department_ids = departments.ensure_departments(db, ["Engineering", "Sales"])
+    for employee_id, name, department in (("EMP001", "Zoë Ångström", "Engineering"), ("EMP002", "Smith, John", "Sales")):
+        db.add(models.Employee(
+            employee_id=employee_id, full_name=name, email=f"{employee_id}@example.com",
+            department=department, department_id=department_ids[department]
+        ))
+    db.flush()
+    # A day either side of the range as well
+    for offset in range(-1, 6):
+        day = START + timedelta(days=offset)
+        db.add(models.Attendance(employee_id="EMP002", date=day, status="Present"))
+        db.add(models.Attendance(employee_id="EMP001", date=day, status="Absent" if offset % 2 else "Present"))
+    db.commit()
+    return db
+
+
+def download(fmt="csv", compress=False, department=None, start_date=START, end_date=END):
+    """Headers and body chunks of the streamed export"""
+    response = export_attendance(
+        make_request(), start_date=start_date, end_date=end_date, department=department, output_format=fmt, gzip=compress
+    )
+
+    async def read():
+        return [chunk async for chunk in response.body_iterator]
+    return response.headers, asyncio.run(read())
+
+
+def expected_rows(db, department=None):
+    """What the export should hold, as CSV would write it"""
+    rows = []
+    records = db.query(models.Attendance).order_by(models.Attendance.date, models.Attendance.id)
+    for record in records:
+        employee = record.employee
+        if START <= record.date <= END and department in (None, employee.department):
+            rows.append({
+                "id": str(record.id), "date": record.date.isoformat(), "employee_id": record.employee_id,
+                "employee_name": employee.full_name, "department": employee.department, "status": record.status.value,
+            })
+    return rows
+
+
+def read_csv(data: bytes):
+    return list(csv.DictReader(io.StringIO(data.decode())))
+
+
+def read_parquet(data: bytes):
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(io.BytesIO(data))
+    rows = [
+        {**row, "id": str(row["id"]), "date": row["date"].isoformat()}
+        for row in parquet.read().to_pylist()
+    ]
+    return rows, parquet.metadata.num_row_groups
+
+
+def test_csv_export(db):
+    headers, chunks = download()
+
+    assert headers["content-type"].startswith("text/csv")
+    assert headers["content-disposition"] == 'attachment; filename="attendance_2026-03-02_2026-03-06.csv"'
+    data = b"".join(chunks)
+    assert data.splitlines()[0] == b"id,date,employee_id,employee_name,department,status"
+    assert read_csv(data) == expected_rows(db)
+    assert len(read_csv(data)) == 10
+
+    _, chunks = download(department="Sales")
+    assert read_csv(b"".join(chunks)) == expected_rows(db, "Sales")
+
+    # Nothing in range - just the header
+    _, chunks = download(start_date=date(2025, 1, 1), end_date=date(2025, 1, 31))
+    assert b"".join(chunks) == b"id,date,employee_id,employee_name,department,status\r\n"
+
+
+def test_gzipped_export_is_the_same_file(db):
+    _, plain = download()
+    headers, compressed = download(compress=True)
+
+    assert headers["content-type"] == "application/gzip"
+    assert headers["content-disposition"].endswith('.csv.gz"')
+    assert gzip.decompress(b"".join(compressed)) == b"".join(plain)
+
+
+def test_parquet_export(db):
+    pytest.importorskip("pyarrow")
+
+    headers, chunks = download(fmt="parquet")
+
+    assert headers["content-type"] == "application/vnd.apache.parquet"
+    rows, _ = read_parquet(b"".join(chunks))
+    assert rows == expected_rows(db)
+
+    _, compressed = download(fmt="parquet", compress=True, department="Engineering")
+    rows, _ = read_parquet(gzip.decompress(b"".join(compressed)))
+    assert rows == expected_rows(db, "Engineering")
+
+
+def test_big_exports_are_streamed_in_chunks(db, monkeypatch):
+    monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 3)
+    monkeypatch.setattr(export, "PARQUET_ROW_GROUP_SIZE", 4)
+
+    _, chunks = download()
+    assert len([chunk for chunk in chunks if chunk]) == 4
+    assert read_csv(b"".join(chunks)) == expected_rows(db)
+
+    pytest.importorskip("pyarrow")
+    _, chunks = download(fmt="parquet")
+    rows, row_groups = read_parquet(b"".join(chunks))
+    assert rows == expected_rows(db)
+    # Batches of 3 make row groups of 6 and 4, each sent as it fills, then the footer
+    assert (len(chunks), row_groups) == (3, 2)
+
+
+def test_bad_requests(db, monkeypatch):
+    with pytest.raises(HTTPException) as error:
+        download(start_date=END, end_date=START)
+    assert error.value.status_code == 400
+
+    monkeypatch.setattr(export, "parquet_available", lambda: False)
+    with pytest.raises(HTTPException) as error:
+        download(fmt="parquet")
+    assert error.value.status_code == 501
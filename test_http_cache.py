@@ -0,0 +1,130 @@
+"""
+Checks the ETags of the polled read routes (app/http_cache.py): they change
+with every write that changes what the route returns and only then, a
+recount of the rollup never brings an old ETag back, and migration 0007
+moves an existing database off the old table_versions counters.
+
+Runs against an in-memory SQLite database, no server or .env needed:
+    python -m pytest test_http_cache.py
+"""
+from datetime import date, timedelta
+from fastapi import Response
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import sessionmaker
+from app import http_cache, migrations, models, schemas, summary
+from app.routers.attendance import delete_attendance, mark_attendance
+from app.routers.employees import create_employee, delete_employee
+from conftest import make_request
+
+PRESENT, ABSENT = models.AttendanceStatus.PRESENT, models.AttendanceStatus.ABSENT
+TODAY = date.today()
+
+
+def today_etag(db):
+    response = Response()
+    assert http_cache.not_modified(db, make_request(), response, "attendance.today", [http_cache.EMPLOYEES, http_cache.ATTENDANCE], day=TODAY) is None
+    return response.headers["etag"]
+
+
+def employees_etag(db):
+    response = Response()
+    http_cache.not_modified(db, make_request(), response, "employees.list", [http_cache.EMPLOYEES])
+    return response.headers["etag"]
+
+
+def add_employee(db, employee_id, department="Engineering"):
+    employee = schemas.EmployeeCreate(employee_id=employee_id, full_name="Jane Roe", email=f"{employee_id}@example.com", department=department)
+    create_employee(employee, db=db)
+
+
+def mark(db, employee_id, status, day=TODAY):
+    return mark_attendance(schemas.AttendanceCreate(employee_id=employee_id, date=day, status=status), db=db)
+
+
+def test_today_etag_follows_its_data(db):
+    add_employee(db, "EMP001")
+    seen = [today_etag(db)]
+
+    record = mark(db, "EMP001", PRESENT)
+    seen.append(today_etag(db))
+    mark(db, "EMP001", PRESENT)  # same status again - nothing to see
+    assert today_etag(db) == seen[-1]
+    mark(db, "EMP001", ABSENT, day=TODAY - timedelta(days=1))  # another day
+    assert today_etag(db) == seen[-1]
+
+    # A client holding the current tag gets a 304
+    cached = http_cache.not_modified(db, make_request(seen[-1]), Response(), "attendance.today", [http_cache.EMPLOYEES, http_cache.ATTENDANCE], day=TODAY)
+    assert cached.status_code == 304
+
+    mark(db, "EMP001", ABSENT)
+    seen.append(today_etag(db))
+    delete_attendance(record.id, db=db)
+    seen.append(today_etag(db))
+    add_employee(db, "EMP002", department="Sales")  # total_employees changes
+    seen.append(today_etag(db))
+    assert len(set(seen)) == len(seen)
+
+
+def test_employee_etag_follows_the_roster(db):
+    seen = [employees_etag(db)]
+    add_employee(db, "EMP001")
+    seen.append(employees_etag(db))
+    add_employee(db, "EMP002")
+    seen.append(employees_etag(db))
+    delete_employee("EMP002", db=db)
+    seen.append(employees_etag(db))
+    # Same roster as two steps back, but not the same version
+    assert len(set(seen)) == len(seen)
+
+    mark(db, "EMP001", PRESENT)
+    assert employees_etag(db) == seen[-1]
+
+
+def test_rebuild_never_repeats_an_etag(db):
+    add_employee(db, "EMP001")
+    mark(db, "EMP001", PRESENT)
+    before = today_etag(db)
+    versions = http_cache.attendance_version(db, TODAY)
+
+    summary.rebuild(db)
+    db.commit()
+
+    assert http_cache.attendance_version(db, TODAY)[0] > versions[0]
+    assert today_etag(db) != before
+
+
+def test_rebuild_runs_on_a_migration_connection(engine, db):
+    add_employee(db, "EMP001")
+    mark(db, "EMP001", PRESENT)
+    versions = http_cache.attendance_version(db, TODAY)
+    db.close()
+
+    # Migration 0003 hands rebuild() a Connection, not a Session
+    with engine.begin() as conn:
+        summary.rebuild(conn)
+
+    with sessionmaker(bind=engine)() as db:
+        assert http_cache.attendance_version(db, TODAY)[0] > versions[0]
+
+
+def test_migration_adds_versions_and_drops_table_versions(engine, db):
+    db.close()
+    # A database from before 0007 - without the version columns, with the old counters table
+    with engine.begin() as conn:
+        for table in ("daily_attendance_summary", "departments"):
+            conn.execute(text(f"ALTER TABLE {table} DROP COLUMN version"))
+            conn.execute(text(f"ALTER TABLE {table} DROP COLUMN updated_at"))
+        conn.execute(text("CREATE TABLE table_versions (name VARCHAR PRIMARY KEY, version INTEGER, updated_at DATETIME)"))
+        conn.execute(text("INSERT INTO departments (name, headcount) VALUES ('Engineering', 1)"))
+    migrations.migration_metadata.create_all(engine)
+    with engine.begin() as conn:
+        for version, _ in migrations.MIGRATIONS[:-1]:
+            conn.execute(migrations.schema_migrations.insert().values(version=version))
+
+    assert migrations.upgrade(engine) == ["0007_row_versions_for_etags"]
+
+    assert not inspect(engine).has_table("table_versions")
+    for table in ("daily_attendance_summary", "departments"):
+        assert {"version", "updated_at"} <= {column["name"] for column in inspect(engine).get_columns(table)}
+    with sessionmaker(bind=engine)() as db:
+        assert http_cache.employees_version(db) == (0, None)
@@ -0,0 +1,186 @@
+"""
+Checks the live attendance stream (app/live.py): events only go out once
+the write commits, streams only get their department's changes, a stream
+that falls behind gets a fresh snapshot instead of the backlog, and a change
+committed while the snapshot loads is counted exactly once - by the
+snapshot or by an event, never both or neither.
+
+Runs against an in-memory SQLite database, no server needed:
+    python -m pytest test_live_updates.py
+"""
+import asyncio
+import orjson
+from datetime import date
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app import database, departments, live, models, schemas
+from app.database import Base
+from app.routers import attendance
+from app.routers.employees import create_employee
+
+PRESENT, ABSENT = models.AttendanceStatus.PRESENT, models.AttendanceStatus.ABSENT
+
+
+def record(record_id, status):
+    return {"id": record_id, "employee_id": f"EMP{record_id:03}", "date": date.today(), "status": status}
+
+
+def read_events(chunks):
+    return [(kind.decode()[7:], orjson.loads(data[6:])) for kind, data in (chunk.split(b"\n")[:2] for chunk in chunks)]
+
+
+def test_events_follow_commits():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+
+    async def run():
+        hub = live.LiveHub()
+        everyone, engineering = hub.subscribe(), hub.subscribe("Engineering")
+        published, live.hub = live.hub, hub
+        try:
+            live.attendance_changed(db, record(1, ABSENT), "Engineering", old_status=PRESENT, new_status=ABSENT)
+            live.attendance_changed(db, record(2, PRESENT), "Sales", old_status=PRESENT, new_status=PRESENT)  # no change
+            db.rollback()
+            live.attendance_changed(db, record(3, PRESENT), "Sales", new_status=PRESENT)
+            live.attendance_changed(db, record(4, ABSENT), "Engineering", old_status=ABSENT)
+            db.commit()
+            await asyncio.sleep(0)
+        finally:
+            live.hub = published
+        return [everyone.queue.get_nowait() for _ in range(everyone.queue.qsize())], [engineering.queue.get_nowait() for _ in range(engineering.queue.qsize())]
+
+    everyone, engineering = asyncio.run(run())
+    # The rolled back change never goes out
+    assert [(e["type"], e["record"]["id"], e["delta"]) for e in everyone] == [
+        ("marked", 3, {"present": 1, "absent": 0}),
+        ("deleted", 4, {"present": 0, "absent": -1}),
+    ]
+    assert [e["record"]["id"] for e in engineering] == [4]
+
+
+def test_lagging_stream_gets_a_snapshot(monkeypatch):
+    monkeypatch.setattr(live.settings, "live_queue_size", 2)
+    loads = []
+
+    async def load(department):
+        loads.append(department)
+        return {"date": date.today(), "present_count": len(loads), "absent_count": 0, "total_employees": 5}
+
+    async def run():
+        hub = live.LiveHub()
+        subscriber = hub.subscribe()
+        stream = hub.stream(subscriber, load)
+        chunks = [await stream.__anext__()]
+        # Four changes land before the stream reads any - more than its queue holds
+        hub.broadcast([live.attendance_event(record(n, PRESENT), "Sales", new_status=PRESENT) for n in range(4)])
+        chunks.append(await stream.__anext__())
+        hub.broadcast([live.attendance_event(record(9, PRESENT), "Sales", new_status=PRESENT)])
+        chunks.append(await stream.__anext__())
+        await stream.aclose()
+        return chunks, hub
+
+    chunks, hub = asyncio.run(run())
+    events = read_events(chunks)
+    assert [kind for kind, _ in events] == ["snapshot", "snapshot", "marked"]
+    assert events[1][1]["present_count"] == 2 and events[2][1]["record"]["id"] == 9
+    assert hub.stats()["streams"] == 0 and hub.stats()["lagged_streams"] == 1
+
+
+def test_notify_payloads_fit():
+    events = [live.attendance_event(record(n, PRESENT), "Sales", new_status=PRESENT) for n in range(200)]
+    payloads = list(live.notify_payloads(events))
+    assert len(payloads) > 1 and all(len(payload) < 8000 for payload in payloads)
+    assert [e["record"]["id"] for payload in payloads for e in orjson.loads(payload)] == list(range(200))
+
+
+def test_changes_during_the_snapshot_load_count_once(monkeypatch, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'live.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    # The snapshot opens its own session
+    monkeypatch.setattr(database, "SessionLocal", Session)
+    monkeypatch.setattr(departments, "_ids", {})
+    monkeypatch.setattr(live, "hub", live.LiveHub())
+    today = date.today()
+
+    def mark(employee_id, status):
+        with Session() as db:
+            attendance.save_attendance(db, schemas.AttendanceCreate(employee_id=employee_id, date=today, status=status))
+
+    with Session() as db:
+        for employee_id, department in (("EMP001", "Sales"), ("EMP002", "Sales"), ("EMP003", "Engineering")):
+            create_employee(schemas.EmployeeCreate(
+                employee_id=employee_id, full_name=employee_id, email=f"{employee_id}@example.com", department=department
+            ), db=db)
+    mark("EMP001", PRESENT)
+
+    load_snapshot = attendance.live_snapshot
+
+    def snapshot_then_mark(department):
+        snapshot = load_snapshot(department)
+        # Committed after the snapshot's read, before the stream gets it
+        mark("EMP003", ABSENT)
+        return snapshot
+
+    monkeypatch.setattr(attendance, "live_snapshot", snapshot_then_mark)
+
+    async def run():
+        response = await attendance.live_attendance(department=None)
+        # Committed after the stream subscribed, before its snapshot loads - in both
+        mark("EMP002", PRESENT)
+        stream = response.body_iterator
+        chunks = [await stream.__anext__(), await stream.__anext__()]
+        mark("EMP001", ABSENT)
+        chunks.append(await stream.__anext__())
+        await stream.aclose()
+        return chunks
+
+    events = read_events(asyncio.run(run()))
+
+    assert [(kind, data.get("record", {}).get("employee_id")) for kind, data in events] == [
+        ("snapshot", None), ("marked", "EMP003"), ("marked", "EMP001")
+    ]
+    assert "versions" not in events[0][1]
+    # What a dashboard adds up is what's in the database
+    counts = {"present": events[0][1]["present_count"], "absent": events[0][1]["absent_count"]}
+    for _, data in events[1:]:
+        counts = {key: value + data["delta"][key] for key, value in counts.items()}
+    with Session() as db:
+        expected = attendance.today_counts(db, today)
+    assert counts == {"present": expected["present_count"], "absent": expected["absent_count"]} == {"present": 1, "absent": 2}
+
+
+def test_snapshot_read_before_an_event_isnt_shared():
+    loads = []
+
+    async def run():
+        hub = live.LiveHub()
+        release = asyncio.Event()
+
+        async def load(department):
+            loads.append(department)
+            number = len(loads)
+            await release.wait()
+            return {"date": date.today(), "present_count": number, "absent_count": 0, "total_employees": 5}
+
+        first = hub.stream(hub.subscribe(), load)
+        first_chunk = asyncio.ensure_future(first.__anext__())
+        await asyncio.sleep(0)
+        # A change the still-loading snapshot may not have read - a stream subscribing now never gets it
+        hub.broadcast([live.attendance_event(record(1, PRESENT), "Sales", new_status=PRESENT, version=1)])
+        second = hub.stream(hub.subscribe(), load)
+        second_chunk = asyncio.ensure_future(second.__anext__())
+        # Subscribed without anything new since - shares the second load
+        third = hub.stream(hub.subscribe(), load)
+        third_chunk = asyncio.ensure_future(third.__anext__())
+        await asyncio.sleep(0)
+        release.set()
+        chunks = await asyncio.gather(first_chunk, second_chunk, third_chunk)
+        for stream in (first, second, third):
+            await stream.aclose()
+        return chunks
+
+    chunks = read_events(asyncio.run(run()))
+    assert len(loads) == 2
+    assert [data["present_count"] for _, data in chunks] == [1, 2, 2]
@@ -0,0 +1,114 @@
+"""
+Checks the monthly report (GET /api/attendance/monthly-report/{year}/{month}):
+every employee's present/absent days and percentage match a count of their
+raw records in that month and nothing outside it, after re-marks and deletes
+too, employees without records show zeros, the department filter and paging
+work, and the whole page is a single query.
+
+Runs against an in-memory SQLite database, no server or .env needed:
+    python -m pytest test_monthly_report.py
+"""
+import re
+from datetime import date
+import pytest
+from fastapi import Response
+from sqlalchemy import event, select
+from app import models, schemas
+from app.pagination import NEXT_CURSOR_HEADER
+from app.routers.attendance import delete_attendance, get_monthly_report, mark_attendance
+from app.routers.employees import create_employee
+
+PRESENT, ABSENT = models.AttendanceStatus.PRESENT, models.AttendanceStatus.ABSENT
+
+
+@pytest.fixture
+def db(db):
+    for employee_id, department in (("EMP001", "Engineering"), ("EMP002", "Engineering"), ("EMP003", "Sales"), ("EMP004", "Sales")):
+        create_employee(schemas.EmployeeCreate(
+            employee_id=employee_id, full_name=f"Employee {employee_id[-1]}", email=f"{employee_id}@example.com", department=department
+        ), db=db)
+    marks = [
+        ("EMP001", date(2026, 2, 2), PRESENT), ("EMP001", date(2026, 2, 3), PRESENT), ("EMP001", date(2026, 2, 4), ABSENT),
+        ("EMP002", date(2026, 2, 2), ABSENT), ("EMP002", date(2026, 2, 28), PRESENT),
+        ("EMP003", date(2026, 2, 10), PRESENT),
+        # Either side of February - not in the report
+        ("EMP001", date(2026, 1, 31), PRESENT), ("EMP003", date(2026, 3, 1), ABSENT),
+    ]
+    for employee_id, day, status in marks:
+        mark(db, employee_id, day, status)
+    return db
+
+
+def mark(db, employee_id, day, status):
+    return mark_attendance(schemas.AttendanceCreate(employee_id=employee_id, date=day, status=status), db=db)
+
+
+def report(db, department=None, limit=None, cursor=None, year=2026, month=2):
+    response = Response()
+    result = get_monthly_report(response, year=year, month=month, department=department, limit=limit, cursor=cursor, db=db)
+    return result, response
+
+
+def raw_counts(db, year, month):
+    """The report as counted straight from the attendance rows"""
+    counts = {}
+    for employee_id, day, status in db.execute(select(models.Attendance.employee_id, models.Attendance.date, models.Attendance.status)):
+        if (day.year, day.month) == (year, month):
+            present, absent = counts.get(employee_id, (0, 0))
+            counts[employee_id] = (present + (status == PRESENT), absent + (status == ABSENT))
+    return counts
+
+
+def as_counts(result):
+    return {row["employee_id"]: (row["present_days"], row["absent_days"]) for row in result["report"] if row["total_days"]}
+
+
+def test_report_matches_the_raw_records(db):
+    result, _ = report(db)
+
+    assert (result["year"], result["month"]) == (2026, 2)
+    assert as_counts(result) == raw_counts(db, 2026, 2) == {"EMP001": (2, 1), "EMP002": (1, 1), "EMP003": (1, 0)}
+    rows = {row["employee_id"]: row for row in result["report"]}
+    assert rows["EMP001"]["attendance_percentage"] == 66.67
+    assert rows["EMP001"]["employee_name"] == "Employee 1"
+    assert rows["EMP004"] == {
+        "employee_id": "EMP004", "employee_name": "Employee 4", "total_days": 0, "present_days": 0, "absent_days": 0, "attendance_percentage": 0.0
+    }
+    # Valid against the route's response_model
+    schemas.MonthlyReportResponse.model_validate(result)
+
+
+def test_report_follows_remarks_and_deletes(db):
+    mark(db, "EMP001", date(2026, 2, 4), PRESENT)
+    record = mark(db, "EMP002", date(2026, 2, 2), ABSENT)
+    delete_attendance(record.id, db=db)
+    mark(db, "EMP004", date(2026, 2, 5), ABSENT)
+
+    result, _ = report(db)
+
+    assert as_counts(result) == raw_counts(db, 2026, 2) == {"EMP001": (3, 0), "EMP002": (1, 0), "EMP003": (1, 0), "EMP004": (0, 1)}
+
+
+def test_department_filter_and_pages(db):
+    result, _ = report(db, department="Sales")
+    assert [row["employee_id"] for row in result["report"]] == ["EMP003", "EMP004"]
+
+    first, response = report(db, limit=3)
+    second, last = report(db, limit=3, cursor=response.headers[NEXT_CURSOR_HEADER])
+    assert [row["employee_id"] for row in first["report"] + second["report"]] == ["EMP001", "EMP002", "EMP003", "EMP004"]
+    assert NEXT_CURSOR_HEADER not in last.headers
+
+    empty, _ = report(db, month=4)
+    assert as_counts(empty) == {} and len(empty["report"]) == 4
+
+
+def test_report_is_one_query(engine, db):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    report(db)
+
+    assert len(statements) == 1
+    # Read from the monthly counters, not the attendance table
+    assert "employee_attendance_months" in statements[0]
+    assert not re.search(r"\battendance\b", statements[0])
@@ -0,0 +1,150 @@
+"""
+Checks keyset pagination and streaming on the employee and attendance
+listings (app/pagination.py): walking the pages with X-Next-Cursor returns
+every row once in the listing's order, also with ties on the date and rows
+added between pages, a cursor that wasn't issued by us is a 400 and never a
+500, and the NDJSON/CSV streams return the same rows as the JSON listing.
+
+Runs against an in-memory SQLite database, no server or .env needed:
+    python -m pytest test_pagination.py
+"""
+import asyncio
+import base64
+import csv
+import io
+import json
+from datetime import date
+import pytest
+from fastapi import HTTPException, Response
+from sqlalchemy.orm import sessionmaker
+from app import database, departments, models
+from app.pagination import NEXT_CURSOR_HEADER
+from app.routers.attendance import get_all_attendance
+from app.routers.employees import get_all_employees
+from conftest import make_request
+
+DAYS = [date(2026, 3, 2), date(2026, 3, 3), date(2026, 3, 4)]
+
+
+@pytest.fixture
+def db(engine, db, monkeypatch):
+    # The streams open their own session
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    department_ids = departments.ensure_departments(db, ["Engineering", "Sales"])
+    for n in range(1, 8):
+        department = "Engineering" if n % 2 else "Sales"
+        db.add(models.Employee(
+            employee_id=f"EMP{n:03d}", full_name=f"Employee {n}", email=f"emp{n}@example.com",
+            department=department, department_id=department_ids[department]
+        ))
+    db.flush()
+    # Several records on each day, so the date alone doesn't order the pages
+    for day in DAYS:
+        for n in range(1, 8):
+            db.add(models.Attendance(employee_id=f"EMP{n:03d}", date=day, status="Present" if n % 3 else "Absent"))
+    db.commit()
+    return db
+
+
+def list_employees(db, **params):
+    params = {"limit": None, "cursor": None, "department": None, "output_format": "json", **params}
+    return get_all_employees(make_request(), Response(), db=db, **params)
+
+
+def list_attendance(db, **params):
+    params = {
+        "date_filter": None, "employee_id": None, "start_date": None, "end_date": None, "department": None,
+        "limit": None, "cursor": None, "output_format": "json", **params
+    }
+    return get_all_attendance(make_request(), Response(), db=db, **params)
+
+
+def walk(listing, db, limit, **params):
+    """Every page in turn, following X-Next-Cursor until it's gone"""
+    pages, cursor = [], None
+    while True:
+        response = listing(db, limit=limit, cursor=cursor, **params)
+        pages.append(json.loads(response.body))
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            return pages
+
+
+def streamed(response):
+    async def read():
+        return "".join([chunk async for chunk in response.body_iterator])
+    return asyncio.run(read())
+
+
+def test_employee_pages_cover_every_row_once(db):
+    everyone = json.loads(list_employees(db).body)
+
+    pages = walk(list_employees, db, limit=3)
+
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [row for page in pages for row in page] == everyone
+    sales = walk(list_employees, db, limit=2, department="Sales")
+    assert [row["employee_id"] for page in sales for row in page] == ["EMP002", "EMP004", "EMP006"]
+
+
+def test_attendance_pages_break_ties_on_the_date(db):
+    everything = json.loads(list_attendance(db).body)
+    assert [(row["date"], row["id"]) for row in everything] == sorted(((row["date"], row["id"]) for row in everything), reverse=True)
+
+    pages = walk(list_attendance, db, limit=4)
+
+    assert [row for page in pages for row in page] == everything
+    in_range = walk(list_attendance, db, limit=5, start_date=DAYS[1], department="Engineering")
+    assert [row for page in in_range for row in page] == json.loads(
+        list_attendance(db, start_date=DAYS[1], department="Engineering").body
+    )
+
+
+def test_rows_added_between_pages_dont_shift_the_next_page(db):
+    first = list_employees(db, limit=3)
+    db.add(models.Employee(employee_id="EMP000", full_name="Newcomer", email="new@example.com", department="Sales"))
+    db.commit()
+
+    second = list_employees(db, limit=3, cursor=first.headers[NEXT_CURSOR_HEADER])
+
+    assert [row["employee_id"] for row in json.loads(second.body)] == ["EMP004", "EMP005", "EMP006"]
+
+
+def encoded(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-a-cursor", "!!!", encoded({"id": 1}), encoded(["1", "2"]), encoded([5]), encoded(["abc"]), encoded([None]),
+    base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+])
+def test_bad_employee_cursor_is_a_400(db, cursor):
+    with pytest.raises(HTTPException) as error:
+        list_employees(db, limit=2, cursor=cursor)
+    assert (error.value.status_code, error.value.detail) == (400, "Invalid pagination cursor")
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-a-cursor", encoded(["2026-03-02"]), encoded(["2026-13-01", "1"]), encoded(["2026-03-02", "x"]),
+    encoded([20260302, 1]), encoded([None, "1"]),
+])
+def test_bad_attendance_cursor_is_a_400(db, cursor):
+    with pytest.raises(HTTPException) as error:
+        list_attendance(db, limit=2, cursor=cursor)
+    assert (error.value.status_code, error.value.detail) == (400, "Invalid pagination cursor")
+
+
+def test_streams_return_the_json_rows(db):
+    employees = json.loads(list_employees(db).body)
+    attendance = json.loads(list_attendance(db, department="Sales").body)
+
+    ndjson = streamed(list_employees(db, output_format="ndjson"))
+    assert [json.loads(line) for line in ndjson.splitlines()] == employees
+
+    rows = list(csv.DictReader(io.StringIO(streamed(list_attendance(db, department="Sales", output_format="csv")))))
+    assert rows == [{key: str(value) for key, value in row.items()} for row in attendance]
+
+    # A stream starts after a cursor and stops at limit, like a page
+    page = list_employees(db, limit=2)
+    rest = streamed(list_employees(db, cursor=page.headers[NEXT_CURSOR_HEADER], limit=2, output_format="ndjson"))
+    assert [json.loads(line) for line in rest.splitlines()] == employees[2:4]
@@ -0,0 +1,195 @@
+"""
+Checks the monthly partitioning of attendance (app/partitions.py) on a real
+Postgres: converting a table that already has rows keeps every row and id,
+the (employee_id, date) unique index and every ON CONFLICT upsert that relies
+on it (the mark route, bulk uploads, write-behind batches) still work across
+partitions, a day without a partition lands in the default partition until
+maintenance gives it one, and deleting an employee and archiving a year reach
+into the partitions.
+
+Postgres only - skipped unless TEST_DATABASE_URL points at a throwaway
+database (its public schema is dropped and recreated for every test):
+    TEST_DATABASE_URL=postgresql://postgres@localhost:5432/hrms_test python -m pytest test_partitions.py
+"""
+import os
+from datetime import date
+import pytest
+from sqlalchemy import create_engine, event, func, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+from app import archive, cache, counters, departments, migrations, models, partitions, schemas, summary, write_behind
+from app.routers import attendance, employees
+
+DATABASE_URL = os.environ.get("TEST_DATABASE_URL", "")
+pytestmark = pytest.mark.skipif(not DATABASE_URL.startswith("postgres"), reason="needs TEST_DATABASE_URL pointing at Postgres")
+
+PRESENT, ABSENT = models.AttendanceStatus.PRESENT, models.AttendanceStatus.ABSENT
+TODAY = date.today()
+LAST_YEAR = TODAY.year - 1
+
+
+def create_schema(engine, monkeypatch):
+    with engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA public CASCADE"))
+        conn.execute(text("CREATE SCHEMA public"))
+        has_trigram = conn.execute(text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")).first()
+    if has_trigram:
+        migrations.upgrade(engine)
+        return
+    # Search's trigram index needs the pg_trgm extension (contrib), which isn't what's tested here
+    table = models.Employee.__table__
+    monkeypatch.setattr(table, "indexes", {index for index in table.indexes if index.name != "ix_employees_search_trgm"})
+    listeners = list(table.dispatch.before_create)
+    for listener in listeners:
+        event.remove(table, "before_create", listener)
+    try:
+        migrations.upgrade(engine)
+    finally:
+        for listener in listeners:
+            event.listen(table, "before_create", listener)
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    engine = create_engine(DATABASE_URL)
+    create_schema(engine, monkeypatch)
+
+    # Ids and employees are cached per process, and every test starts from an empty database
+    fresh = cache.EmployeeCache(cache.InMemoryBackend(100), ttl=60)
+    for module in (cache, employees, attendance):
+        monkeypatch.setattr(module, "employee_cache", fresh)
+    monkeypatch.setattr(departments, "_ids", {})
+    monkeypatch.setattr(write_behind, "SessionLocal", sessionmaker(bind=engine))
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    with sessionmaker(autocommit=False, autoflush=False, bind=engine)() as db:
+        yield db
+
+
+def add_employees(db, *employee_ids, department="Engineering"):
+    for employee_id in employee_ids:
+        employees.create_employee(
+            schemas.EmployeeCreate(employee_id=employee_id, full_name=employee_id, email=f"{employee_id}@example.com", department=department),
+            db=db
+        )
+
+
+def mark(db, employee_id, day, status=PRESENT):
+    return attendance.mark_attendance(schemas.AttendanceCreate(employee_id=employee_id, date=day, status=status), db=db)
+
+
+def records(db):
+    return db.execute(text("SELECT id, employee_id, date, status FROM attendance ORDER BY id")).all()
+
+
+def partition_of(db, attendance_id):
+    return db.execute(text("SELECT tableoid::regclass::text FROM attendance WHERE id = :id"), {"id": attendance_id}).scalar()
+
+
+def assert_counts_match_rows(db):
+    assert counters.check(db) == []
+    table = models.DailyAttendanceSummary.__table__
+    columns = (table.c.date, table.c.department, table.c.present_count, table.c.absent_count)
+    stored = sorted(db.execute(select(*columns)).all())
+    summary.rebuild(db)
+    assert sorted(db.execute(select(*columns)).all()) == stored
+    db.rollback()
+
+
+def test_converting_keeps_every_row_and_id(engine, db):
+    add_employees(db, "EMP001", "EMP002")
+    for day in (date(LAST_YEAR, 3, 2), date(LAST_YEAR, 11, 30), TODAY):
+        mark(db, "EMP001", day)
+        mark(db, "EMP002", day, ABSENT)
+    before = records(db)
+    db.close()
+
+    created = partitions.setup(engine)
+
+    with engine.connect() as conn:
+        assert partitions.is_partitioned(conn)
+    assert partitions.partition_name(date(LAST_YEAR, 3, 1)) in created
+    assert partitions.partition_name(partitions.month_start(TODAY)) in created
+    assert records(db) == before
+    assert partition_of(db, before[0].id) == partitions.partition_name(date(LAST_YEAR, 3, 1))
+    # The id sequence moved over with the table
+    assert mark(db, "EMP001", date(LAST_YEAR, 3, 3)).id == before[-1].id + 1
+    # Running it again only tops up partitions
+    assert partitions.setup(engine) == []
+    assert_counts_match_rows(db)
+
+
+def test_unique_key_and_upserts_on_partitioned_table(engine, db):
+    partitions.setup(engine)
+    add_employees(db, "EMP001", "EMP002", "EMP003")
+
+    first = mark(db, "EMP001", TODAY)
+    assert mark(db, "EMP001", TODAY, ABSENT).id == first.id
+
+    db.execute(text("INSERT INTO attendance (employee_id, date, status) VALUES ('EMP002', :day, 'PRESENT')"), {"day": TODAY})
+    with pytest.raises(IntegrityError):
+        db.execute(text("INSERT INTO attendance (employee_id, date, status) VALUES ('EMP002', :day, 'ABSENT')"), {"day": TODAY})
+    db.rollback()
+
+    report = attendance.bulk_upsert_attendance(db, [
+        {"employee_id": "EMP001", "date": TODAY.isoformat(), "status": "Present"},
+        {"employee_id": "EMP002", "date": TODAY.isoformat(), "status": "Absent"},
+        {"employee_id": "EMP003", "date": date(LAST_YEAR, 6, 1).isoformat(), "status": "Present"},
+    ])
+    assert report["succeeded"] == 3
+
+    batch = [
+        write_behind.PendingWrite(schemas.AttendanceCreate(employee_id=employee_id, date=TODAY, status=status), "Engineering", 0)
+        for employee_id, status in (("EMP001", ABSENT), ("EMP003", ABSENT))
+    ]
+    write_behind.write_batch(batch)
+    assert [write.status for write in batch] == [write_behind.COMMITTED] * 2
+    assert batch[0].attendance_id == first.id
+
+    db.expire_all()
+    assert [(row.employee_id, row.date, row.status) for row in records(db)] == [
+        ("EMP001", TODAY, "ABSENT"), ("EMP002", TODAY, "ABSENT"), ("EMP003", date(LAST_YEAR, 6, 1), "PRESENT"), ("EMP003", TODAY, "ABSENT")
+    ]
+    assert_counts_match_rows(db)
+
+
+def test_default_partition_until_maintenance(engine, db):
+    partitions.setup(engine)
+    add_employees(db, "EMP001")
+
+    # No partition this far back - the row waits in the default partition
+    record = mark(db, "EMP001", date(LAST_YEAR - 5, 7, 14))
+    assert partition_of(db, record.id) == partitions.DEFAULT_PARTITION
+    db.close()
+
+    with engine.begin() as conn:
+        assert partitions.maintain(conn) == [partitions.partition_name(date(LAST_YEAR - 5, 7, 1))]
+
+    assert partition_of(db, record.id) == partitions.partition_name(date(LAST_YEAR - 5, 7, 1))
+    assert mark(db, "EMP001", date(LAST_YEAR - 5, 7, 14), ABSENT).id == record.id
+
+
+def test_employee_delete_and_archive_reach_the_partitions(engine, db):
+    add_employees(db, "EMP001", "EMP002")
+    for day in (date(LAST_YEAR, 1, 5), date(LAST_YEAR, 2, 5), TODAY):
+        mark(db, "EMP001", day)
+        mark(db, "EMP002", day)
+    db.close()
+    partitions.setup(engine)
+
+    employees.delete_employee("EMP002", db=db)
+    assert {row.employee_id for row in records(db)} == {"EMP001"}
+
+    assert archive.archive_year(db, LAST_YEAR) == 2
+    db.commit()
+    with engine.connect() as conn:
+        names = partitions.partition_names(conn)
+    assert partitions.partition_name(date(LAST_YEAR, 1, 1)) not in names
+    assert partitions.partition_name(partitions.month_start(TODAY)) in names
+    assert [row.date for row in records(db)] == [TODAY]
+    assert db.execute(select(func.count()).select_from(models.AttendanceArchive)).scalar() == 2
+    assert_counts_match_rows(db)
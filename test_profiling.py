@@ -0,0 +1,164 @@
+"""
+Checks request profiling (app/profiling.py): a profiled request gets a
+Server-Timing header with its handler, SQL and serialization time and the
+number of statements it ran, the same numbers land in the /metrics
+histograms under the route template, /metrics needs the internal API token,
+slow statements are logged with their route, and a failed statement leaves
+no start time behind.
+
+Drives a small app over ASGI against an in-memory SQLite database, no server
+or .env needed:
+    python -m pytest test_profiling.py
+"""
+import asyncio
+import logging
+import re
+import pytest
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+from app import profiling
+from app.config import settings
+from app.routers import metrics
+
+TOKEN = "test-token"
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(settings, "profiling_enabled", True)
+    monkeypatch.setattr(settings, "internal_api_token", TOKEN)
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    profiling.instrument_engine(engine)
+    SessionLocal = sessionmaker(bind=engine)
+
+    def get_db():
+        with SessionLocal() as db:
+            yield db
+
+    # Set up the same way main.py does when PROFILING_ENABLED=true
+    app = FastAPI()
+
+    @app.get("/profiled/{item_id}")
+    def read_item(item_id: int, db: Session = Depends(get_db)):
+        db.execute(text("SELECT 1")).all()
+        db.execute(text("SELECT 2")).all()
+        return {"item_id": item_id}
+
+    @app.get("/profiled-async")
+    async def read_async():
+        return {"ok": True}
+
+    app.add_middleware(profiling.ProfilingMiddleware)
+    app.include_router(metrics.router)
+    profiling.instrument_routes(app)
+    return app
+
+
+def call(app, path, headers=()):
+    """Status, headers and body of a GET request, sent straight to the ASGI app"""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "method": "GET", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "headers": [(name.encode(), value.encode()) for name, value in headers],
+        "scheme": "http", "server": ("test", 80), "http_version": "1.1", "root_path": "",
+    }
+    asyncio.run(app(scope, receive, send))
+    start = next(message for message in messages if message["type"] == "http.response.start")
+    body = b"".join(message.get("body", b"") for message in messages if message["type"] == "http.response.body")
+    return start["status"], {name.decode(): value.decode() for name, value in start["headers"]}, body.decode()
+
+
+def server_timing(headers):
+    return {name: float(duration) for name, duration in re.findall(r"(\w+);dur=([\d.]+)", headers["server-timing"])}
+
+
+def series(page, name, route):
+    """The _count and _sum of one histogram series on the /metrics page"""
+    label = f'method="GET",route="{route}"'
+    count = re.search(rf"^{name}_count{{{re.escape(label)}}} (\S+)$", page, re.M)
+    total = re.search(rf"^{name}_sum{{{re.escape(label)}}} (\S+)$", page, re.M)
+    return (float(count.group(1)), float(total.group(1))) if count else (0.0, 0.0)
+
+
+def scrape(app):
+    status, _, body = call(app, "/metrics", headers=[("authorization", f"Bearer {TOKEN}")])
+    assert status == 200
+    return body
+
+
+def test_server_timing_header(app):
+    status, headers, body = call(app, "/profiled/7")
+
+    assert (status, body) == (200, '{"item_id":7}')
+    timing = server_timing(headers)
+    assert set(timing) == {"total", "handler", "db", "serialize"}
+    assert timing["total"] >= timing["handler"] >= timing["db"]
+    assert 'desc="2 queries"' in headers["server-timing"]
+
+    # Async routes are timed too, with no queries
+    _, headers, _ = call(app, "/profiled-async")
+    assert 'desc="0 queries"' in headers["server-timing"]
+
+
+def test_metrics_count_each_route_template(app):
+    before = scrape(app)
+    call(app, "/profiled/1")
+    call(app, "/profiled/2")
+    call(app, "/no-such-page")
+
+    after = scrape(app)
+
+    # Both item ids land in the one series for the route template
+    for name in ("hrms_request_duration_seconds", "hrms_request_handler_seconds", "hrms_request_db_seconds"):
+        assert series(after, name, "/profiled/{item_id}")[0] - series(before, name, "/profiled/{item_id}")[0] == 2
+    queries = series(after, "hrms_request_db_queries", "/profiled/{item_id}")
+    assert queries[1] - series(before, "hrms_request_db_queries", "/profiled/{item_id}")[1] == 4
+    assert series(after, "hrms_request_duration_seconds", "unmatched")[0] - series(before, "hrms_request_duration_seconds", "unmatched")[0] == 1
+    assert "/no-such-page" not in after
+    assert 'hrms_request_db_queries_bucket{method="GET",route="/profiled/{item_id}",le="+Inf"}' in after
+
+
+@pytest.mark.parametrize("headers", [[], [("authorization", "Bearer wrong")], [("authorization", TOKEN)]])
+def test_metrics_need_the_internal_token(app, headers):
+    status, response_headers, body = call(app, "/metrics", headers=headers)
+
+    assert status == 401
+    assert response_headers["www-authenticate"] == "Bearer"
+    assert "hrms_request" not in body
+
+
+def test_slow_queries_are_logged_with_their_route(app, monkeypatch, caplog):
+    monkeypatch.setattr(settings, "slow_query_ms", 0.000001)
+
+    with caplog.at_level(logging.WARNING, logger="app.sql.slow"):
+        call(app, "/profiled/3")
+
+    messages = [record.getMessage() for record in caplog.records if record.name == "app.sql.slow"]
+    assert len(messages) == 2
+    assert all("on GET /profiled/{item_id}: SELECT" in message for message in messages)
+
+
+def test_failed_statements_leave_no_start_time_behind(monkeypatch):
+    monkeypatch.setattr(settings, "profiling_enabled", True)
+    engine = create_engine("sqlite://")
+    profiling.instrument_engine(engine)
+
+    with engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM no_such_table"))
+        assert conn.info["query_started"] == {}
+
+        # The next statement is timed from its own start
+        assert conn.execute(text("SELECT 1")).scalar() == 1
+        assert conn.info["query_started"] == {}
@@ -0,0 +1,96 @@
+"""
+Checks read replica routing (app/replicas.py) against SQLite files standing
+in for a primary and its replicas: round-robin between the replicas,
+skipping one that can't connect, falling back to the primary, and reading
+from the primary right after the same client wrote something.
+
+No server or .env needed:
+    python -m pytest test_read_replicas.py
+"""
+import asyncio
+import time
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from app import database
+from app.replicas import STICKY_COOKIE, ReadYourWritesMiddleware, ReplicaSet, sticky_to_primary
+from conftest import make_request
+
+
+def stand_in(tmp_path, name):
+    """A SQLite file that says which database it is"""
+    engine = create_engine(f"sqlite:///{tmp_path / name}.db")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE whoami (name TEXT)"))
+        conn.execute(text("INSERT INTO whoami VALUES (:name)"), {"name": name})
+    return engine
+
+
+def use_databases(monkeypatch, tmp_path, replica_engines, retry_seconds=30):
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(bind=stand_in(tmp_path, "primary")))
+    replicas = ReplicaSet(replica_engines, retry_seconds)
+    monkeypatch.setattr(database, "read_replicas", replicas)
+    return replicas
+
+
+def read_from(primary=False):
+    with database.read_session(primary) as db:
+        return db.execute(text("SELECT name FROM whoami")).scalar()
+
+
+def test_round_robin_and_failover(monkeypatch, tmp_path):
+    broken = create_engine(f"sqlite:///{tmp_path}/missing/replica.db")
+    replicas = use_databases(monkeypatch, tmp_path, [stand_in(tmp_path, "r1"), broken, stand_in(tmp_path, "r2")], retry_seconds=0.2)
+
+    # The broken replica's turn goes to the next one, and it's skipped after failing once
+    assert [read_from() for _ in range(4)] == ["r1", "r2", "r2", "r1"]
+    assert [r["failures"] for r in replicas.stats()] == [0, 1, 0]
+    assert not replicas.stats()[1]["up"]
+    assert read_from(primary=True) == "primary"
+
+    # Tried again once the retry window is up
+    time.sleep(0.25)
+    read_from(), read_from()
+    assert replicas.stats()[1]["failures"] == 2
+
+
+def test_no_replicas_up_reads_primary(monkeypatch, tmp_path):
+    use_databases(monkeypatch, tmp_path, [create_engine(f"sqlite:///{tmp_path}/missing/{name}.db") for name in ("a", "b")])
+    assert read_from() == "primary"
+
+    monkeypatch.setattr(database, "read_replicas", ReplicaSet([], 30))
+    assert read_from() == "primary"
+
+
+def test_read_your_writes(monkeypatch, tmp_path):
+    use_databases(monkeypatch, tmp_path, [stand_in(tmp_path, "r1")])
+
+    async def endpoint(scope, receive, send):
+        await send({"type": "http.response.start", "status": 404 if scope["path"] == "/missing" else 201, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    def cookies_set(method, path="/"):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": method, "path": path, "headers": []}
+        asyncio.run(ReadYourWritesMiddleware(endpoint, seconds=5)(scope, None, send))
+        return [value.decode() for name, value in sent[0]["headers"] if name == b"set-cookie"]
+
+    assert cookies_set("GET") == []
+    assert cookies_set("POST", "/missing") == []
+    (cookie,) = cookies_set("POST")
+    until = cookie.split(";")[0].split("=")[1]
+
+    # The client that wrote reads from the primary until the cookie runs out, everyone else from the replicas
+    writer, someone_else = make_request(cookies={STICKY_COOKIE: until}), make_request()
+    assert sticky_to_primary(writer) and not sticky_to_primary(someone_else)
+    assert not sticky_to_primary(make_request(cookies={STICKY_COOKIE: time.time() - 1}))
+    assert not sticky_to_primary(make_request(cookies={STICKY_COOKIE: "garbage"}))
+
+    for request, expected in ((writer, "primary"), (someone_else, "r1")):
+        dependency = database.get_read_db(request)
+        db = next(dependency)
+        assert db.execute(text("SELECT name FROM whoami")).scalar() == expected
+        dependency.close()
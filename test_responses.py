@@ -0,0 +1,121 @@
+"""
+Checks the orjson fast path for the listings (app/responses.py): the employee
+and attendance listings, an employee's attendance history and the department
+headcounts return exactly the bytes their response_model would have given -
+same fields, same order, dates as ISO strings, statuses as their values,
+non-ASCII names as UTF-8 - and keep the ETag, X-Next-Cursor and every
+repeated header such as Set-Cookie.
+
+Runs against an in-memory SQLite database, no server or .env needed:
+    python -m pytest test_responses.py
+"""
+from datetime import date
+from typing import List
+import pytest
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from app import models, schemas
+from app.pagination import NEXT_CURSOR_HEADER
+from app.responses import rows_response
+from app.routers.attendance import get_all_attendance, get_employee_attendance, mark_attendance
+from app.routers.employees import create_employee, get_all_employees, get_department_headcounts
+from conftest import make_request
+
+PEOPLE = [("EMP001", "Zoë Ångström", "Engineering"), ("EMP002", "李小龍", "Sales"), ("EMP003", "Jane \"JJ\" Roe", "Engineering")]
+
+
+@pytest.fixture
+def db(db):
+    for employee_id, name, department in PEOPLE:
+        create_employee(schemas.EmployeeCreate(
+            employee_id=employee_id, full_name=name, email=f"{employee_id.lower()}@example.com", department=department
+        ), db=db)
+        for day, status in ((date(2026, 3, 2), "Present"), (date(2026, 3, 3), "Absent")):
+            mark_attendance(schemas.AttendanceCreate(employee_id=employee_id, date=day, status=status), db=db)
+    return db
+
+
+def validated(response_model, objects) -> bytes:
+    """What FastAPI renders when the route's response_model validates the result"""
+    adapter = TypeAdapter(response_model)
+    return adapter.dump_json(adapter.validate_python(objects, from_attributes=True))
+
+
+def employees(db, **params):
+    params = {"limit": None, "cursor": None, "department": None, "output_format": "json", **params}
+    return get_all_employees(make_request(), Response(), db=db, **params)
+
+
+def attendance(db, **params):
+    params = {
+        "date_filter": None, "employee_id": None, "start_date": None, "end_date": None, "department": None,
+        "limit": None, "cursor": None, "output_format": "json", **params
+    }
+    return get_all_attendance(make_request(), Response(), db=db, **params)
+
+
+def test_employee_listing_matches_the_response_model(db):
+    response = employees(db)
+
+    assert isinstance(response, ORJSONResponse)
+    assert response.headers["content-type"] == "application/json"
+    expected = db.execute(select(models.Employee).order_by(models.Employee.id)).scalars().all()
+    assert response.body == validated(List[schemas.Employee], expected)
+    assert "Zoë Ångström".encode() in response.body
+
+
+def test_attendance_listings_match_the_response_model(db):
+    records = db.execute(
+        select(models.Attendance).order_by(models.Attendance.date.desc(), models.Attendance.id.desc())
+    ).scalars().all()
+    names = {employee_id: name for employee_id, name, _ in PEOPLE}
+    expected = [
+        {"employee_id": r.employee_id, "date": r.date, "status": r.status, "id": r.id, "employee_name": names[r.employee_id]}
+        for r in records
+    ]
+
+    body = attendance(db).body
+    assert body == validated(List[schemas.AttendanceWithEmployee], expected)
+    assert b'"status":"Absent"' in body and b'"date":"2026-03-03"' in body
+
+    history = get_employee_attendance("EMP002", db=db)
+    assert history.body == validated(List[schemas.Attendance], [r for r in records if r.employee_id == "EMP002"])
+
+
+def test_department_headcounts_match_the_response_model(db):
+    response = get_department_headcounts(make_request(), Response(), db=db)
+
+    assert response.body == validated(
+        List[schemas.DepartmentHeadcount], [{"department": "Engineering", "headcount": 2}, {"department": "Sales", "headcount": 1}]
+    )
+
+
+def test_headers_set_on_the_response_are_kept(db):
+    page = employees(db, limit=2)
+    assert NEXT_CURSOR_HEADER in page.headers
+    assert "etag" in page.headers and "cache-control" in page.headers
+
+    page = attendance(db, limit=4)
+    assert NEXT_CURSOR_HEADER in page.headers
+
+    assert rows_response([]).body == b"[]"
+
+
+def test_repeated_headers_are_all_kept():
+    response = Response()
+    response.set_cookie("first", "1")
+    response.set_cookie("second", "2")
+    response.headers.append("vary", "Cookie")
+
+    rendered = rows_response([], response)
+
+    assert [value for name, value in rendered.raw_headers if name == b"set-cookie"] == [
+        value for name, value in response.raw_headers if name == b"set-cookie"
+    ]
+    assert len(rendered.headers.getlist("set-cookie")) == 2
+    assert rendered.headers["vary"] == "Cookie"
+    # Only the JSON body's own length and type
+    assert rendered.headers.getlist("content-length") == [str(len(rendered.body))]
+    assert rendered.headers.getlist("content-type") == ["application/json"]
@@ -0,0 +1,115 @@
+"""
+Checks employee search (GET /api/employees/search, app/search.py): results
+are ranked exact employee_id/email first, then names starting with the query,
+then the rest by name - with both the SQLite prefix index and the Postgres
+LIKE query (run here on SQLite) - `%` and `_` in a query only match
+themselves, pages follow the cursor, and the index picks up new and deleted
+employees.
+
+Runs against an in-memory SQLite database, no server or .env needed:
+    python -m pytest test_search.py
+"""
+import json
+import pytest
+from fastapi import HTTPException, Response
+from app import schemas, search
+from app.pagination import NEXT_CURSOR_HEADER, encode_cursor
+from app.routers.employees import create_employee, delete_employee, search_employees
+
+PEOPLE = [
+    ("EMP001", "Ann Lee", "ann@example.com", "Engineering"),
+    ("EMP002", "Lee Annan", "lee@example.com", "Sales"),
+    ("EMP003", "Joanna Smith", "joanna@example.com", "Sales"),
+    ("EMP004", "Annabel Ng", "annabel@example.com", "Engineering"),
+    ("ANN", "Zed Ann", "zed@example.com", "Support"),
+    ("EMP_007", "Pat 100%", "pat_o@example.com", "R_D"),
+    # What `_` and `%` would match as LIKE wildcards
+    ("EMPX007", "Pat 1000", "patxo@example.com", "R&D"),
+]
+
+
+@pytest.fixture
+def db(db, monkeypatch):
+    # Each test's database starts at the same version, so each gets its own index
+    monkeypatch.setattr(search, "prefix_index", search.PrefixIndex())
+    for employee_id, name, email, department in PEOPLE:
+        create_employee(schemas.EmployeeCreate(employee_id=employee_id, full_name=name, email=email, department=department), db=db)
+    return db
+
+
+def prefix_search(db, q, limit=20, offset=0):
+    return [row.employee_id for row in search.prefix_search_rows(db, q, limit, offset)]
+
+
+def like_search(db, q, limit=20, offset=0):
+    return [row.employee_id for row in db.execute(search.trigram_search_statement(q, limit, offset))]
+
+
+def search_page(db, q, limit=20, cursor=None):
+    response = search_employees(Response(), q=q, limit=limit, cursor=cursor, db=db)
+    return [row["employee_id"] for row in json.loads(response.body)], response.headers.get(NEXT_CURSOR_HEADER)
+
+
+@pytest.mark.parametrize("run, rest", [
+    # Other matches are word prefixes with the index, substrings with LIKE
+    (prefix_search, ["EMP002"]),
+    (like_search, ["EMP003", "EMP002"]),
+])
+def test_ranking(db, run, rest):
+    # The exact employee_id, then names starting with "ann", then the rest by name
+    assert run(db, "ann") == ["ANN", "EMP001", "EMP004"] + rest
+    assert run(db, "ANN") == run(db, "ann")
+    assert run(db, "annabel@example.com") == ["EMP004"]
+    # Every word has to match, and the whole phrase starting a name ranks first
+    assert run(db, "lee ann") == ["EMP002", "EMP001"]
+    assert run(db, "ann engineering") == ["EMP001", "EMP004"]
+    assert run(db, "nobody") == []
+    # Pages of the same ranking
+    assert run(db, "ann", limit=2) + run(db, "ann", offset=2) == run(db, "ann")
+
+
+@pytest.mark.parametrize("run", [prefix_search, like_search])
+def test_underscore_only_matches_itself(db, run):
+    assert run(db, "pat_o") == ["EMP_007"]
+    assert run(db, "emp_007") == ["EMP_007"]
+
+
+def test_like_wildcards_are_escaped(db):
+    assert like_search(db, "100%") == ["EMP_007"]
+    assert like_search(db, "%") == ["EMP_007"]
+    assert like_search(db, "r_d") == ["EMP_007"]
+    assert like_search(db, "_") == ["EMP_007"]
+    assert like_search(db, "\\") == []
+    # A plain word still finds both Pats - only the wildcards are kept literal
+    assert like_search(db, "pat") == ["EMP_007", "EMPX007"]
+
+    # The index has no wildcards to escape - they're just characters no word starts with
+    assert prefix_search(db, "%") == prefix_search(db, "_") == []
+
+
+def test_pages_follow_the_cursor(db):
+    everyone, last = search_page(db, "ann")
+    assert last is None
+
+    first, cursor = search_page(db, "ann", limit=3)
+    second, last = search_page(db, "ann", limit=3, cursor=cursor)
+
+    assert first + second == everyone
+    assert last is None
+    assert search_page(db, "   ") == ([], None)
+
+    # Not base64 JSON, or a well-formed cursor that isn't a position
+    for bad in ("not-a-cursor", encode_cursor("x")):
+        with pytest.raises(HTTPException) as error:
+            search_page(db, "ann", cursor=bad)
+        assert error.value.status_code == 400
+
+
+def test_index_follows_new_and_deleted_employees(db):
+    assert prefix_search(db, "ann") == ["ANN", "EMP001", "EMP004", "EMP002"]
+
+    create_employee(schemas.EmployeeCreate(employee_id="EMP009", full_name="Anne Young", email="anne@example.com", department="Sales"), db=db)
+    delete_employee("EMP004", db=db)
+
+    assert prefix_search(db, "ann") == ["ANN", "EMP001", "EMP009", "EMP002"]
+    assert prefix_search(db, "annabel") == []
@@ -0,0 +1,99 @@
+"""
+Checks the production entry points: `python manage.py migrate` (the
+Procfile's release step) creates a fresh database with every migration
+recorded and is a no-op the second time, and gunicorn.conf.py takes its
+worker count and timeouts from Settings and gives every forked worker its own
+connections.
+
+Starts manage.py in a fresh process and uses SQLite files, no server, .env
+or gunicorn install needed:
+    python -m pytest test_server_config.py
+"""
+import logging
+import os
+import runpy
+import subprocess
+import sys
+from sqlalchemy import create_engine, inspect, select, text
+from sqlalchemy.pool import QueuePool
+from app import database, migrations
+from app.config import settings
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def manage(database_url, *args):
+    env = {**os.environ, "DATABASE_URL": database_url, "ATTENDANCE_PARTITIONING": "false"}
+    return subprocess.run([sys.executable, "manage.py", *args], cwd=ROOT, env=env, capture_output=True, text=True, timeout=60)
+
+
+def load_config(monkeypatch, **values):
+    for name, value in values.items():
+        monkeypatch.setattr(settings, name, value)
+    return runpy.run_path(os.path.join(ROOT, "gunicorn.conf.py"))
+
+
+def test_migrate_command(tmp_path):
+    url = f"sqlite:///{tmp_path}/hrms.db"
+
+    first = manage(url, "migrate")
+    assert first.returncode == 0, first.stderr
+    assert [line for line in first.stdout.splitlines() if line.startswith("✓ Applied")] == [
+        f"✓ Applied {version}" for version, _ in migrations.MIGRATIONS
+    ]
+
+    engine = create_engine(url)
+    assert {"employees", "attendance", "daily_attendance_summary", "departments"} <= set(inspect(engine).get_table_names())
+    with engine.connect() as conn:
+        applied = set(conn.execute(select(migrations.schema_migrations.c.version)).scalars())
+    assert applied == {version for version, _ in migrations.MIGRATIONS}
+
+    # Every deploy runs it - with nothing pending it changes nothing
+    second = manage(url, "migrate")
+    assert second.returncode == 0, second.stderr
+    assert second.stdout.strip() == "✓ Database is up to date"
+
+
+def test_gunicorn_config_follows_the_settings(monkeypatch):
+    monkeypatch.setenv("PORT", "9000")
+    config = load_config(
+        monkeypatch, web_concurrency=3, web_keepalive=7, web_timeout=45, web_graceful_timeout=20, web_max_requests=1000
+    )
+
+    assert config["bind"] == "0.0.0.0:9000"
+    assert config["worker_class"] == "uvicorn.workers.UvicornWorker"
+    assert (config["workers"], config["keepalive"], config["timeout"], config["graceful_timeout"]) == (3, 7, 45, 20)
+    assert (config["max_requests"], config["max_requests_jitter"]) == (1000, 100)
+    assert config["preload_app"] is True
+
+    # No WEB_CONCURRENCY - a worker per core
+    assert load_config(monkeypatch, web_concurrency=0)["workers"] == (os.cpu_count() or 1)
+
+
+def test_forked_workers_get_their_own_connections(monkeypatch, tmp_path, caplog):
+    config = load_config(monkeypatch, web_concurrency=2, db_pool_size=4, db_max_overflow=6, db_max_connections=0)
+    engine = create_engine(f"sqlite:///{tmp_path}/hrms.db", poolclass=QueuePool)
+    monkeypatch.setattr(database, "engine", engine)
+    monkeypatch.setattr(database, "async_engine", None)
+
+    # The master opened a connection while importing the app (preload_app)
+    master = engine.raw_connection()
+    inherited = master.dbapi_connection
+    master.close()
+    assert engine.pool.checkedin() == 1
+
+    class Server:
+        log = logging.getLogger("gunicorn.test")
+
+    config["post_fork"](Server(), None)
+
+    # The worker starts with an empty pool, and the master's connection was left open for the master
+    assert engine.pool.checkedin() == 0
+    assert inherited.execute("SELECT 1").fetchone() == (1,)
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT 1")).scalar() == 1
+    assert engine.pool.checkedin() == 1
+
+    with caplog.at_level(logging.INFO, logger="gunicorn.test"):
+        config["when_ready"](Server())
+    assert "2 workers, each with a database pool of 4 + 6 overflow" in caplog.text
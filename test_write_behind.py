@@ -0,0 +1,197 @@
+"""
+Checks the attendance write-behind batcher (app/write_behind.py): a batch is
+written in one go with the last mark per employee and day winning, a write
+for an employee deleted in the meantime fails on its own, status tokens
+answer from memory or the database, shutting down waits for the flush in
+progress and writes what is queued, a flusher that died is restarted by the
+next write, and two flushes overlapping on the same records leave the daily
+rollup and the counters matching the raw rows.
+
+Runs against a SQLite file (the overlap needs two connections), no server
+or .env needed:
+    python -m pytest test_write_behind.py
+"""
+import asyncio
+import threading
+import time
+from datetime import date
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import sessionmaker
+from app import counters, models, schemas, summary, write_behind
+from app.database import Base
+
+PRESENT, ABSENT = models.AttendanceStatus.PRESENT, models.AttendanceStatus.ABSENT
+DAY = date(2026, 3, 2)
+
+
+@pytest.fixture
+def engine(monkeypatch, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/hrms.db", connect_args={"check_same_thread": False})
+    # So a write for a missing employee fails like it does on Postgres
+    event.listen(engine, "connect", lambda conn, _: conn.execute("PRAGMA foreign_keys=ON"))
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        for employee_id, department in (("EMP001", "Engineering"), ("EMP002", "Sales"), ("EMP003", "Sales")):
+            db.add(models.Employee(employee_id=employee_id, full_name=employee_id, email=f"{employee_id}@example.com", department=department))
+        db.commit()
+    monkeypatch.setattr(write_behind, "SessionLocal", Session)
+    return engine
+
+
+def pending(employee_id, status, department="Sales", day=DAY):
+    return write_behind.PendingWrite(schemas.AttendanceCreate(employee_id=employee_id, date=day, status=status), department, 0)
+
+
+def statuses(engine):
+    with engine.connect() as conn:
+        return dict(conn.execute(select(models.Attendance.employee_id, models.Attendance.status)).all())
+
+
+def rollup(db):
+    table = models.DailyAttendanceSummary.__table__
+    return sorted(db.execute(select(table.c.date, table.c.department, table.c.present_count, table.c.absent_count)).all())
+
+
+def assert_counts_match_rows(engine):
+    with sessionmaker(bind=engine)() as db:
+        assert counters.check(db) == []
+        stored = rollup(db)
+        summary.rebuild(db)
+        assert rollup(db) == stored
+
+
+def test_batch_writes_last_mark_and_fails_deleted_employee(engine):
+    write_behind.write_batch([pending("EMP002", PRESENT)])
+    batch = [
+        pending("EMP001", PRESENT, "Engineering"),
+        pending("EMP002", ABSENT),
+        pending("EMP001", ABSENT, "Engineering"),  # the later mark for the same day wins
+        pending("EMP404", PRESENT),
+    ]
+
+    write_behind.write_batch(batch)
+
+    assert [write.status for write in batch] == [write_behind.COMMITTED] * 3 + [write_behind.FAILED]
+    assert batch[0].attendance_id == batch[2].attendance_id
+    assert batch[3].error.status_code == 404
+    assert statuses(engine) == {"EMP001": ABSENT, "EMP002": ABSENT}
+    assert_counts_match_rows(engine)
+
+
+def test_overlapping_flushes_keep_counts_exact(engine):
+    write_behind.write_batch([pending("EMP002", PRESENT)])
+    # Both flushes stop after their first statement until the other has run its own (or a second
+    # has passed, when the first one holds the lock the other is waiting for)
+    barrier, started = threading.Barrier(2), threading.local()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def overlap(*_):
+        if not getattr(started, "done", False):
+            started.done = True
+            try:
+                barrier.wait(timeout=1)
+            except threading.BrokenBarrierError:
+                pass
+
+    batches = [
+        [pending("EMP001", PRESENT, "Engineering"), pending("EMP002", ABSENT), pending("EMP003", PRESENT)],
+        [pending("EMP001", ABSENT, "Engineering"), pending("EMP002", ABSENT), pending("EMP003", ABSENT)],
+    ]
+    threads = [threading.Thread(target=write_behind.write_batch, args=(batch,)) for batch in batches]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    event.remove(engine, "after_cursor_execute", overlap)
+
+    assert all(write.status == write_behind.COMMITTED for batch in batches for write in batch)
+    assert statuses(engine)["EMP002"] == ABSENT
+    assert_counts_match_rows(engine)
+
+
+def test_batcher_flushes_queued_writes_together(engine):
+    async def run():
+        batcher = write_behind.AttendanceBatcher(max_rows=10, max_wait_ms=50, max_pending=100)
+        writes = [batcher.submit(schemas.AttendanceCreate(employee_id=employee_id, date=DAY, status=PRESENT), "Sales", wait=True)
+                  for employee_id in ("EMP001", "EMP002", "EMP003")]
+        results = await asyncio.gather(*(write.future for write in writes))
+        await batcher.close()
+        return results, batcher.stats()
+
+    results, stats = asyncio.run(run())
+    assert [result["employee_id"] for result in results] == ["EMP001", "EMP002", "EMP003"]
+    assert all(result["id"] for result in results)
+    assert (stats["batches"], stats["rows"], stats["pending"]) == (1, 3, 0)
+
+
+def test_write_status(engine, monkeypatch):
+    monkeypatch.setattr(write_behind, "batcher", write_behind.AttendanceBatcher(max_rows=10, max_wait_ms=10, max_pending=10))
+    queued = pending("EMP001", PRESENT)
+    queued.token = write_behind.encode_token(queued.record)
+    write_behind.batcher.recent[queued.token] = queued
+    elsewhere = write_behind.encode_token(pending("EMP002", ABSENT).record)
+
+    with sessionmaker(bind=engine)() as db:
+        assert write_behind.write_status(db, queued.token)["status"] == write_behind.QUEUED
+        # Another worker's write - unknown until the database has it
+        assert write_behind.write_status(db, elsewhere)["status"] == write_behind.UNKNOWN
+        write_behind.write_batch([pending("EMP002", ABSENT)])
+        committed = write_behind.write_status(db, elsewhere)
+        assert committed["status"] == write_behind.COMMITTED and committed["attendance"]["employee_id"] == "EMP002"
+
+        with pytest.raises(HTTPException) as error:
+            write_behind.write_status(db, "not-a-token")
+        assert error.value.status_code == 400
+
+
+def test_close_waits_for_the_flush_in_progress(engine, monkeypatch):
+    flushing = threading.Event()
+    write_batch = write_behind.write_batch
+
+    def slow_write_batch(batch):
+        flushing.set()
+        time.sleep(0.1)
+        write_batch(batch)
+    monkeypatch.setattr(write_behind, "write_batch", slow_write_batch)
+
+    async def run():
+        batcher = write_behind.AttendanceBatcher(max_rows=1, max_wait_ms=1000, max_pending=100)
+        first = batcher.submit(schemas.AttendanceCreate(employee_id="EMP001", date=DAY, status=PRESENT), "Engineering", wait=True)
+        await asyncio.get_running_loop().run_in_executor(None, flushing.wait)
+        second = batcher.submit(schemas.AttendanceCreate(employee_id="EMP002", date=DAY, status=PRESENT), "Sales", wait=True)
+        # Shutting down in the middle of the first flush still commits both, without waiting out max_wait
+        await asyncio.wait_for(batcher.close(), 1)
+        return first.future, second.future, batcher.stats()
+
+    first, second, stats = asyncio.run(run())
+    assert first.result()["employee_id"] == "EMP001" and second.result()["employee_id"] == "EMP002"
+    assert (stats["batches"], stats["pending"], stats["in_flight"]) == (2, 0, 0)
+    assert statuses(engine) == {"EMP001": PRESENT, "EMP002": PRESENT}
+
+
+def test_flusher_restarts_after_dying(engine, monkeypatch, caplog):
+    batcher = write_behind.AttendanceBatcher(max_rows=10, max_wait_ms=10, max_pending=100)
+    next_batch = batcher._next_batch
+
+    async def broken_next_batch():
+        monkeypatch.setattr(batcher, "_next_batch", next_batch)
+        raise RuntimeError("boom")
+    monkeypatch.setattr(batcher, "_next_batch", broken_next_batch)
+
+    async def run():
+        first = batcher.submit(schemas.AttendanceCreate(employee_id="EMP001", date=DAY, status=PRESENT), "Engineering", wait=True)
+        dead = batcher._task
+        await asyncio.sleep(0.01)
+        assert dead.done()
+        # The next write starts a new flusher, which also writes the one left behind
+        second = batcher.submit(schemas.AttendanceCreate(employee_id="EMP002", date=DAY, status=PRESENT), "Sales", wait=True)
+        results = await asyncio.gather(first.future, second.future)
+        await batcher.close()
+        return results
+
+    results = asyncio.run(run())
+    assert [result["employee_id"] for result in results] == ["EMP001", "EMP002"]
+    assert "Attendance flusher died" in caplog.text